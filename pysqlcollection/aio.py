@@ -0,0 +1,325 @@
+# coding: utf-8
+"""
+This file contains the asyncio API : AsyncClient, AsyncDB, AsyncCollection,
+AsyncCursor and AsyncTransaction. They wrap the synchronous objects and run the
+blocking calls in a thread pool, so the serializers and the connection pools are
+shared with the synchronous API. Requires Python 3.5 or later.
+"""
+
+import asyncio
+import functools
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_in_executor(executor, function, *args, **kwargs):
+    """
+    Run a blocking function in a thread pool.
+    Args:
+        executor (Executor): The thread pool.
+        function (callable): The function.
+    Returns:
+        (Future): The awaitable result of the function.
+    """
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(executor, functools.partial(function, *args, **kwargs))
+
+
+def resolved(value):
+    """
+    Get an awaitable already holding its result.
+    """
+    future = asyncio.get_event_loop().create_future()
+    future.set_result(value)
+    return future
+
+
+class AsyncCursor(object):
+    """
+    Asynchronous cursor, fetching documents by batches in the thread pool.
+    Use it with async for, or await to_list().
+    """
+
+    def __init__(self, executor, make_cursor):
+        """
+        Args:
+            executor (Executor): The thread pool.
+            make_cursor (callable): Called in the thread pool, returns the Cursor.
+        """
+        self._executor = executor
+        self._make_cursor = make_cursor
+        # Calls to apply on the cursor when it is made, as (method name, arguments).
+        self._calls = []
+        self._cursor = None
+        self._iterator = None
+        self._buffer = deque()
+        self._batch_size = 1000
+
+    def _chain(self, name, *args):
+        self._calls.append((name, args))
+        return self
+
+    def sort(self, key_or_list, direction=None):
+        return self._chain(u"sort", key_or_list, direction)
+
+    def limit(self, limit):
+        return self._chain(u"limit", limit)
+
+    def skip(self, skip):
+        return self._chain(u"skip", skip)
+
+    def after(self, values_or_token):
+        return self._chain(u"after", values_or_token)
+
+    def with_total(self, with_total=True):
+        return self._chain(u"with_total", with_total)
+
+    def batch_size(self, batch_size):
+        """
+        Set how many documents are fetched by each call to the thread pool.
+        Args:
+            batch_size (int): Number of documents per fetch.
+        Return:
+            (AsyncCursor): The updated cursor.
+        """
+        self._batch_size = batch_size
+        return self._chain(u"batch_size", batch_size)
+
+    @property
+    def total(self):
+        return self._cursor.total if self._cursor is not None else None
+
+    @property
+    def next_token(self):
+        return self._cursor.next_token if self._cursor is not None else None
+
+    def _get_cursor(self):
+        if self._cursor is None:
+            cursor = self._make_cursor()
+            for name, args in self._calls:
+                getattr(cursor, name)(*args)
+            self._cursor = cursor
+        return self._cursor
+
+    def count(self, with_limit_and_skip=False, approximate=False):
+        """
+        Count the rows of the cursor, see Cursor.count.
+        Returns:
+            (Future): The number of rows.
+        """
+        return run_in_executor(
+            self._executor,
+            lambda: self._get_cursor().count(with_limit_and_skip, approximate)
+        )
+
+    def to_list(self):
+        """
+        Returns:
+            (Future): All the documents.
+        """
+        return run_in_executor(self._executor, lambda: list(self._get_cursor()))
+
+    def _next_document(self):
+        """
+        Fetch the next batch if needed and give the next document. Runs in the thread pool.
+        """
+        if not self._buffer:
+            if self._iterator is None:
+                self._iterator = iter(self._get_cursor())
+            self._buffer.extend(itertools.islice(self._iterator, self._batch_size))
+        if not self._buffer:
+            raise StopAsyncIteration
+        return self._buffer.popleft()
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        if self._buffer:
+            return resolved(self._buffer.popleft())
+        return run_in_executor(self._executor, self._next_document)
+
+
+class AsyncTransaction(object):
+    """
+    Asynchronous transaction, to use with async with.
+    """
+
+    def __init__(self, executor, make_transaction):
+        """
+        Args:
+            executor (Executor): The thread pool.
+            make_transaction (callable): Called in the thread pool, returns the Transaction.
+        """
+        self._executor = executor
+        self._make_transaction = make_transaction
+        self.transaction = None
+
+    def _begin(self):
+        self.transaction = self._make_transaction()
+        self.transaction.begin()
+        return self
+
+    def __aenter__(self):
+        return run_in_executor(self._executor, self._begin)
+
+    def __aexit__(self, exc_type, exc_value, traceback):
+        return run_in_executor(self._executor, self.transaction.__exit__, exc_type, exc_value, traceback)
+
+    def commit(self):
+        return run_in_executor(self._executor, self.transaction.commit)
+
+    def rollback(self):
+        return run_in_executor(self._executor, self.transaction.rollback)
+
+
+def unwrap_transaction(kwargs):
+    """
+    Replace an AsyncTransaction given as in_transaction by its Transaction.
+    """
+    if isinstance(kwargs.get(u"in_transaction"), AsyncTransaction):
+        kwargs[u"in_transaction"] = kwargs[u"in_transaction"].transaction
+    return kwargs
+
+
+class AsyncCollection(object):
+    """
+    Asynchronous collection. Its methods take the arguments of the Collection ones.
+    """
+
+    def __init__(self, executor, get_collection):
+        """
+        Args:
+            executor (Executor): The thread pool.
+            get_collection (callable): Called in the thread pool, returns the Collection.
+        """
+        self._executor = executor
+        self._get_collection = get_collection
+
+    def _run(self, name, *args, **kwargs):
+        kwargs = unwrap_transaction(kwargs)
+        return run_in_executor(
+            self._executor,
+            lambda: getattr(self._get_collection(), name)(*args, **kwargs)
+        )
+
+    def find(self, *args, **kwargs):
+        """
+        Returns:
+            (AsyncCursor): The cursor, executed when iterated.
+        """
+        return AsyncCursor(self._executor, lambda: self._get_collection().find(*args, **kwargs))
+
+    def find_one(self, *args, **kwargs):
+        """
+        Returns:
+            (Future): The first document matching, None if there is none.
+        """
+        def find_one():
+            documents = list(self._get_collection().find(*args, **kwargs).limit(1))
+            return documents[0] if documents else None
+        return run_in_executor(self._executor, find_one)
+
+    def insert_one(self, *args, **kwargs):
+        return self._run(u"insert_one", *args, **kwargs)
+
+    def insert_many(self, *args, **kwargs):
+        return self._run(u"insert_many", *args, **kwargs)
+
+    def load(self, *args, **kwargs):
+        return self._run(u"load", *args, **kwargs)
+
+    def update_many(self, *args, **kwargs):
+        return self._run(u"update_many", *args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        return self._run(u"delete_many", *args, **kwargs)
+
+    def get_description(self, *args, **kwargs):
+        return self._run(u"get_description", *args, **kwargs)
+
+
+class AsyncDB(object):
+    """
+    Asynchronous database.
+    """
+
+    def __init__(self, executor, get_db):
+        """
+        Args:
+            executor (Executor): The thread pool.
+            get_db (callable): Called in the thread pool, returns the DB.
+        """
+        self._executor = executor
+        self._get_db = get_db
+
+    def __getattr__(self, name):
+        if name.startswith(u"_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    def get_collection(self, table_name):
+        """
+        Args:
+            table_name (unicode): The name of the table.
+        Returns:
+            (AsyncCollection): The collection, resolved when first used.
+        """
+        return AsyncCollection(self._executor, lambda: self._get_db().get_collection(table_name))
+
+    def list_collection_names(self):
+        return run_in_executor(self._executor, lambda: self._get_db().list_collection_names())
+
+    def transaction(self):
+        """
+        Returns:
+            (AsyncTransaction): The transaction, begun by async with.
+        """
+        return AsyncTransaction(self._executor, lambda: self._get_db().transaction())
+
+
+class AsyncClient(object):
+    """
+    Asynchronous client. Queries run in a pool of threads, each one checking out a
+    connection from the pool of its database.
+    """
+
+    def __init__(self, user, password, max_workers=32, **options):
+        """
+        Args:
+            user (unicode): The user to connect with.
+            password (unicode): Its password.
+            max_workers (int): How many queries can run at the same time. The connection
+                pool size of each database defaults to it.
+            options: The other parameters of Client.
+        """
+        # Imported here so that the module loads without the database driver.
+        from .client import Client
+
+        options.setdefault(u"pool_size", max_workers)
+        self._client = Client(user, password, **options)
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    def __getattr__(self, name):
+        if name.startswith(u"_"):
+            raise AttributeError(name)
+        return self.get_database(name)
+
+    def get_database(self, database_name):
+        """
+        Args:
+            database_name (unicode): The name of the database.
+        Returns:
+            (AsyncDB): The database, resolved when first used.
+        """
+        return AsyncDB(self._executor, lambda: self._client.get_database(database_name))
+
+    def result_cache_stats(self):
+        return self._client.result_cache_stats()
+
+    def close(self):
+        """
+        Stop the thread pool once the running queries are done.
+        """
+        self._executor.shutdown(wait=False)
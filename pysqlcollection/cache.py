@@ -0,0 +1,232 @@
+# coding: utf-8
+"""
+This file contains LRUCache and ResultCache classes.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    Thread-safe mapping bounded in size, evicting the least recently used entries first.
+    """
+
+    def __init__(self, max_size=128, on_evict=None):
+        """
+        Args:
+            max_size (int): Maximum number of entries kept.
+            on_evict (callable): Called with the key and the value of each evicted entry.
+        """
+        if max_size < 1:
+            raise ValueError(u"The cache size must be greater than 0.")
+
+        self.max_size = max_size
+        self._on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def items(self):
+        """
+        Returns:
+            (list of tuple): The (key, value) entries, least recently used first.
+        """
+        with self._lock:
+            return list(self._items.items())
+
+    def get(self, key, default=None):
+        """
+        Get an entry and mark it as the most recently used.
+        Args:
+            key: The key of the entry.
+            default: Returned when the key is missing.
+        Returns:
+            The value of the entry.
+        """
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._items[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Add or replace an entry, evicting the least recently used ones if the cache is full.
+        Args:
+            key: The key of the entry.
+            value: The value of the entry.
+        """
+        evicted = []
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            while len(self._items) > self.max_size:
+                evicted.append(self._items.popitem(last=False))
+                self.evictions += 1
+
+        if self._on_evict is not None:
+            for evicted_key, evicted_value in evicted:
+                self._on_evict(evicted_key, evicted_value)
+
+    def pop(self, key, default=None):
+        """
+        Remove an entry.
+        Args:
+            key: The key of the entry.
+            default: Returned when the key is missing.
+        Returns:
+            The value of the removed entry.
+        """
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        """
+        Remove all the entries.
+        """
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """
+        Returns:
+            (dict): Usage counters of the cache.
+        """
+        return {
+            u"hits": self.hits,
+            u"misses": self.misses,
+            u"evictions": self.evictions,
+            u"size": len(self._items),
+            u"max_size": self.max_size
+        }
+
+
+class ResultCache(object):
+    """
+    Cache of query results, expiring after a time to live and dropped as soon as
+    one of the tables they were read from is written.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        """
+        Args:
+            max_size (int): Maximum number of results kept.
+            ttl (float): Seconds a result is kept, None to keep it until evicted.
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._lock = threading.RLock()
+        # Keys of the results read from each (database, table).
+        self._keys_by_table = {}
+        self._results = LRUCache(max_size, on_evict=self._forget)
+
+    def _forget(self, key, entry):
+        """
+        Remove an entry from the table index.
+        """
+        with self._lock:
+            for table in entry[2]:
+                keys = self._keys_by_table.get(table)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys_by_table[table]
+
+    def get(self, database_name, key, default=None):
+        """
+        Get a result.
+        Args:
+            database_name (unicode): The database queried.
+            key (tuple): The query and its values.
+            default: Returned when the result is missing or expired.
+        Returns:
+            The result.
+        """
+        key = (database_name, key)
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.time():
+                self._results.pop(key)
+                self._forget(key, entry)
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[1]
+
+    def put(self, database_name, key, value, table_names):
+        """
+        Add a result.
+        Args:
+            database_name (unicode): The database queried.
+            key (tuple): The query and its values.
+            value: The result.
+            table_names (list of unicode): The tables the result was read from.
+        """
+        key = (database_name, key)
+        tables = set((database_name, table_name) for table_name in table_names)
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            previous = self._results.pop(key)
+            if previous is not None:
+                self._forget(key, previous)
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+        self._results.put(key, (expires_at, value, tables))
+
+    def invalidate(self, database_name, table_name):
+        """
+        Drop the results read from a table.
+        Args:
+            database_name (unicode): The database of the table.
+            table_name (unicode): The table written.
+        """
+        with self._lock:
+            for key in list(self._keys_by_table.get((database_name, table_name), [])):
+                entry = self._results.pop(key)
+                if entry is not None:
+                    self._forget(key, entry)
+                    self.invalidations += 1
+
+    def clear(self):
+        """
+        Drop all the results.
+        """
+        with self._lock:
+            self._results.clear()
+            self._keys_by_table = {}
+
+    def stats(self):
+        """
+        Returns:
+            (dict): Usage counters of the cache.
+        """
+        stats = self._results.stats()
+        stats.update({
+            u"hits": self.hits,
+            u"misses": self.misses,
+            u"expirations": self.expirations,
+            u"invalidations": self.invalidations
+        })
+        return stats
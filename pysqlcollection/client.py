@@ -7,11 +7,23 @@ from pysqlcollection.serializer.api_serializer import ApiSerializer
 from pysqlcollection.serializer.mysql_serializer import MySQLSerializer
 from .connection.mysql_connection import MySQLConnection
 from .db import DB
+from .cache import LRUCache, ResultCache
+from .snapshot import read_snapshot, write_snapshot
+from .single_flight import SingleFlight
 
 
 class Client(object):
     """
     Serialize MySQL requests.
+
+    A client can be shared by threads, as in threaded WSGI servers : the discovery
+    of databases, tables, columns and relations runs once when threads need it at
+    the same time, and each query or transaction checks out its own connection
+    from the pool of its database.
+
+    A client can also be created before forking workers, as in pre-fork servers :
+    a worker opens its own connections instead of the inherited ones, and keeps
+    the schema already discovered.
     """
 
     def __init__(
@@ -20,50 +32,180 @@ class Client(object):
             password,
             host=None,
             unix_socket=None,
-            driver=u"mysql"
+            driver=u"mysql",
+            pool_size=10,
+            pool_options=None,
+            bulk_introspection=False,
+            database_cache_size=64,
+            flatten_select=False,
+            result_cache_size=0,
+            result_cache_ttl=60
     ):
+        """
+        Args:
+            user (unicode): The user to connect with.
+            password (unicode): Its password.
+            host (unicode): The host of the server.
+            unix_socket (unicode): The socket to use when there is no host.
+            driver (unicode): The kind of database.
+            pool_size (int): Maximum number of connections opened at the same time
+                for each database.
+            pool_options (dict): Other connection pool parameters (min_size, idle_timeout,
+                max_lifetime, checkout_timeout).
+            bulk_introspection (bool): Load the whole schema of a database in two queries
+                when it is first used.
+            database_cache_size (int): How many DB objects are kept. The least recently
+                used ones are closed.
+            flatten_select (bool): Encode finds as one flat query filtering and sorting on
+                table columns, so that MySQL can use indexes.
+            result_cache_size (int): How many find and count results are cached, 0 to
+                disable the cache. A result is dropped when a table it was read from is
+                written through this client.
+            result_cache_ttl (float): Seconds a cached result is kept, None for no limit.
+        """
 
         self._host = host
         self._unix_socket = unix_socket
         self._user = user
         self._password = password
         self._driver = driver
+        self._pool_size = pool_size
+        self._pool_options = pool_options
+        self._bulk_introspection = bulk_introspection
+        self._sql_serializer = MySQLSerializer(flatten_select=flatten_select)
+        self._connection = None
+        self._databases = LRUCache(database_cache_size, on_evict=lambda _, db: db.close())
+        self._result_cache = ResultCache(result_cache_size, result_cache_ttl) if result_cache_size > 0 else None
+        # Discoveries in flight, so that concurrent first requests run them once.
+        self._single_flight = SingleFlight()
     
+    def result_cache_stats(self):
+        """
+        Returns:
+            (dict): Usage counters of the result cache, None if it is disabled.
+        """
+        return self._result_cache.stats() if self._result_cache is not None else None
+
     def __getattr__(self, name):
-        if name not in self.__dict__:
-            self.discover_databases(name)
+        if name.startswith(u"_"):
+            raise AttributeError(name)
+        return self.get_database(name)
 
-        return self.__dict__[name]
+    def get_database(self, database_name):
+        """
+        Get the DB object of a database, created when first used.
+        Args:
+            database_name (unicode): The name of the database.
+        Returns:
+            (DB): The DB object.
+        """
+        db = self._databases.get(database_name)
+        if db is None:
+            db = self._single_flight.run(
+                (u"database", database_name),
+                lambda: self._discover_database(database_name)
+            )
+        return db
+
+    def _discover_database(self, database_name):
+        db = self._databases.get(database_name)
+        if db is None:
+            self.discover_databases(database_name)
+            db = self._databases.get(database_name)
+        return db
             
+    def _connection_chain(self, database_name=None):
+        connection_chain = {
+            u"host": self._host,
+            u"unix_socket": self._unix_socket,
+            u"user": self._user,
+            u"password": self._password,
+            u"pool_size": self._pool_size,
+            u"pool_options": self._pool_options
+        }
+        if database_name:
+            connection_chain[u"database"] = database_name
+        return connection_chain
+
+    def _create_db(self, database_name, schema=None, connection=None):
+        """
+        Create the DB object of a database and keep it in the client.
+        Args:
+            database_name (unicode): The name of the database.
+            schema (dict): A schema to load instead of discovering it.
+            connection (AbstractConnection): The connection to the database, if already opened.
+        Returns:
+            (DB): The created object.
+        """
+        # Table names are only unique inside a database, each one gets its serializer.
+        db = DB(
+            api_serializer=ApiSerializer(),
+            sql_serializer=self._sql_serializer,
+            connection=connection or MySQLConnection(**self._connection_chain(database_name)),
+            bulk_introspection=self._bulk_introspection,
+            schema=schema,
+            result_cache=self._result_cache
+        )
+        self._databases.put(database_name, db)
+        return db
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = MySQLConnection(**self._connection_chain())
+        return self._connection
+
     def discover_databases(self, database_name=None):
 
         if self._driver == u"mysql":
-            connection_chain = {
-                u"host": self._host,
-                u"unix_socket": self._unix_socket,
-                u"user": self._user,
-                u"password": self._password
-            }
-            connection = MySQLConnection(**connection_chain)
-
-            api_serializer = ApiSerializer()
-            sql_serializer = MySQLSerializer()
+            connection = self._connection or self._single_flight.run(u"connection", self._connect)
 
             if not database_name:
-                databases, _ = connection.execute(*sql_serializer.get_databases())
+                databases, _ = connection.execute(*self._sql_serializer.get_databases())
                 databases = [database[0] for database in databases]
             else:
                 databases = [database_name]
 
             for database_name in databases:
-                connection_chain = connection_chain.copy()
-                connection_chain[u"database"] = database_name
-                setattr(self, database_name, DB(
-                    api_serializer=api_serializer,
-                    sql_serializer=sql_serializer,
-                    connection=MySQLConnection(**connection_chain)
-                ))
+                self._create_db(database_name)
         else:
             raise NotImplemented
 
+    def save_schema_snapshot(self, path):
+        """
+        Save the whole schema of the databases used so far in a file, so that
+        another process can start without discovering them.
+        Args:
+            path (unicode): The snapshot file.
+        """
+        write_snapshot(path, dict(
+            (database_name, db.dump_schema())
+            for database_name, db in self._databases.items()
+        ))
+
+    def load_schema_snapshot(self, path, validate=False):
+        """
+        Load the databases saved with save_schema_snapshot.
+        Args:
+            path (unicode): The snapshot file.
+            validate (bool): Compare the checksum of each schema with the server one and
+                ignore the outdated ones. The checksum scans the columns and the foreign
+                keys of the database, which costs about as much as discovering them, so
+                only validate when the snapshot may be older than the schema.
+        Returns:
+            (list of unicode): The names of the databases loaded.
+        """
+        loaded = []
+        for database_name, schema in read_snapshot(path).items():
+            connection = MySQLConnection(**self._connection_chain(database_name))
+            if validate:
+                rows, _ = connection.execute(
+                    *self._sql_serializer.get_schema_checksum(database_name)
+                )
+                if rows[0][0] != schema[u"checksum"]:
+                    connection.close()
+                    continue
+
+            self._create_db(database_name, schema=schema, connection=connection)
+            loaded.append(database_name)
 
+        return loaded
@@ -3,9 +3,83 @@
 This file contains Collection class.
 """
 
+import os
 import json
+import pickle
+import numbers
+import tempfile
+import traceback
+import itertools
+import multiprocessing
 from .cursor import Cursor
-from .serializer.api_type import InsertResultOne, UpdateResult, DeleteResult
+from .serializer.api_type import (
+    InsertResultOne,
+    InsertManyResult,
+    LoadResult,
+    UpdateResult,
+    DeleteResult,
+    DEFAULT
+)
+from .connection.sql_exception import IntegrityException, BulkWriteException
+from .serializer.api_exception import WrongParameter
+from .replica import Replica
+from .single_flight import SingleFlight
+
+# MySQL warning of a row skipped for a duplicate key.
+DUPLICATE_ENTRY = 1062
+
+def split_key_range(low, high, partitions):
+    """
+    Split a range of integer keys in disjoint ranges of about the same width.
+    Args:
+        low (int): The lowest key.
+        high (int): The highest key.
+        partitions (int): Maximum number of ranges.
+    Returns:
+        (list of tuple): The (start, stop) of each range, stop being excluded.
+    """
+    width = high - low + 1
+    partitions = max(1, min(partitions, width))
+    bounds = [low + width * index // partitions for index in range(partitions)] + [high + 1]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _scan_worker(collection, tasks, queues, batch_size):
+    """
+    Read the key ranges taken from the task queue, in a worker process. The documents
+    are sent by batches to the queue of each range, which blocks while it is full.
+    Args:
+        collection (Collection): The collection, inherited from the parent process.
+        tasks (Queue): The (index, task) of each range, then None.
+        queues (list of Queue): The queue of each range, the same one when unordered.
+        batch_size (int): Number of documents per batch.
+    """
+    while True:
+        item = tasks.get()
+        if item is None:
+            return
+        index, (query, projection, lookup, lookup_strategy, key, start, stop, ordered) = item
+        queue = queues[index]
+        try:
+            key_query = {key: {u"$gte": start, u"$lt": stop}}
+            if query:
+                key_query = {u"$and": [query, key_query]}
+            cursor = collection._find(key_query, projection, lookup, lookup_strategy, paginate=False)
+            if ordered:
+                cursor.sort(key, 1)
+            iterator = iter(cursor.batch_size(batch_size))
+            while True:
+                batch = list(itertools.islice(iterator, batch_size))
+                if not batch:
+                    break
+                queue.put((u"batch", batch))
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(traceback.format_exc())
+            queue.put((u"error", e))
+        queue.put((u"done", None))
 
 
 class Collection(object):
@@ -13,7 +87,17 @@ class Collection(object):
     Serialize Collection requests.
     """
 
-    def __init__(self, api_serializer, sql_serializer, connection, database_name, table_name):
+    def __init__(
+            self,
+            api_serializer,
+            sql_serializer,
+            connection,
+            database_name,
+            table_name,
+            result_cache=None,
+            replicas=None,
+            single_flight=None
+    ):
         """
         Args:
             api_serializer  : The serializer from api to neutral language.
@@ -21,25 +105,41 @@ class Collection(object):
             connection : The object which interacts with Database.
             database_name (unicode): The name of the database where the table comes from.
             table_name (unicode): The name of the table associated.
+            result_cache (ResultCache): The cache of find and count results, None to disable it.
+            replicas (dict): The Replica of each replicated table of the database, shared
+                by its collections.
+            single_flight (SingleFlight): Runs each discovery once when threads ask for
+                it at the same time, shared by the collections of the database.
         """
         self._api_serializer = api_serializer
         self._sql_serializer = sql_serializer
         self._connection = connection
         self._database_name = database_name
         self.table_name = table_name
+        self._result_cache = result_cache
+        self._replicas = replicas if replicas is not None else {}
+        self._single_flight = single_flight or SingleFlight()
     
     def __getattr__(self, name):
+        # Introspection (copy, hasattr of special methods...) must not query the database.
+        if name.startswith(u"_"):
+            raise AttributeError(name)
         if name not in self.__dict__:
             self.discover_columns()
             
     def discover_columns(self, table_name=None):
         """
-        Load the columns of the table.
+        Load the columns of the table. Threads asking for the same table at the
+        same time share one query.
         Args:
             table_name (unicode): The name of the table we want the columns.
         """
+        table_name = table_name or self.table_name
+        if table_name not in self._api_serializer.table_columns:
+            self._single_flight.run((u"columns", table_name), lambda: self._discover_columns(table_name))
+
+    def _discover_columns(self, table_name):
         if table_name not in self._api_serializer.table_columns:
-            table_name = table_name or self.table_name
             result, _ = self._connection.execute(
                 *self._sql_serializer.get_table_columns(table_name)
             )
@@ -48,14 +148,51 @@ class Collection(object):
                 for db_column in result
             ]
 
+    def get_relations(self, table_name=None):
+        """
+        Get the foreign keys of a table. The foreign keys of the whole database
+        are loaded in one query the first time.
+        Args:
+            table_name (unicode): The name of the table.
+        Returns:
+            (list of tuple): The relations as (table, column, referenced table, referenced column).
+        """
+        if not self._api_serializer.relations_loaded:
+            self._single_flight.run(u"relations", self._discover_relations)
+
+        return self._api_serializer.table_relations.get(table_name or self.table_name, [])
+
+    def _discover_relations(self):
+        if not self._api_serializer.relations_loaded:
+            relations, _ = self._connection.execute(
+                *self._sql_serializer.get_schema_relations(self._database_name)
+            )
+            table_relations = {}
+            for relation in relations:
+                table_relations.setdefault(relation[0], []).append(tuple(relation))
+            self._api_serializer.set_relations(table_relations)
+
     def _auto_lookup(self, table_name=None, deep=0, max_deep=2, parent_lookup=None):
         """
-        Autolookup method. Construct a list of lookup.
+        Autolookup method. Construct a list of lookup, walking the relation graph
+        in memory. The result is kept for each table and max_deep.
         Args:
             table_name (unicode): The name of the concerned table.
             deep (int): How deep we are in the lookup.
             max_deep (int): Recursive call count before we stop digging.
         """
+        if deep > 0 or parent_lookup:
+            return self._build_auto_lookup(table_name, deep, max_deep, parent_lookup)
+
+        key = (table_name or self.table_name, max_deep)
+        lookup = self._api_serializer.lookup_cache.get(key)
+        if lookup is None:
+            lookup = self._build_auto_lookup(table_name, deep, max_deep, parent_lookup)
+            self._api_serializer.lookup_cache[key] = lookup
+
+        return [dict(item) for item in lookup]
+
+    def _build_auto_lookup(self, table_name=None, deep=0, max_deep=2, parent_lookup=None):
         parent_lookup = parent_lookup or []
         lookup = []
         if deep < max_deep:
@@ -69,9 +206,7 @@ class Collection(object):
                     table_name = parent_look.get(u"from")
                     break
 
-            relations, _ = self._connection.execute(
-                *self._sql_serializer.get_relations(self._database_name, table_name)
-            )
+            relations = self.get_relations(table_name)
 
 
             for relation in relations:
@@ -95,7 +230,7 @@ class Collection(object):
             new_lookup = []
             for item in lookup:
 
-                new_lookup += self._auto_lookup(
+                new_lookup += self._build_auto_lookup(
                     item.get(u"as"),
                     deep=deep+1,
                     max_deep=max_deep,
@@ -168,7 +303,7 @@ class Collection(object):
         
         return None
 
-    def find(self, query=None, projection=None, lookup=None, auto_lookup=0):
+    def find(self, query=None, projection=None, lookup=None, auto_lookup=0, lookup_strategy=u"join"):
         """
         Does a find query on the collection.
         Args:
@@ -179,12 +314,264 @@ class Collection(object):
             auto_lookup (int): If we don't know what lookup we want, we let the lib to look
                 them for us. This can have consequences on optimization as it constructs
                 joins. Be careful.
+            lookup_strategy (unicode): How multiple lookups are fetched. "join" joins them
+                in the query, "batch" fetches the page first, then the documents of each
+                multiple lookup with an IN query, so limit and skip apply to documents.
+                "json" lets the server build each document with JSON_OBJECT and
+                JSON_ARRAYAGG, when it is recent enough.
         """
+        if lookup_strategy not in [u"join", u"batch", u"json"]:
+            raise WrongParameter(u"Lookup strategy must be join, batch or json.")
 
-        lookup = self._proceed_lookup(lookup, auto_lookup)
+        return self._find(query, projection, self._proceed_lookup(lookup, auto_lookup), lookup_strategy)
+
+    def _find(self, query, projection, lookup, lookup_strategy, paginate=True):
+        """
+        Make the cursor of a find, the lookup being already proceeded.
+        """
+        batched_lookup = None
+        lookup, replicated_lookup = self._split_replicated_lookup(lookup, query, projection)
+        if lookup_strategy == u"batch":
+            lookup, batched_lookup = self._api_serializer.split_batch_lookup(self.table_name, lookup)
         select = self._api_serializer.decode_find(self.table_name, query, projection, lookup)
 
-        return Cursor(self._sql_serializer, self._api_serializer, self._connection, select, lookup)
+        return Cursor(
+            self._sql_serializer, self._api_serializer, self._connection, select, lookup, batched_lookup,
+            json_documents=lookup_strategy == u"json",
+            result_cache=self._result_cache,
+            database_name=self._database_name,
+            replicated_lookup=replicated_lookup,
+            paginate=paginate
+        )
+
+    def parallel_scan(
+            self,
+            query=None,
+            projection=None,
+            lookup=None,
+            auto_lookup=0,
+            lookup_strategy=u"join",
+            partitions=None,
+            workers=None,
+            ordered=False,
+            batch_size=1000
+    ):
+        """
+        Read all the documents matching a query with several processes, for exports
+        and backfills bound by the building of documents. The range of the primary key,
+        read with MIN and MAX, is split in partitions, each one read as its own query
+        by a worker process. Requires an integer primary key and the fork start method.
+        The workers send the documents by batches through bounded queues, so memory
+        does not grow with the size of the partitions. The parameters are checked when
+        called, the documents are read while iterating.
+        Args:
+            query (dict): The mongo like query to execute.
+            projection (dict): The columns returned, as in find.
+            lookup (list of dict): The lookup to apply during this query.
+            auto_lookup (int): Depth of the automatic lookup, as in find.
+            lookup_strategy (unicode): How multiple lookups are fetched, as in find.
+            partitions (int): Number of key ranges, 4 per worker by default so that the
+                workers stay busy when the keys are unevenly spread.
+            workers (int): Number of processes, the number of cores by default.
+            ordered (bool): Yield the documents ordered by primary key, else as the
+                partitions are read.
+            batch_size (int): Number of documents sent at once by a worker.
+        Returns:
+            (iterator of dict): The documents.
+        """
+        if lookup_strategy not in [u"join", u"batch", u"json"]:
+            raise WrongParameter(u"Lookup strategy must be join, batch or json.")
+        if isinstance(batch_size, bool) or not isinstance(batch_size, numbers.Integral) or batch_size < 1:
+            raise WrongParameter(u"Batch size must be a positive integer.")
+
+        self.discover_columns(self.table_name)
+        primary_keys = [
+            column.name for column in self._api_serializer.table_columns[self.table_name] if column.key == u"pri"
+        ]
+        if len(primary_keys) != 1:
+            raise WrongParameter(u"Only tables with a one column primary key can be scanned in parallel.")
+        key = primary_keys[0]
+
+        rows, _ = self._connection.execute(*self._sql_serializer.get_key_range(self.table_name, key))
+        low, high = rows[0]
+        if low is None:
+            return iter([])
+        if not isinstance(low, numbers.Integral) or not isinstance(high, numbers.Integral):
+            raise WrongParameter(u"Only tables with an integer primary key can be scanned in parallel.")
+
+        workers = workers or multiprocessing.cpu_count()
+        # Discovered before forking, so that the workers don't do it each.
+        lookup = self._proceed_lookup(lookup, auto_lookup)
+        tasks = [
+            (query, projection, lookup, lookup_strategy, key, start, stop, ordered)
+            for start, stop in split_key_range(low, high, partitions or workers * 4)
+        ]
+        return self._scan(tasks, min(workers, len(tasks)), ordered, batch_size)
+
+    def _scan(self, tasks, workers, ordered, batch_size):
+        """
+        Fork the worker processes of a parallel scan and yield the documents they send.
+        They inherit the collection and its discovered schema, their connection pools
+        open their own connections. Each queue holds at most two batches per reader.
+        Args:
+            tasks (list of tuple): The find parameters, the key and its range.
+            workers (int): Number of processes.
+            ordered (bool): Read the ranges one after the other, else as they come.
+            batch_size (int): Number of documents per batch.
+        Yields:
+            (dict): The documents.
+        """
+        get_context = getattr(multiprocessing, u"get_context", None)
+        context = get_context(u"fork") if get_context is not None else multiprocessing
+
+        task_queue = context.Queue()
+        for item in enumerate(tasks):
+            task_queue.put(item)
+        for _ in range(workers):
+            task_queue.put(None)
+
+        if ordered:
+            queues = [context.Queue(2) for _ in tasks]
+            readers = [(queue, 1) for queue in queues]
+        else:
+            queue = context.Queue(2 * workers)
+            queues = [queue] * len(tasks)
+            readers = [(queue, len(tasks))]
+
+        processes = [
+            context.Process(target=_scan_worker, args=(self, task_queue, queues, batch_size))
+            for _ in range(workers)
+        ]
+        try:
+            for process in processes:
+                process.daemon = True
+                process.start()
+            for queue, ranges in readers:
+                while ranges:
+                    kind, value = queue.get()
+                    if kind == u"batch":
+                        for document in value:
+                            yield document
+                    elif kind == u"error":
+                        raise value
+                    else:
+                        ranges -= 1
+        finally:
+            for process in processes:
+                if process.pid is None:
+                    continue
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+    def replicate(self, refresh_interval=300):
+        """
+        Keep an in memory copy of the table. The simple lookups to its primary key are
+        then filled from the copy instead of being joined, unless the query or the
+        projection use their fields. Sorting on their fields is not possible.
+        Args:
+            refresh_interval (float): Seconds after which the copy is loaded again, None
+                to only load it again after a write through this client.
+        Returns:
+            (Replica): The copy.
+        """
+        self.discover_columns(self.table_name)
+        columns = self._api_serializer.table_columns[self.table_name]
+        primary_keys = [column.name for column in columns if column.key == u"pri"]
+        if len(primary_keys) != 1:
+            raise WrongParameter(u"Only tables with a one column primary key can be replicated.")
+
+        def load():
+            select = self._api_serializer.decode_find(self.table_name)
+            return list(Cursor(
+                self._sql_serializer, self._api_serializer, self._connection, select, paginate=False
+            ))
+
+        replica = Replica(load, primary_keys[0], [column.name for column in columns], refresh_interval)
+        self._replicas[self.table_name] = replica
+        return replica
+
+    def _query_paths(self, query):
+        """
+        Get the field paths a query filters on.
+        """
+        paths = []
+        for key, value in (query or {}).items():
+            if not key.startswith(u"$"):
+                paths.append(key)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        paths += self._query_paths(item)
+        return paths
+
+    def _split_replicated_lookup(self, lookup, query=None, projection=None):
+        """
+        Separate the lookups which can be filled from replicated tables.
+        Args:
+            lookup (list of dict): The lookups.
+            query (dict): The query of the find.
+            projection (dict): The projection of the find.
+        Returns:
+            (list of dict, list of tuple): The lookups to join, and the (lookup, Replica)
+                pairs to fill in memory.
+        """
+        if not self._replicas or not lookup:
+            return lookup, []
+
+        # Aliases of the multiple lookups and of what is joined from them.
+        in_multiple = set()
+        for look in lookup:
+            if look.get(u"type") == u"multiple" or look[u"to"] in in_multiple:
+                in_multiple.add(look[u"as"])
+
+        candidates = {}
+        for look in lookup:
+            replica = self._replicas.get(look[u"from"])
+            if (
+                    replica is not None and
+                    look.get(u"type", u"simple") == u"simple" and
+                    look[u"foreignField"] == replica.primary_key and
+                    look[u"as"] not in in_multiple
+            ):
+                candidates[look[u"as"]] = look
+
+        used_paths = self._query_paths(query) + list((projection or {}).keys())
+        changed = True
+        while changed:
+            changed = False
+            for alias in list(candidates):
+                prefix = u"{}.".format(alias)
+                used = any(path == alias or path.startswith(prefix) for path in used_paths)
+                # What is joined from the lookup needs its table in the query.
+                joined_from = any(
+                    look[u"as"] not in candidates and (look[u"to"] == alias or look[u"to"].startswith(prefix))
+                    for look in lookup
+                )
+                if used or joined_from:
+                    del candidates[alias]
+                    changed = True
+
+        return (
+            [look for look in lookup if look[u"as"] not in candidates],
+            [(look, self._replicas[look[u"from"]]) for look in lookup if look[u"as"] in candidates]
+        )
+
+    def _invalidate_results(self, in_transaction=None):
+        """
+        Drop the cached results read from the table, after a write.
+        Args:
+            in_transaction (Transaction): The transaction of the write. The results are then
+                dropped once it is committed, else a find could cache them again before.
+        """
+        if in_transaction:
+            in_transaction.on_commit(self._invalidate_results)
+            return
+        if self._result_cache is not None:
+            self._result_cache.invalidate(self._database_name, self.table_name)
+        replica = self._replicas.get(self.table_name)
+        if replica is not None:
+            replica.invalidate()
 
     def insert_one(self, document, lookup=None, auto_lookup=0, in_transaction=None):
         """
@@ -206,14 +593,203 @@ class Collection(object):
 
         sql_cursor = in_transaction.sql_cursor if in_transaction else None
 
-        return InsertResultOne(
-            inserted_id=self._connection.execute(
-                query,
-                values,
-                return_lastrowid=True,
-                sql_cursor=sql_cursor
-            )
+        inserted_id = self._connection.execute(
+            query,
+            values,
+            return_lastrowid=True,
+            sql_cursor=sql_cursor
+        )
+        self._invalidate_results(in_transaction)
+
+        return InsertResultOne(inserted_id=inserted_id)
+
+    def insert_many(self, documents, ordered=True, batch_size=1000, lookup=None, auto_lookup=0, in_transaction=None):
+        """
+        Inserts documents in the collection with multi-rows INSERT queries, each one
+        holding at most batch_size rows and fitting in the server max_allowed_packet.
+        Args:
+            documents (iterable of dict): The representations of the items to insert.
+            ordered (bool): Stop at the first failing query. Otherwise, the following
+                queries are still executed and the errors raised at the end. A failing
+                query inserts none of its rows.
+            batch_size (int): Maximum number of rows per query.
+            lookup (list of dict): The lookup to apply during this query.
+            auto_lookup (int): If we don't know what lookup we want, we let the lib to look
+                them for us. This can have consequences on optimization as it constructs
+                joins. Be careful.
+            in_transaction (Transaction): The transaction where to execute the queries.
+        Return:
+            (InsertManyResult): The representation of the insertion. The generated ids are
+                None for the queries mixing documents with and without ids.
+        """
+        lookup = self._proceed_lookup(lookup, auto_lookup)
+        insert = self._api_serializer.decode_insert_many(self.table_name, documents, lookup)
+        variables = self._connection.get_server_variables(
+            [u"max_allowed_packet", u"auto_increment_increment"]
         )
+        increment = int(variables[u"auto_increment_increment"])
+        # Keep a margin for the protocol overhead.
+        max_packet_size = int(variables[u"max_allowed_packet"]) * 9 // 10
+
+        primary_index = None
+        for index, field in enumerate(insert.fields):
+            if field.column.key == u"pri":
+                primary_index = index
+        auto_increment = any(column.extra == u"auto_increment" for column in insert.table.columns)
+
+        sql_cursor = in_transaction.sql_cursor if in_transaction else None
+
+        inserted_ids = []
+        errors = []
+        for query, values, start, end in self._sql_serializer.encode_insert_many(
+                insert, max_packet_size, batch_size
+        ):
+            try:
+                next_id = self._connection.execute(
+                    query,
+                    values,
+                    return_lastrowid=True,
+                    sql_cursor=sql_cursor
+                )
+            except IntegrityException as e:
+                errors.append({u"index": start, u"count": end - start, u"message": e.message})
+                if ordered:
+                    break
+                continue
+
+            # Generated ids of a multi-rows insert follow the first one, unless some rows of
+            # the query give their own id : MySQL may then skip values, they are unknown.
+            rows = insert.rows[start:end]
+            given_ids = primary_index is not None and any(row[primary_index] is not DEFAULT for row in rows)
+            for row in rows:
+                if primary_index is not None and row[primary_index] is not DEFAULT:
+                    inserted_ids.append(row[primary_index])
+                elif auto_increment and not given_ids:
+                    inserted_ids.append(next_id)
+                    next_id += increment
+                else:
+                    inserted_ids.append(None)
+
+        self._invalidate_results(in_transaction)
+        if errors:
+            raise BulkWriteException(u"Some documents could not be inserted.", inserted_ids, errors)
+
+        return InsertManyResult(inserted_ids=inserted_ids)
+
+    def load(self, documents, columns=None, on_duplicate=u"error", chunk_size=10000, lookup=None, auto_lookup=0):
+        """
+        Loads documents in the collection with LOAD DATA LOCAL INFILE, much faster than
+        inserts for large imports. The documents are checked and cast as by insert_many,
+        then written by chunks to a temporary file, each chunk being loaded and committed
+        on its own by a connection dedicated to the load.
+        Args:
+            documents (iterable of dict or file): The documents, or a file of tab separated
+                rows, already escaped as LOAD DATA expects.
+            columns (list of unicode): The columns to load, the other values of the documents
+                being ignored. Required with a file : its columns, in order.
+            on_duplicate (unicode): What to do with rows whose key exists. "error" stops the
+                load, the chunk holding them being rolled back. "ignore" skips them and
+                "replace" replaces the existing rows.
+            chunk_size (int): Maximum number of rows per LOAD DATA query.
+            lookup (list of dict): The lookup to apply during this query.
+            auto_lookup (int): If we don't know what lookup we want, we let the lib to look
+                them for us.
+        Return:
+            (LoadResult): The number of rows loaded, with the rows and the warnings of each chunk.
+        """
+        if on_duplicate not in [u"error", u"ignore", u"replace"]:
+            raise WrongParameter(u"On duplicate must be error, ignore or replace.")
+        if hasattr(documents, u"read") and not columns:
+            raise WrongParameter(u"The columns of a file to load must be given.")
+        if isinstance(chunk_size, bool) or not isinstance(chunk_size, numbers.Integral) or chunk_size < 1:
+            raise WrongParameter(u"Chunk size must be greater than 0.")
+
+        lookup = self._proceed_lookup(lookup, auto_lookup)
+        queries = self._load_queries(documents, columns, on_duplicate, chunk_size, lookup)
+        abort_codes = [DUPLICATE_ENTRY] if on_duplicate == u"error" else []
+
+        chunks = []
+        try:
+            for loaded_count, warnings in self._connection.execute_load(queries, abort_codes):
+                chunks.append({
+                    u"rows": loaded_count,
+                    u"warnings": [
+                        {u"level": level, u"code": code, u"message": message}
+                        for level, code, message in warnings
+                    ]
+                })
+        finally:
+            queries.close()
+            self._invalidate_results()
+
+        loaded_count = sum(chunk[u"rows"] for chunk in chunks)
+        duplicates = [
+            warning[u"message"] for warning in (chunks[-1][u"warnings"] if chunks else [])
+            if warning[u"code"] in abort_codes
+        ]
+        if duplicates:
+            raise IntegrityException(
+                duplicates[0],
+                payload={u"loaded_count": loaded_count, u"chunks": chunks}
+            )
+
+        return LoadResult(loaded_count=loaded_count, chunks=chunks)
+
+    def _load_chunks(self, documents, columns, chunk_size, lookup):
+        """
+        Split the rows to load in chunks.
+        Yields:
+            (list of unicode, list of bytes): The columns of a chunk and its encoded rows.
+        """
+        if hasattr(documents, u"read"):
+            lines = iter(documents)
+            while True:
+                chunk = list(itertools.islice(lines, chunk_size))
+                if not chunk:
+                    return
+                chunk = [line if isinstance(line, bytes) else line.encode(u"utf-8") for line in chunk]
+                if not chunk[-1].endswith(b"\n"):
+                    chunk[-1] += b"\n"
+                yield columns, chunk
+
+        documents = iter(documents)
+        while True:
+            chunk = list(itertools.islice(documents, chunk_size))
+            if not chunk:
+                return
+            insert = self._api_serializer.decode_insert_many(self.table_name, chunk, lookup)
+            indexes = [
+                index for index, field in enumerate(insert.fields)
+                if columns is None or field.column.name in columns
+            ]
+
+            # LOAD DATA has no DEFAULT value : the rows missing the same columns are loaded together.
+            rows = ([row[index] for index in indexes] for row in insert.rows)
+            for _, group in itertools.groupby(rows, key=lambda row: tuple(value is DEFAULT for value in row)):
+                group = list(group)
+                kept = [position for position, value in enumerate(group[0]) if value is not DEFAULT]
+                yield (
+                    [insert.fields[indexes[position]].column.name for position in kept],
+                    [self._sql_serializer.encode_load_row([row[position] for position in kept]) for row in group]
+                )
+
+    def _load_queries(self, documents, columns, on_duplicate, chunk_size, lookup):
+        """
+        Write each chunk to load to a temporary file, overwritten by the next one.
+        Yields:
+            (unicode, list): The LOAD DATA query of each chunk and the values to inject in it.
+        """
+        descriptor, file_name = tempfile.mkstemp(suffix=u".tsv")
+        os.close(descriptor)
+        try:
+            for chunk_columns, lines in self._load_chunks(documents, columns, chunk_size, lookup):
+                with open(file_name, u"wb") as data_file:
+                    data_file.writelines(lines)
+                yield self._sql_serializer.encode_load_data(
+                    self.table_name, chunk_columns, file_name, on_duplicate
+                )
+        finally:
+            os.remove(file_name)
 
     def update_many(self, query, update, options=None, lookup=None, auto_lookup=0, in_transaction=None):
         """
@@ -237,6 +813,7 @@ class Collection(object):
         sql_cursor = in_transaction.sql_cursor if in_transaction else None
 
         updated_row_id = self._connection.execute(query, values, return_rowcount=True, sql_cursor=sql_cursor)
+        self._invalidate_results(in_transaction)
 
         return UpdateResult(matched_count=updated_row_id, modified_count=updated_row_id)
 
@@ -260,6 +837,7 @@ class Collection(object):
 
         sql_cursor = in_transaction.sql_cursor if in_transaction else None
 
-        return DeleteResult(
-            deleted_count=self._connection.execute(query, values, return_rowcount=True, sql_cursor=sql_cursor)
-        )
+        deleted_count = self._connection.execute(query, values, return_rowcount=True, sql_cursor=sql_cursor)
+        self._invalidate_results(in_transaction)
+
+        return DeleteResult(deleted_count=deleted_count)
@@ -34,6 +34,52 @@ class AbstractConnection(object):
         """
         pass
 
+    @abstractmethod
+    def acquire(self):
+        """
+        Check out a DB connection from the pool.
+        Returns
+            (object): The DB Connection.
+        """
+        pass
+
+    @abstractmethod
+    def release(self, sql_connection, rollback=True):
+        """
+        Give back a DB connection obtained with acquire.
+        Args:
+            sql_connection (object): The DB Connection.
+            rollback (bool): Roll back the pending transaction first.
+        """
+        pass
+
+    @abstractmethod
+    def discard(self, sql_connection):
+        """
+        Close a DB connection obtained with acquire instead of giving it back.
+        Args:
+            sql_connection (object): The DB Connection.
+        """
+        pass
+
+    @abstractmethod
+    def close(self):
+        """
+        Close the idle DB connections.
+        """
+        pass
+
+    @abstractmethod
+    def get_server_variables(self, names):
+        """
+        Get variables of the server.
+        Args:
+            names (list of unicode): The names of the variables.
+        Returns:
+            (dict): The value of each variable.
+        """
+        pass
+
     @abstractmethod
     def execute(self, query, values, return_lastrowid=False, return_rowcount=False):
         """
@@ -43,3 +89,25 @@ class AbstractConnection(object):
             (list): The values to inject in the query.
         """
         pass
+
+    @abstractmethod
+    def execute_stream(self, query, values, batch_size=1000, meta=None):
+        """
+        Execute a query and fetch its result by batches.
+        Args:
+            (unicode): The query.
+            (list): The values to inject in the query.
+            (int): How many rows to fetch at once.
+            (dict): If given, filled with found_rows once the result is exhausted.
+        """
+        pass
+
+    @abstractmethod
+    def execute_load(self, queries, abort_codes=()):
+        """
+        Execute LOAD DATA LOCAL INFILE queries.
+        Args:
+            (iterable of tuple): The queries and the values to inject in them.
+            (list of int): Warning codes rolling back the query and stopping the load.
+        """
+        pass
@@ -8,8 +8,10 @@ import decimal
 from MySQLdb import IntegrityError
 from MySQLdb.constants import FIELD_TYPE
 from MySQLdb.converters import conversions
+from MySQLdb.cursors import SSCursor
 from .sql_exception import IntegrityException
 from .abstract_connection import AbstractConnection
+from .pool import ConnectionPool
 
 conversions[FIELD_TYPE.NEWDECIMAL] = decimal.Decimal
 
@@ -18,9 +20,39 @@ class MySQLConnection(AbstractConnection):
     Implements low level interactions with MySQL.
     """
 
-    def connect(self):
+    def __init__(
+            self,
+            user,
+            password,
+            host=None,
+            unix_socket=None,
+            database=None,
+            pool_size=10,
+            pool_options=None
+    ):
+        """
+        Args:
+            pool_size (int): Maximum number of connections opened at the same time.
+            pool_options (dict): Other ConnectionPool parameters (min_size, idle_timeout,
+                max_lifetime, checkout_timeout).
+        """
+        AbstractConnection.__init__(self, user, password, host, unix_socket, database)
+        self._pool_size = pool_size
+        self._pool_options = pool_options or {}
+        self._server_variables = {}
+        self._pool = ConnectionPool(
+            self.connect,
+            max_size=pool_size,
+            ping=lambda sql_connection: sql_connection.ping(),
+            **self._pool_options
+        )
+
+    def connect(self, local_infile=False):
         """
         Connect to the database. Return a cursor.
+        Args:
+            local_infile (bool): Allow LOAD DATA LOCAL INFILE, which lets the server read
+                files of the client. Pooled connections never do.
         Returns
             (object): The DB Connection.
         """
@@ -37,8 +69,72 @@ class MySQLConnection(AbstractConnection):
         if self._database:
             kwargs[u"db"] = self._database
 
+        if local_infile:
+            kwargs[u"local_infile"] = 1
+
         return MySQLdb.connect(**kwargs)
 
+    def acquire(self):
+        """
+        Check out a DB connection from the pool.
+        Returns
+            (object): The DB Connection.
+        """
+        return self._pool.acquire()
+
+    def release(self, sql_connection, rollback=True):
+        """
+        Give back a DB connection obtained with acquire. The pending transaction
+        is rolled back, a connection which can't is closed. A connection opened before
+        a fork is left untouched, its socket being shared with the parent process.
+        Args:
+            sql_connection (object): The DB Connection.
+            rollback (bool): Roll back the pending transaction. False when the connection
+                was just committed or rolled back, to spare a round trip.
+        """
+        if not rollback or not self._pool.owns(sql_connection):
+            self._pool.release(sql_connection)
+            return
+        try:
+            sql_connection.rollback()
+        except MySQLdb.Error:
+            self._pool.discard(sql_connection)
+        else:
+            self._pool.release(sql_connection)
+
+    def discard(self, sql_connection):
+        """
+        Close a DB connection obtained with acquire instead of giving it back, when
+        its state is unknown.
+        Args:
+            sql_connection (object): The DB Connection.
+        """
+        self._pool.discard(sql_connection)
+
+    def close(self):
+        """
+        Close the idle connections of the pool.
+        """
+        self._pool.close()
+
+    def get_server_variables(self, names):
+        """
+        Get variables of the server. They are read once, then kept.
+        Args:
+            names (list of unicode): The names of the variables.
+        Returns:
+            (dict): The value of each variable.
+        """
+        missing = [name for name in names if name not in self._server_variables]
+        if missing:
+            rows, _ = self.execute(
+                u"SELECT {}".format(u", ".join([u"@@{}".format(name) for name in missing])),
+                []
+            )
+            self._server_variables.update(zip(missing, rows[0]))
+
+        return dict((name, self._server_variables[name]) for name in names)
+
     def to_python_types(self, rows):
         """
         Convert SQL database types coming into Python types.
@@ -72,31 +168,116 @@ class MySQLConnection(AbstractConnection):
         Returns:
             (list, list): Tuple of two : resulting items & result set description.
         """
-        autocommit = False
-        # Open connection
+        sql_connection = None
+        committed = False
+        # Check out a connection
         if not sql_cursor:
-            sql_cursor = self.connect().cursor()
-            autocommit = True
+            sql_connection = self.acquire()
+            sql_cursor = sql_connection.cursor()
+
+        try:
+            # Execute query
+            try:
+                sql_cursor.execute(query, values)
+            except IntegrityError as e:
+                raise IntegrityException(message=e.args[1])
+
+            if return_lastrowid:
+                result = sql_cursor.lastrowid
+
+            elif return_rowcount:
+                result = sql_cursor.rowcount
+
+            else:
+                result = self.to_python_types(list(sql_cursor.fetchall())), sql_cursor.description
+
+            if sql_connection is not None:
+                sql_connection.commit()
+                committed = True
+        finally:
+            if sql_connection is not None:
+                sql_cursor.close()
+                self.release(sql_connection, rollback=not committed)
+
+        return result
+
+    def execute_stream(self, query, values, batch_size=1000, meta=None):
+        """
+        Execute a query on an unbuffered server-side cursor and fetch its result by batches,
+        so only one batch is held in memory at a time. When the consumer stops early, the
+        rows left are drained before the connection is given back to the pool.
+        Args:
+            query (unicode): The query.
+            values (list): The values to inject in the query.
+            batch_size (int): How many rows to fetch at once.
+            meta (dict): If given, FOUND_ROWS() is read on the same connection once the
+                result is exhausted and set under the key found_rows.
+
+        Yields:
+            (list, list): Tuple of two : a batch of items & result set description.
+        """
+        sql_connection = self.acquire()
+        sql_cursor = sql_connection.cursor(SSCursor)
+        exhausted = False
 
-        # Execute query
         try:
             sql_cursor.execute(query, values)
-        except IntegrityError as e:
-            raise IntegrityException(message=e[1])
+            while True:
+                rows = sql_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield self.to_python_types(list(rows)), sql_cursor.description
 
-        if return_lastrowid:
-            result = sql_cursor.lastrowid
+            if meta is not None:
+                sql_cursor.close()
+                sql_cursor = sql_connection.cursor()
+                sql_cursor.execute(u"SELECT FOUND_ROWS()")
+                meta[u"found_rows"] = int(sql_cursor.fetchone()[0])
 
-        elif return_rowcount:
-            result = sql_cursor.rowcount
+            exhausted = True
+        finally:
+            try:
+                if not exhausted:
+                    # The consumer stopped early: the unread rows pending on the socket are
+                    # read and dropped, so that the connection can go back to the pool.
+                    while sql_cursor.fetchmany(batch_size):
+                        pass
+                sql_cursor.close()
+            except Exception:
+                # The connection can't be reused.
+                self.discard(sql_connection)
+            else:
+                self.release(sql_connection)
 
-        else:
+    def execute_load(self, queries, abort_codes=()):
+        """
+        Execute LOAD DATA LOCAL INFILE queries on a dedicated connection, opened for them
+        with local_infile. Each query is committed on its own.
+        Args:
+            queries (iterable of tuple): The queries and the values to inject in them.
+            abort_codes (list of int): Warning codes rolling back the query and stopping the load.
 
-            result = self.to_python_types(list(sql_cursor.fetchall())), sql_cursor.description
+        Yields:
+            (int, list of tuple): The number of rows loaded by each query, 0 when it was
+                rolled back, and its warnings as (level, code, message).
+        """
+        sql_connection = self.connect(local_infile=True)
+        try:
+            sql_cursor = sql_connection.cursor()
+            for query, values in queries:
+                sql_cursor.execute(query, values)
+                loaded_count = sql_cursor.rowcount
+                warnings = []
+                if sql_connection.warning_count():
+                    sql_cursor.execute(u"SHOW WARNINGS")
+                    warnings = list(sql_cursor.fetchall())
 
-        if autocommit and return_lastrowid or return_rowcount:
-            sql_cursor.connection.commit()
-            sql_cursor.connection.close()
-            sql_cursor.close()
+                if any(code in abort_codes for _, code, _ in warnings):
+                    sql_connection.rollback()
+                    yield 0, warnings
+                    return
 
-        return result
+                sql_connection.commit()
+                yield loaded_count, warnings
+        finally:
+            sql_connection.close()
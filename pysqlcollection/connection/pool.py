@@ -0,0 +1,279 @@
+# coding: utf-8
+"""
+This file contains ConnectionPool class.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from .sql_exception import PoolTimeoutException
+
+# Held while a pool drops the state inherited from the parent process.
+_fork_lock = threading.Lock()
+
+
+class ConnectionPool(object):
+    """
+    Bounded and thread-safe pool of database connections.
+
+    The pool is also fork-safe : a child process does not reuse the connections
+    opened by its parent, whose sockets are shared, and opens its own instead.
+    """
+
+    def __init__(
+            self,
+            factory,
+            min_size=0,
+            max_size=10,
+            idle_timeout=300,
+            max_lifetime=3600,
+            checkout_timeout=30,
+            ping=None
+    ):
+        """
+        Args:
+            factory (callable): Called without argument to open a new connection.
+            min_size (int): Number of idle connections kept open even when they time out.
+            max_size (int): Maximum number of connections opened at the same time.
+            idle_timeout (float): Seconds after which an idle connection is closed.
+            max_lifetime (float): Seconds after which a connection is closed, used or not.
+            checkout_timeout (float): Seconds to wait for a free connection before failing.
+            ping (callable): Called with a connection on checkout, must raise if the
+                connection is dead.
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(u"Pool sizes must respect 0 <= min_size <= max_size and max_size >= 1.")
+
+        self._factory = factory
+        self._ping = ping
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+
+        self._condition = threading.Condition(threading.Lock())
+        # Idle connections as (connection, released_at), most recently released on the right.
+        self._idle = deque()
+        # Creation time of every opened connection, by id.
+        self._created_at = {}
+        self._size = 0
+        # Process owning the connections.
+        self._pid = os.getpid()
+        # Connections opened by a parent process, never used nor closed here.
+        self._inherited = []
+        # Ids of the connections checked out in the parent process when it forked.
+        self._inherited_ids = set()
+
+    @property
+    def size(self):
+        """
+        Returns:
+            (int): Number of connections currently opened, idle or checked out.
+        """
+        self._check_pid()
+        return self._size
+
+    @property
+    def idle_count(self):
+        """
+        Returns:
+            (int): Number of connections waiting in the pool.
+        """
+        self._check_pid()
+        return len(self._idle)
+
+    def _check_pid(self):
+        """
+        Drop the connections of the parent process after a fork. Closing them would end
+        the sessions of the parent, so they are only kept referenced : a connection
+        garbage collected is closed too.
+        """
+        if self._pid == os.getpid():
+            return
+
+        with _fork_lock:
+            if self._pid == os.getpid():
+                return
+            self._inherited.extend(connection for connection, _ in self._idle)
+            idle_ids = set(id(connection) for connection, _ in self._idle)
+            self._inherited_ids.update(key for key in self._created_at if key not in idle_ids)
+            # The lock may have been held by a thread of the parent, which does not exist here.
+            self._condition = threading.Condition(threading.Lock())
+            self._idle = deque()
+            self._created_at = {}
+            self._size = 0
+            self._pid = os.getpid()
+
+    def _is_inherited(self, connection):
+        """
+        Keep a connection checked out before a fork, given back in the child process.
+        Returns:
+            (bool): Whether the connection belongs to the parent process.
+        """
+        if id(connection) not in self._inherited_ids:
+            return False
+        self._inherited_ids.discard(id(connection))
+        self._inherited.append(connection)
+        return True
+
+    def _is_expired(self, connection, now):
+        created_at = self._created_at.get(id(connection), now)
+        return self.max_lifetime is not None and now - created_at >= self.max_lifetime
+
+    def _forget(self, connection):
+        """
+        Remove a connection from the accounting. Must be called with the lock held.
+        """
+        self._created_at.pop(id(connection), None)
+        self._size -= 1
+        self._condition.notify()
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _prune(self, now):
+        """
+        Take out of the pool the idle connections which expired. Must be called with the lock held.
+        Returns:
+            (list): The connections to close.
+        """
+        to_close = []
+        kept = deque()
+        while self._idle:
+            connection, released_at = self._idle.popleft()
+            idle_for_too_long = (
+                self.idle_timeout is not None and
+                now - released_at >= self.idle_timeout and
+                len(kept) + len(self._idle) >= self.min_size
+            )
+            if idle_for_too_long or self._is_expired(connection, now):
+                self._forget(connection)
+                to_close.append(connection)
+            else:
+                kept.append((connection, released_at))
+        self._idle = kept
+        return to_close
+
+    def acquire(self):
+        """
+        Check out a connection, opening a new one if the pool is not full.
+        Returns:
+            (object): A live connection.
+        """
+        self._check_pid()
+        deadline = time.time() + self.checkout_timeout if self.checkout_timeout is not None else None
+
+        while True:
+            connection = None
+            to_close = []
+            with self._condition:
+                while connection is None:
+                    to_close += self._prune(time.time())
+                    if self._idle:
+                        connection, _ = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1
+                        break
+                    else:
+                        remaining = deadline - time.time() if deadline is not None else None
+                        if remaining is not None and remaining <= 0:
+                            for item in to_close:
+                                self._close_quietly(item)
+                            raise PoolTimeoutException(
+                                u"No database connection available after {} seconds.".format(
+                                    self.checkout_timeout
+                                )
+                            )
+                        self._condition.wait(remaining)
+
+            for item in to_close:
+                self._close_quietly(item)
+
+            if connection is None:
+                try:
+                    connection = self._factory()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._created_at[id(connection)] = time.time()
+                return connection
+
+            if self._is_alive(connection):
+                return connection
+
+            self.discard(connection)
+
+    def _is_alive(self, connection):
+        if self._ping is None:
+            return True
+        try:
+            self._ping(connection)
+        except Exception:
+            return False
+        return True
+
+    def owns(self, connection):
+        """
+        Args:
+            connection (object): A connection obtained with acquire.
+        Returns:
+            (bool): Whether the connection was opened by this process, so it can be used.
+        """
+        self._check_pid()
+        return id(connection) in self._created_at
+
+    def release(self, connection):
+        """
+        Give back a connection to the pool.
+        Args:
+            connection (object): A connection obtained with acquire.
+        """
+        self._check_pid()
+        with self._condition:
+            if id(connection) not in self._created_at:
+                self._is_inherited(connection)
+                return
+            if not self._is_expired(connection, time.time()):
+                self._idle.append((connection, time.time()))
+                self._condition.notify()
+                return
+            self._forget(connection)
+
+        self._close_quietly(connection)
+
+    def discard(self, connection):
+        """
+        Close a checked out connection instead of giving it back, when it is broken.
+        Args:
+            connection (object): A connection obtained with acquire.
+        """
+        self._check_pid()
+        with self._condition:
+            if id(connection) not in self._created_at:
+                self._is_inherited(connection)
+                return
+            self._forget(connection)
+
+        self._close_quietly(connection)
+
+    def close(self):
+        """
+        Close every idle connection.
+        """
+        self._check_pid()
+        with self._condition:
+            idle = [connection for connection, _ in self._idle]
+            self._idle = deque()
+            for connection in idle:
+                self._forget(connection)
+
+        for connection in idle:
+            self._close_quietly(connection)
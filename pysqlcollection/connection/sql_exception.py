@@ -39,3 +39,36 @@ class IntegrityException(DatabaseException):
             api_error_code,
             payload
         )
+
+
+class PoolTimeoutException(DatabaseException):
+    """
+    Raise when no connection could be checked out of the pool in time.
+    """
+    def __init__(self, message, api_error_code=u"POOL_TIMEOUT", payload=None):
+        DatabaseException.__init__(
+            self,
+            message,
+            503,
+            api_error_code,
+            payload
+        )
+
+
+class BulkWriteException(DatabaseException):
+    """
+    Raise when some batches of a bulk write failed.
+    """
+    def __init__(self, message, inserted_ids, errors, api_error_code=u"BULK_WRITE_ERROR"):
+        DatabaseException.__init__(
+            self,
+            message,
+            422,
+            api_error_code,
+            {
+                u"inserted_ids": inserted_ids,
+                u"errors": errors
+            }
+        )
+        self.inserted_ids = inserted_ids
+        self.errors = errors
@@ -3,13 +3,18 @@
 This file contains Cursor class
 """
 
+import copy
 import json
-import calendar
-from datetime import datetime
+import numbers
+import base64
 from .serializer.api_type import (
     Select,
     Insert
 )
+from .serializer.api_exception import WrongParameter
+from .row_builder import RowBuilder
+from .grouper import DocumentGrouper
+from .exporter import DocumentWriter
 from .utils import json_get, json_set
 
 
@@ -18,15 +23,60 @@ class Cursor(object):
     Handle interactions with result set from DB.
     """
 
-    def __init__(self, sql_serializer, api_serializer, connection, statement, lookup=None):
+    def __init__(
+            self,
+            sql_serializer,
+            api_serializer,
+            connection,
+            statement,
+            lookup=None,
+            batched_lookup=None,
+            json_documents=False,
+            result_cache=None,
+            database_name=None,
+            replicated_lookup=None,
+            paginate=True
+    ):
+        """
+        Args:
+            sql_serializer: The serializer to translate to SQL requests.
+            api_serializer: The serializer from api to neutral language.
+            connection: The object which interacts with Database.
+            statement: The statement to execute.
+            lookup (list of dict): The lookups joined in the statement.
+            batched_lookup (list of tuple): The (multiple lookup, nested lookups) pairs
+                fetched with their own queries once the documents are read.
+            json_documents (bool): Let the server build each document as one JSON value
+                when it can.
+            result_cache (ResultCache): The cache of find and count results, None to disable it.
+            database_name (unicode): The database queried, to scope the cached results.
+            replicated_lookup (list of tuple): The (simple lookup, Replica) pairs filled from
+                in memory copies of their tables while the documents are built.
+            paginate (bool): Apply limit and skip.
+        """
         self._sql_serializer = sql_serializer
         self._api_serializer = api_serializer
         self.statement = statement
         self._lookup = lookup or []
+        self._batched_lookup = batched_lookup or []
+        # Maximum number of values in the IN list of a batched lookup query.
+        self._in_size = 1000
+        self._replicated_lookup = replicated_lookup or []
+        self._paginate = paginate
+        self._json_documents = json_documents
+        self._result_cache = result_cache
+        self._database_name = database_name
         self._connection = connection
         self._executed = False
         self._items = []
+        self._batch_size = 1000
+        self._row_builder = None
         self.inserted_id = None
+        # Token to give to after() to get the page following the iterated one.
+        self.next_token = None
+        self._with_total = False
+        # Number of rows without limit and skip, known once iterated with_total.
+        self.total = None
 
     def limit(self, limit):
         """
@@ -39,11 +89,69 @@ class Cursor(object):
 
         return self
 
-    def count(self, with_limit_and_skip=False):
+    def count(self, with_limit_and_skip=False, approximate=False):
+        """
+        Count the rows of the cursor.
+        Args:
+            with_limit_and_skip (bool): Count only the rows of the current page.
+            approximate (bool): Return the estimate of MySQL instead of counting, from
+                the table statistics when nothing is filtered, from EXPLAIN otherwise.
+        Returns:
+            (int): The number of rows.
+        """
         if isinstance(self.statement, Select):
-            query, values = self._sql_serializer.encode_select_count(self.statement, with_limit_and_skip)
+            statement = self._count_statement()
+            if approximate:
+                count = self._estimate_count(statement)
+                if with_limit_and_skip:
+                    count = max(0, count - (self.statement.offset or 0))
+                    if self.statement.limit is not None:
+                        count = min(count, self.statement.limit)
+                return count
+
+            query, values = self._sql_serializer.encode_select_count(statement, with_limit_and_skip)
+            key = (u"count", query, tuple(values))
+            if self._result_cache is not None:
+                count = self._result_cache.get(self._database_name, key)
+                if count is not None:
+                    return count
+
+            rows, _ = self._connection.execute(query, values)
+            count = int(rows[0][0])
+            if self._result_cache is not None:
+                self._result_cache.put(self._database_name, key, count, self._table_names())
+            return count
+
+    def _count_statement(self):
+        """
+        Get the statement to count. Multiple lookups don't add rows to the documents
+        built by the server.
+        """
+        if not self._json_documents:
+            return self.statement
+        statement = copy.copy(self.statement)
+        # The joins made from the tables of multiple lookups go with them.
+        statement.joins = self._sql_serializer.without_multiple_joins(statement.joins)
+        return statement
+
+    def _estimate_count(self, statement):
+        """
+        Get the estimated number of rows of a statement, ignoring pagination.
+        """
+        filter_fields = self._sql_serializer.filter_fields(statement.filters)
+        statement = copy.copy(statement)
+        statement.joins = self._sql_serializer.without_multiple_joins(
+            statement.joins, [field.table.alias for field in filter_fields]
+        )
+        needed_joins = self._sql_serializer.prune_joins(statement, filter_fields)
+        if len(filter_fields) == 0 and statement.after is None and len(needed_joins) == 0:
+            query, values = self._sql_serializer.get_table_rows(statement.table.name)
             rows, _ = self._connection.execute(query, values)
-            return int(rows[0][0])
+            return int(rows[0][0] or 0) if rows else 0
+
+        query, values = self._sql_serializer.encode_explain_count(statement)
+        rows, description = self._connection.execute(query, values)
+        return self._sql_serializer.interpret_explain(rows, description)
 
     def sort(self, key_or_list, direction=None):
         """
@@ -56,8 +164,49 @@ class Cursor(object):
         """
         if isinstance(self.statement, Select):
             self.statement = self._api_serializer.decode_sort(self.statement, key_or_list, direction)
+            if self.statement.after is not None:
+                self.statement = self._api_serializer.decode_after(self.statement, self.statement.after)
         return self
 
+    def after(self, values_or_token):
+        """
+        Start after a row in the sort order instead of skipping rows, so every page
+        costs the same (keyset pagination). The primary key is added to the sorts.
+        Args:
+            values_or_token (list or unicode): The values of the sorted fields of the row
+                to start after, primary key last, or the next_token of the previous page.
+                None for the first page.
+        Return:
+            (Cursor): The updated cursor.
+        """
+        values = values_or_token
+        if values is not None and not isinstance(values, (list, tuple)):
+            try:
+                values = json.loads(base64.urlsafe_b64decode(values.encode(u"ascii")).decode(u"utf-8"))
+            except (AttributeError, TypeError, ValueError):
+                raise WrongParameter(u"After needs a list of values or a token.")
+
+        if isinstance(self.statement, Select):
+            self.statement = self._api_serializer.decode_after(self.statement, values)
+        return self
+
+    def _next_token(self, document):
+        """
+        Get the token of the page starting after a document.
+        Args:
+            document (dict): The last document of the page.
+        Returns:
+            (unicode): The token, None if a sorted field is not displayed.
+        """
+        missing = object()
+        values = [
+            json_get(document, sort.field.alias, missing)
+            for sort in self._api_serializer.keyset_sorts(self.statement)
+        ]
+        if len(values) == 0 or any(value is missing for value in values):
+            return None
+        return base64.urlsafe_b64encode(json.dumps(values).encode(u"utf-8")).decode(u"ascii")
+
     def skip(self, skip):
         """
         Skip items.
@@ -69,65 +218,19 @@ class Cursor(object):
 
         return self
 
-    # def _old_deduplicate(self, items, prim_key, duplicated, foreign_key):
-    #     items = list(items)
-    #     last_key = None
-    #     last_duplicated_key = None
-    #     output = []
-    #     first = True
-    #     acc = []
-    #     found_relations = []
-    #
-    #     for index, item in reversed(list(enumerate(items))):
-    #         key = json_get(item, prim_key)
-    #         duplicated_key = json_get(item,  u"{}.{}".format(duplicated, foreign_key))
-    #         if key != last_key and not first or index == 0:
-    #             if index == 0:
-    #                 acc.insert(0, json_get(item, duplicated))
-    #
-    #             output.insert(0, acc)
-    #             acc = []
-    #             last_duplicated_key = None
-    #             if index == 0:
-    #                 break
-    #
-    #         if foreign_key != last_duplicated_key:
-    #             acc.insert(0, json_get(item, duplicated))
-    #
-    #         first = False
-    #
-    #         last_key = key
-    #         last_duplicated_key = duplicated_key
-    #
-    #         del items[-1]
-    #
-    #     return output
-
     def _deduplicate(self, items, prim_key, duplicated, foreign_primary_key):
-        prim_key_path = prim_key
-        foreign_key_path = u"{}.{}".format(duplicated, foreign_primary_key)
-        relations = {}
-
-        for index, item in reversed(list(enumerate(items))):
-            prim_key = json_get(item, prim_key_path)
-            duplicated_key = json_get(item, foreign_key_path)
-            relation_key = u"{}:{}".format(prim_key, duplicated_key)
-
-            if prim_key not in relations:
-                relations[prim_key] = {}
-
-            if relation_key not in relations[prim_key] and duplicated_key:
-                relations[prim_key][relation_key] = json_get(item, duplicated)
-
-            del items[-1]
-
-        output = []
-        for item_key in relations:
-            foreign_list = []
-            for foreign_primary_key in relations[item_key]:
-                foreign_list.append(relations[item_key][foreign_primary_key])
-            output.append(foreign_list)
-        return output
+        """
+        Gather the documents of a multiple lookup by root document.
+        Args:
+            items (list of dict): The documents, one per joined row.
+            prim_key (unicode): Path of the key of the root documents.
+            duplicated (unicode): Path of the joined documents.
+            foreign_primary_key (unicode): Key of the joined documents.
+        Returns:
+            (list of list): The joined documents of each root document, in order of appearance.
+        """
+        grouper = DocumentGrouper(prim_key, [(duplicated, foreign_primary_key)])
+        return [json_get(document, duplicated) for document in grouper.group(items)]
 
     def dedup_ids(self, items, key):
 
@@ -139,31 +242,308 @@ class Cursor(object):
         return items
 
     def deduplication(self, items):
+        """
+        Fold the documents of the multiple lookups given to the cursor.
+        Args:
+            items (list of dict): The documents, one per joined row.
+        Returns:
+            (list of dict): One document per root key.
+        """
+        lookups = [
+            (look.get(u"as"), look.get(u"foreignPrimaryKey", u"id"))
+            for look in self._lookup if look.get(u"type") == u"multiple"
+        ]
+        return list(DocumentGrouper(u"id", lookups).group(items))
 
-        lookup_to_deduplicate = [look for look in self._lookup if look.get(u"type") == u"multiple"]
-        items = sorted(items, key=lambda item: item.get(u"id"))
-        dedup_items = self.dedup_ids(list(items), u"id")
+    def with_total(self, with_total=True):
+        """
+        Count the rows without limit and skip in the same statement as the page. The
+        count is available in the total attribute once the cursor is iterated. It takes
+        a second query, like count does, when multiple lookups are folded in the documents
+        or when a skipped page is empty and tells nothing about the rows before it.
+        Args:
+            with_total (bool): Count or not.
+        Return:
+            (Cursor): The updated cursor.
+        """
+        self._with_total = with_total
+        return self
 
-        for look in lookup_to_deduplicate:
+    def _grouper(self):
+        """
+        Get the grouping stage folding the rows of multiple lookups, None if there
+        is nothing to fold.
+        """
+        statement = self.statement
+        if self._json_documents:
+            return None
+        multiple_joins = [join for join in statement.joins if join.type == u"multiple"]
+        key = self._sql_serializer.root_key(statement.table)
+        if len(multiple_joins) == 0 or key is None:
+            return None
+        root_keys = [
+            field for field in statement.fields
+            if field.table.alias == statement.table.alias and field.column.name == key.name
+        ]
+        if not root_keys or not root_keys[0].display:
+            raise WrongParameter(
+                u"The primary key '{}' is needed to gather the documents of multiple lookups, "
+                u"it can't be projected out.".format(key.name)
+            )
 
-            foreign_items = self._deduplicate(
-                list(items),
-                look.get(u"localField"),
-                look.get(u"as"),
-                look.get(u"foreignPrimaryKey", u"id")
+        aliases = [join.as_alias for join in multiple_joins]
+        lookups = []
+        nested_lookups = {}
+        # Parents first, the lookups nested in a multiple lookup being folded in its documents.
+        for join in sorted(multiple_joins, key=lambda join: join.as_alias.count(u".")):
+            key_path = None
+            for field in statement.fields:
+                if field.display and field.table.alias == join.to_table.alias and field.column.key == u"pri":
+                    key_path = field.alias[len(join.as_alias) + 1:]
+                    break
+            parents = [alias for alias in aliases if join.as_alias.startswith(u"{}.".format(alias))]
+            nested = nested_lookups[join.as_alias] = []
+            if parents:
+                parent = max(parents, key=len)
+                nested_lookups[parent].append((join.as_alias[len(parent) + 1:], key_path, nested))
+            else:
+                lookups.append((join.as_alias, key_path, nested))
+
+        contiguous = False
+        for sort in statement.sorts:
+            if sort.field.alias == root_keys[0].alias:
+                contiguous = True
+            if sort.field.alias == root_keys[0].alias or sort.field.table.alias != statement.table.alias:
+                break
+
+        return DocumentGrouper(root_keys[0].alias, lookups, contiguous)
+
+    def _stream(self, use_cache=True, paginate=None):
+        """
+        Execute the statement and yield the documents while the rows arrive.
+        Args:
+            use_cache (bool): Read and fill the result cache, if there is one.
+            paginate (bool): Apply limit and skip, as set on the cursor by default.
+        """
+        if paginate is None:
+            paginate = self._paginate
+        if isinstance(self.statement, Select):
+            self._use_json_documents()
+            key = None
+            cached = None
+            if self._result_cache is not None and use_cache:
+                key = self._result_key(paginate)
+                cached = self._result_cache.get(self._database_name, key)
+
+            if cached is not None:
+                # Documents are copied so callers can't alter the cached ones.
+                documents, self.total = copy.deepcopy(cached)
+            else:
+                grouper = self._grouper()
+                if grouper is None:
+                    if self._with_total:
+                        documents = self._stream_with_total(paginate)
+                    else:
+                        documents = self._stream_rows(paginate)
+                else:
+                    if self._with_total:
+                        # The totals of the page query count joined rows, not the folded documents.
+                        self.total = self.count()
+                    documents = grouper.group(self._stream_rows(paginate))
+                if self._replicated_lookup:
+                    documents = self._fill_replicated(documents)
+                if self._batched_lookup or key is not None:
+                    # The page is read first, so its connection is released before the lookups run.
+                    documents = list(documents)
+                for look, nested_lookup in self._batched_lookup:
+                    self._fetch_lookup(documents, look, nested_lookup)
+                if key is not None:
+                    self._result_cache.put(
+                        self._database_name, key, copy.deepcopy((documents, self.total)), self._table_names()
+                    )
+
+            document = None
+            for document in documents:
+                yield document
+
+            self.next_token = self._next_token(document) if document is not None else None
+
+    def _result_key(self, paginate):
+        """
+        Get the key of the result of the statement in the result cache.
+        Args:
+            paginate (bool): Limit and skip are applied.
+        """
+        query, values = self._encode(paginate)
+        return (
+            u"find",
+            query,
+            tuple(values),
+            self._with_total,
+            self._api_serializer.freeze(self._batched_lookup),
+            self._api_serializer.freeze([look for look, _ in self._replicated_lookup])
+        )
+
+    def _table_names(self):
+        """
+        Get the names of the tables the results are read from.
+        """
+        table_names = set([self.statement.table.name])
+        table_names.update(join.to_table.name for join in self.statement.joins)
+        for look, nested_lookup in self._batched_lookup:
+            table_names.update(nested[u"from"] for nested in [look] + nested_lookup)
+        table_names.update(look[u"from"] for look, _ in self._replicated_lookup)
+        return table_names
+
+    def _fill_replicated(self, documents):
+        """
+        Set the documents of the replicated lookups from the in memory copies of their tables.
+        Args:
+            documents (iterable of dict): The documents.
+        Yields:
+            (dict): The filled documents.
+        """
+        paths = []
+        for look, replica in self._replicated_lookup:
+            if look[u"to"] == self.statement.table.name:
+                local_path = look[u"localField"]
+            else:
+                local_path = u"{}.{}".format(look[u"to"], look[u"localField"])
+            paths.append((local_path, look[u"as"], replica))
+
+        for document in documents:
+            for local_path, as_path, replica in paths:
+                key = json_get(document, local_path)
+                if local_path != as_path:
+                    # A join gives the key in the joined document only.
+                    parent = json_get(document, local_path.rpartition(u".")[0]) if u"." in local_path else document
+                    if isinstance(parent, dict):
+                        parent.pop(local_path.rpartition(u".")[2], None)
+                json_set(document, as_path, replica.get(key))
+            yield document
+
+    def _fetch_lookup(self, documents, look, nested_lookup):
+        """
+        Fetch the documents of a multiple lookup with IN queries and set them in the
+        documents they belong to.
+        Args:
+            documents (list of dict): The documents of the page.
+            look (dict): The multiple lookup.
+            nested_lookup (list of dict): The lookups of the fetched documents.
+        """
+        if look[u"to"] == self.statement.table.name:
+            local_path = look[u"localField"]
+        else:
+            local_path = u"{}.{}".format(look[u"to"], look[u"localField"])
+
+        keys = []
+        seen = set()
+        for document in documents:
+            key = json_get(document, local_path)
+            if key is not None and key not in seen:
+                seen.add(key)
+                keys.append(key)
+
+        joined_lookup, batched_lookup = self._api_serializer.split_batch_lookup(look[u"from"], nested_lookup)
+        children = {}
+        for start in range(0, len(keys), self._in_size):
+            select = self._api_serializer.decode_find(
+                look[u"from"],
+                {look[u"foreignField"]: {u"$in": keys[start:start + self._in_size]}},
+                None,
+                joined_lookup
             )
-            for index, foreign_item in enumerate(foreign_items):
+            cursor = Cursor(
+                self._sql_serializer, self._api_serializer, self._connection,
+                select, joined_lookup, batched_lookup, paginate=False
+            ).batch_size(self._batch_size)
+            for child in cursor:
+                children.setdefault(json_get(child, look[u"foreignField"]), []).append(child)
 
-                json_set(dedup_items[index], look.get(u"as"), foreign_items[index])
+        for document in documents:
+            json_set(document, look[u"as"], list(children.get(json_get(document, local_path), [])))
 
+    def _use_json_documents(self):
+        """
+        Keep building the documents client side if the server can't build them.
+        """
+        if self._json_documents:
+            version = self._connection.get_server_variables([u"version"])[u"version"]
+            self._json_documents = self._sql_serializer.supports_json_documents(version)
 
-        return dedup_items
+    def _encode(self, with_limit_and_skip=True, total=None):
+        """
+        Encode the statement, as rows or as JSON documents.
+        """
+        if self._json_documents:
+            return self._sql_serializer.encode_json_select(self.statement, with_limit_and_skip, total)
+        return self._sql_serializer.encode_select(self.statement, with_limit_and_skip, total)
+
+    def _row_decoder(self, description):
+        """
+        Get the function turning a row into a document.
+        Args:
+            description (list of tuple): The result set description.
+        Returns:
+            (callable): The function.
+        """
+        if self._json_documents:
+            # Integers are given as floats, like the row builder does.
+            return lambda row: json.loads(row[0], parse_int=float)
+        return self.get_row_builder(description).build
+
+    def _stream_rows(self, paginate):
+        """
+        Execute the statement and yield the document of each row.
+        Args:
+            paginate (bool): Apply limit and skip.
+        """
+        query, values = self._encode(paginate)
+        for rows, description in self._connection.execute_stream(query, values, self._batch_size):
+            build = self._row_decoder(description)
+            for row in rows:
+                yield build(row)
+
+    def _stream_with_total(self, paginate):
+        """
+        Execute the statement counting its unpaged rows, yield the documents and set total.
+        Args:
+            paginate (bool): Apply limit and skip.
+        """
+        version = self._connection.get_server_variables([u"version"])[u"version"]
+        strategy = self._sql_serializer.total_strategy(version)
+        query, values = self._encode(paginate, total=strategy)
+
+        if strategy == u"found_rows":
+            meta = {}
+            for rows, description in self._connection.execute_stream(
+                    query, values, self._batch_size, meta=meta
+            ):
+                build = self._row_decoder(description)
+                for row in rows:
+                    yield build(row)
+            self.total = meta.get(u"found_rows")
+            return
+
+        total = None
+        for rows, description in self._connection.execute_stream(query, values, self._batch_size):
+            # The count is the last column.
+            build = self._row_decoder(description[:-1])
+            for row in rows:
+                total = int(row[-1])
+                yield build(row[:-1])
+
+        if total is None:
+            # An empty page tells nothing about the rows it skipped.
+            skipped = self.statement.offset or self.statement.after is not None
+            total = self.count() if skipped else 0
+        self.total = total
 
     def serialize(self):
-        if isinstance(self.statement, Select):
-            query, values = self._sql_serializer.encode_select(self.statement)
-            rows, description = self._connection.execute(query, values)
-            self._items = self._items = [self.to_json(row, description) for row in rows] # self.deduplication(items=[self.to_json(row, description) for row in rows])
+        """
+        Execute the statement and keep all the documents in memory.
+        """
+        self._items = list(self._stream())
         self._executed = True
 
     def json_set(self, item, path, value):
@@ -185,23 +565,106 @@ class Cursor(object):
             item[tab[0]] = self.json_set(item[tab[0]], u".".join(tab[1:]), value)
         return item
 
-    def to_json(self, row, description):
-        output = {}
-        for index, value in enumerate(row):
-            if isinstance(value, long):
-                value = float(value)
-            elif isinstance(value, datetime):
-                value =  calendar.timegm(value.utctimetuple())
+    def get_row_builder(self, description):
+        """
+        Get the row builder of a result set description, compiled once per description.
+        Args:
+            description (list of tuple): The result set description.
+        Returns:
+            (RowBuilder): The row builder.
+        """
+        if self._row_builder is None or self._row_builder.description != description:
+            fields = self.statement.fields if isinstance(self.statement, Select) else None
+            self._row_builder = RowBuilder(description, fields)
+        return self._row_builder
 
-            output = self.json_set(item=output, path=description[index][0], value=value)
-        return output
+    def to_json(self, row, description):
+        return self.get_row_builder(description).build(row)
 
     def batch_size(self, batch_size):
+        """
+        Set how many rows are fetched from the server at once while iterating.
+        Args:
+            batch_size (int): Number of rows per fetch.
+        Return:
+            (Cursor): The updated cursor.
+        """
+        if not isinstance(batch_size, numbers.Integral) or batch_size < 1:
+            raise WrongParameter(u"Batch size must be greater than 0.")
         self._batch_size = batch_size
+        return self
+
+    def export(self, fileobj, format=u"ndjson", batch_size=None, with_limit_and_skip=False):
+        """
+        Write the documents to a file while the rows arrive, without keeping them in memory.
+        Args:
+            fileobj (file): Where to write. Text files are given unicode, the others UTF-8 bytes.
+            format (unicode): "ndjson" for one JSON document per line, "csv" for one column
+                per field, the fields of lookups being named by their dotted path.
+            batch_size (int): Number of rows fetched from the server at once.
+            with_limit_and_skip (bool): Export only the current page instead of every document.
+        Returns:
+            (dict): The number of rows and of bytes written.
+        """
+        if batch_size is not None:
+            self.batch_size(batch_size)
+        columns = None
+        if format == u"csv" and isinstance(self.statement, Select):
+            self._use_json_documents()
+            columns = self._export_columns()
+        writer = DocumentWriter(fileobj, format, columns=columns)
+
+        for document in self._stream(use_cache=False, paginate=self._paginate and with_limit_and_skip):
+            writer.write(document)
+        writer.flush()
+
+        return {
+            u"rows": writer.rows,
+            u"bytes": writer.bytes
+        }
+
+    def _export_columns(self):
+        """
+        Get the CSV columns of the documents from the statement : the dotted path and the
+        type of each value, the lists of multiple lookups being written as JSON.
+        Returns:
+            (list of tuple): The (path, type) of each column.
+        """
+        statement = self.statement
+        folded = []
+        if self._json_documents or self._grouper() is not None:
+            folded = [join.as_alias for join in statement.joins if join.type == u"multiple"]
+
+        columns = []
+        for field in statement.fields:
+            if not field.display:
+                continue
+            column = (field.alias, field.column.type)
+            for alias in folded:
+                if field.alias.startswith(u"{}.".format(alias)):
+                    column = (alias, u"json")
+                    break
+            if column not in columns:
+                columns.append(column)
+
+        for look, _ in self._batched_lookup:
+            columns.append((look[u"as"], u"json"))
+        for look, replica in self._replicated_lookup:
+            if look[u"to"] == statement.table.name:
+                local_path = look[u"localField"]
+            else:
+                local_path = u"{}.{}".format(look[u"to"], look[u"localField"])
+            if local_path != look[u"as"]:
+                # The key is only given in the replicated document.
+                columns = [column for column in columns if column[0] != local_path]
+            columns += [(u"{}.{}".format(look[u"as"], name), None) for name in replica.field_names]
+        return columns
 
     def __iter__(self):
-        if not self._executed:
-            self.serialize()
+        if self._executed:
+            items = self._items
+        else:
+            items = self._stream()
 
-        for item in self._items:
+        for item in items:
             yield item
@@ -5,40 +5,216 @@ This file contains DB class.
 
 from .collection import Collection
 from .transaction import Transaction
+from .snapshot import column_to_dict, column_from_dict
+from .cache import LRUCache
+from .single_flight import SingleFlight
 
 class DB(object):
     """
     Serialize MySQL requests.
     """
 
-    def __init__(self, api_serializer, sql_serializer, connection):
+    def __init__(
+            self,
+            api_serializer,
+            sql_serializer,
+            connection,
+            bulk_introspection=False,
+            schema=None,
+            collection_cache_size=256,
+            result_cache=None
+    ):
         """
         Args:
             api_serializer (object): The serializer from api to neutral language.
             sql_serializer (object): The serializer from neutral language to SQL.
             connection (AbstractConnection): The object which interacts with Database.
+            bulk_introspection (bool): Load the columns and relations of every table
+                up front, in two queries, instead of one query per table when needed.
+            schema (dict): A schema given by dump_schema, loaded instead of discovering it.
+            collection_cache_size (int): How many Collection objects are kept.
+            result_cache (ResultCache): The cache of find and count results, None to disable it.
         """
         self._api_serialize = api_serializer
         self._sql_serializer = sql_serializer
         self._connection = connection
-        self.discover_tables()
+        self._collections = LRUCache(collection_cache_size)
+        self._result_cache = result_cache
+        # Replica of each replicated table, by table name.
+        self._replicas = {}
+        # Discoveries in flight, shared with the collections.
+        self._single_flight = SingleFlight()
+        # Names of the tables, None until they are discovered.
+        self._table_names = None
+        # Checksum of the schema known in memory, None until computed.
+        self._schema_checksum = None
+        if schema is not None:
+            self.load_schema(schema)
+        elif bulk_introspection:
+            self.discover_schema()
+
+    def __getattr__(self, name):
+        if name.startswith(u"_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    def get_collection(self, table_name):
+        """
+        Get the collection of a table. Collections are created when first used.
+        Args:
+            table_name (unicode): The name of the table.
+        Returns:
+            (Collection): The collection.
+        """
+        collection = self._collections.get(table_name)
+        if collection is None:
+            collection = self._single_flight.run(
+                (u"collection", table_name),
+                lambda: self._create_collection(table_name)
+            )
+        return collection
+
+    def _create_collection(self, table_name):
+        collection = self._collections.get(table_name)
+        if collection is None:
+            collection = Collection(
+                self._api_serialize,
+                self._sql_serializer,
+                self._connection,
+                self._connection._database,
+                table_name,
+                result_cache=self._result_cache,
+                replicas=self._replicas,
+                single_flight=self._single_flight
+            )
+            self._collections.put(table_name, collection)
+        return collection
 
     def discover_tables(self):
+        """
+        Load the names of the tables.
+        Returns:
+            (list of unicode): The names.
+        """
         tables, _ = self._connection.execute(*self._sql_serializer.get_tables())
-        
-        for table in tables:
-            setattr(
-                self,
-                table[0],
-                Collection(
-                    self._api_serialize,
-                    self._sql_serializer,
-                    self._connection,
-                    self._connection._database,
-                    table[0]
-                )
+        self._table_names = [table[0] for table in tables]
+        return self._table_names
+
+    def list_collection_names(self):
+        """
+        Returns:
+            (list of unicode): The names of the tables, discovered if still unknown.
+        """
+        if self._table_names is None:
+            self._single_flight.run(u"tables", self.discover_tables)
+        return list(self._table_names)
+
+    def close(self):
+        """
+        Close the idle connections to the database.
+        """
+        self._connection.close()
+
+    def discover_schema(self):
+        """
+        Load the columns and the foreign keys of all the tables in two queries.
+        """
+        database_name = self._connection._database
+        columns, _ = self._connection.execute(
+            *self._sql_serializer.get_schema_columns(database_name)
+        )
+        relations, _ = self._connection.execute(
+            *self._sql_serializer.get_schema_relations(database_name)
+        )
+
+        table_columns = {}
+        for row in columns:
+            table_columns.setdefault(row[0], []).append(
+                self._sql_serializer.interpret_db_column(row[1:])
             )
 
+        table_relations = dict((table_name, []) for table_name in table_columns)
+        for relation in relations:
+            table_relations.setdefault(relation[0], []).append(tuple(relation))
+
+        self._api_serialize.table_columns.update(table_columns)
+        self._api_serialize.set_relations(table_relations)
+        self._table_names = sorted(table_columns)
+
+    def get_schema_checksum(self):
+        """
+        Returns:
+            (unicode): A checksum of the columns and foreign keys of the database.
+        """
+        rows, _ = self._connection.execute(
+            *self._sql_serializer.get_schema_checksum(self._connection._database)
+        )
+        return rows[0][0]
+
+    def invalidate_schema(self):
+        """
+        Forget the columns, relations and lookups discovered so far. They are
+        discovered again when needed.
+        """
+        self._api_serialize.table_columns.clear()
+        self._api_serialize.clear_relations()
+        self._table_names = None
+        self._schema_checksum = None
+
+    def check_schema(self):
+        """
+        Compare the schema checksum with the previous one and invalidate what was
+        discovered if it changed.
+        Returns:
+            (bool): True if the schema changed since the last check.
+        """
+        checksum = self.get_schema_checksum()
+        changed = self._schema_checksum is not None and checksum != self._schema_checksum
+        if changed:
+            self.invalidate_schema()
+        self._schema_checksum = checksum
+        return changed
+
+    def dump_schema(self):
+        """
+        Discover the whole schema and return it in a JSON serializable form.
+        Returns:
+            (dict): The checksum, columns and relations of the database.
+        """
+        checksum = self.get_schema_checksum()
+        self.discover_schema()
+        self._schema_checksum = checksum
+
+        return {
+            u"checksum": checksum,
+            u"tables": dict(
+                (table_name, [column_to_dict(column) for column in columns])
+                for table_name, columns in self._api_serialize.table_columns.items()
+            ),
+            u"relations": dict(
+                (table_name, [list(relation) for relation in relations])
+                for table_name, relations in self._api_serialize.table_relations.items()
+            )
+        }
+
+    def load_schema(self, schema):
+        """
+        Load a schema given by dump_schema, without querying the database.
+        Args:
+            schema (dict): The schema.
+        """
+        self._api_serialize.table_columns.update(dict(
+            (table_name, [column_from_dict(column) for column in columns])
+            for table_name, columns in schema[u"tables"].items()
+        ))
+        self._api_serialize.set_relations(dict(
+            (table_name, [tuple(relation) for relation in relations])
+            for table_name, relations in schema[u"relations"].items()
+        ))
+        self._schema_checksum = schema.get(u"checksum")
+
+        self._table_names = sorted(schema[u"tables"])
+
     def transaction(self):
         """
         Return a transaction context to execute queries in a transaction.
@@ -0,0 +1,197 @@
+# coding: utf-8
+"""
+This file contains DocumentWriter class.
+"""
+
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from .grouper import get_path
+from .serializer.api_exception import WrongParameter
+
+try:
+    unicode
+except NameError:
+    # Python 3 strings are unicode.
+    unicode = str
+
+
+def _json_default(value):
+    """
+    Encode the values JSON doesn't know.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode(u"utf-8", u"replace")
+    raise TypeError(u"{!r} is not JSON serializable".format(value))
+
+
+def _flatten_paths(document, prefix=()):
+    """
+    Get the path of each value of a document, nested documents being walked through.
+    Args:
+        document (dict): The document.
+        prefix (tuple of unicode): The path of the document.
+    Returns:
+        (list of tuple): The paths, in the order of the document.
+    """
+    paths = []
+    for key, value in document.items():
+        if isinstance(value, dict) and value:
+            paths += _flatten_paths(value, prefix + (key,))
+        else:
+            paths.append(prefix + (key,))
+    return paths
+
+
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(u",", u":"), default=_json_default)
+
+
+def _quote(text):
+    """
+    Quote a CSV cell when needed.
+    """
+    if any(character in text for character in u",\"\r\n"):
+        return u"\"{}\"".format(text.replace(u"\"", u"\"\""))
+    return text
+
+
+def _any_cell(value):
+    """
+    Encode the CSV cell of a value whose type is unknown.
+    """
+    if value is None:
+        return u""
+    if isinstance(value, bool):
+        text = u"true" if value else u"false"
+    elif isinstance(value, float) and value.is_integer():
+        # Integers are read as floats, they are written without decimals.
+        text = u"{:d}".format(int(value))
+    elif isinstance(value, (list, dict)):
+        text = _JSON_ENCODER.encode(value)
+    elif isinstance(value, (datetime, date)):
+        text = value.isoformat()
+    elif isinstance(value, bytes):
+        text = value.decode(u"utf-8", u"replace")
+    else:
+        text = u"{}".format(value)
+    return _quote(text)
+
+
+def _number_cell(value):
+    """
+    Encode the CSV cell of a number or timestamp column.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return u"{:d}".format(int(value))
+    return _any_cell(value)
+
+
+def _text_cell(value):
+    """
+    Encode the CSV cell of a text column.
+    """
+    if isinstance(value, unicode):
+        return _quote(value)
+    return _any_cell(value)
+
+
+def _json_cell(value):
+    """
+    Encode the CSV cell of a column holding lists or documents, as JSON.
+    """
+    if value is None:
+        return u""
+    return _quote(_JSON_ENCODER.encode(value))
+
+
+CSV_ENCODERS = {
+    u"number": _number_cell,
+    u"timestamp": _number_cell,
+    u"text": _text_cell,
+    u"json": _json_cell
+}
+
+
+class DocumentWriter(object):
+    """
+    Writes documents to a file as NDJSON, one JSON document per line, or as CSV, nested
+    documents being flattened into dotted columns. Lines are buffered up to a bounded
+    size, so memory does not grow with the number of documents.
+    """
+
+    def __init__(self, fileobj, format=u"ndjson", buffer_size=65536, columns=None):
+        """
+        Args:
+            fileobj (file): Where to write. Text files are given unicode, the others UTF-8 bytes.
+            format (unicode): "ndjson" or "csv".
+            buffer_size (int): Number of characters buffered before writing to the file.
+            columns (list of tuple): The CSV columns, as (dotted path, type) where the type is
+                "number", "timestamp", "text", "json" or None when unknown. By default the
+                paths of the first document, of unknown types.
+        """
+        if format not in [u"ndjson", u"csv"]:
+            raise WrongParameter(u"Export format must be ndjson or csv.")
+
+        self._fileobj = fileobj
+        self._text = isinstance(fileobj, io.TextIOBase)
+        self.format = format
+        self.buffer_size = buffer_size
+        self.rows = 0
+        self.bytes = 0
+        self._buffer = []
+        self._buffered = 0
+        # (path, encoder) of each CSV column, chosen once for all the documents.
+        self._columns = None
+        if columns is not None:
+            self._set_columns([(tuple(path.split(u".")), typ) for path, typ in columns])
+
+    def _set_columns(self, columns):
+        """
+        Choose the encoder of each CSV column and buffer the header line.
+        Args:
+            columns (list of tuple): The (path, type) of each column, the path split in keys.
+        """
+        self._columns = [(path, CSV_ENCODERS.get(typ, _any_cell)) for path, typ in columns]
+        if self.format == u"csv":
+            self._append(u",".join(_quote(u".".join(path)) for path, _ in self._columns) + u"\r\n")
+
+    def _line(self, document):
+        if self.format == u"ndjson":
+            return _JSON_ENCODER.encode(document) + u"\n"
+
+        if self._columns is None:
+            self._set_columns([(path, None) for path in _flatten_paths(document)])
+        return u",".join(encode(get_path(document, path)) for path, encode in self._columns) + u"\r\n"
+
+    def _append(self, line):
+        self._buffer.append(line)
+        self._buffered += len(line)
+
+    def write(self, document):
+        """
+        Write a document.
+        Args:
+            document (dict): The document.
+        """
+        self._append(self._line(document))
+        self.rows += 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered lines to the file.
+        """
+        if not self._buffer:
+            return
+        data = u"".join(self._buffer)
+        encoded = data.encode(u"utf-8")
+        self._fileobj.write(data if self._text else encoded)
+        self.bytes += len(encoded)
+        self._buffer = []
+        self._buffered = 0
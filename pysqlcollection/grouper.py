@@ -0,0 +1,173 @@
+# coding: utf-8
+"""
+This file contains DocumentGrouper class.
+"""
+
+import copy
+import json
+from collections import OrderedDict
+
+
+def get_path(item, keys):
+    """
+    Get the value at a path already split in keys.
+    Args:
+        item (dict): The document.
+        keys (tuple of unicode): The keys leading to the value.
+    Returns:
+        The value, None if the path is missing.
+    """
+    for key in keys:
+        if not isinstance(item, dict) or key not in item:
+            return None
+        item = item[key]
+    return item
+
+
+def set_path(item, keys, value):
+    """
+    Set the value at a path already split in keys, the containers being there.
+    Args:
+        item (dict): The document.
+        keys (tuple of unicode): The keys leading to the value.
+        value: The value to set.
+    """
+    for key in keys[:-1]:
+        item = item.setdefault(key, {})
+    item[keys[-1]] = value
+
+
+class DocumentGrouper(object):
+    """
+    Folds the rows of one-to-many joins into one document per root key, the joined
+    documents being gathered in lists. Each row is handled once, in constant time.
+    """
+
+    def __init__(self, root_key, lookups, contiguous=False):
+        """
+        Args:
+            root_key (unicode): Path of the key identifying a root document.
+            lookups (list of tuple): The (path, key path) of each one-to-many join. The key
+                path is relative to the joined document, None to compare whole documents.
+                A third item can give the one-to-many joins nested in the joined documents,
+                in the same form, their paths being relative to the joined document.
+            contiguous (bool): The rows of a root document follow each other, as when the
+                query is ordered by the root key. A document is then given as soon as
+                the key changes and only one document is held in memory.
+        """
+        self._root_key = tuple(root_key.split(u"."))
+        self._lookups = self._split_paths(lookups)
+        self.contiguous = contiguous
+        # (document, state of its lookups) of the pending root documents, by root key.
+        self._groups = OrderedDict()
+
+    def _split_paths(self, lookups):
+        """
+        Split the paths of the lookups and of the ones nested in them in keys.
+        """
+        return [
+            (
+                tuple(lookup[0].split(u".")),
+                tuple(lookup[1].split(u".")) if lookup[1] else None,
+                self._split_paths(lookup[2] if len(lookup) > 2 else [])
+            )
+            for lookup in lookups
+        ]
+
+    def _joined_key(self, value, key_path, nested):
+        """
+        Get the key of a joined document, None when the join matched nothing.
+        """
+        if key_path is not None:
+            return get_path(value, key_path)
+        if nested and isinstance(value, dict):
+            # The documents of the nested joins change from a row to the other.
+            value = copy.deepcopy(value)
+            for path, _, _ in nested:
+                parent = get_path(value, path[:-1])
+                if isinstance(parent, dict):
+                    parent.pop(path[-1], None)
+        if value is None or (isinstance(value, dict) and all(cell is None for cell in value.values())):
+            return None
+        return json.dumps(value, sort_keys=True, default=repr)
+
+    def _start(self, document, lookups):
+        """
+        Replace the joined documents of a new document by lists and fold them.
+        Args:
+            document (dict): The document, as built from its first row.
+            lookups (list of tuple): Its one-to-many joins.
+        Returns:
+            (list of dict): For each join, the (document, state) of the joined documents
+                already folded, by joined key.
+        """
+        values = [get_path(document, path) for path, _, _ in lookups]
+        for path, _, _ in lookups:
+            set_path(document, path, [])
+        state = [{} for _ in lookups]
+        self._fold(document, state, lookups, values)
+        return state
+
+    def _fold(self, document, state, lookups, values):
+        """
+        Append the joined documents of a row to the lists of a document, the documents
+        already there getting the rows of their own nested joins.
+        """
+        for index, (path, key_path, nested) in enumerate(lookups):
+            value = values[index]
+            joined_key = self._joined_key(value, key_path, nested)
+            if joined_key is None:
+                continue
+            folded = state[index].get(joined_key)
+            if folded is None:
+                state[index][joined_key] = (value, self._start(value, nested))
+                get_path(document, path).append(value)
+            elif nested:
+                joined, joined_state = folded
+                nested_values = [get_path(value, nested_path) for nested_path, _, _ in nested]
+                self._fold(joined, joined_state, nested, nested_values)
+
+    def feed(self, document):
+        """
+        Handle a row.
+        Args:
+            document (dict): The document built from the row, reused for the root document.
+        Returns:
+            (list of dict): The root documents known to be complete.
+        """
+        key = get_path(document, self._root_key)
+        finished = []
+        if self.contiguous and self._groups and key not in self._groups:
+            finished = self.flush()
+
+        group = self._groups.get(key)
+        if group is None:
+            self._groups[key] = (document, self._start(document, self._lookups))
+        else:
+            grouped, state = group
+            values = [get_path(document, path) for path, _, _ in self._lookups]
+            self._fold(grouped, state, self._lookups, values)
+        return finished
+
+    def flush(self):
+        """
+        Returns:
+            (list of dict): The pending root documents, in order of first appearance.
+        """
+        documents = [grouped for grouped, _ in self._groups.values()]
+        self._groups = OrderedDict()
+        return documents
+
+    def group(self, documents):
+        """
+        Group an iterable of documents.
+        Args:
+            documents (iterable of dict): The documents built from the rows.
+        Yields:
+            (dict): The root documents.
+        """
+        for document in documents:
+            for finished in self.feed(document):
+                yield finished
+        for finished in self.flush():
+            yield finished
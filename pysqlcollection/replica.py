@@ -0,0 +1,77 @@
+# coding: utf-8
+"""
+This file contains Replica class.
+"""
+
+import time
+import threading
+
+
+class Replica(object):
+    """
+    In memory copy of a small table, indexed by primary key, so that lookups to it
+    are filled locally instead of being joined by the server.
+    """
+
+    def __init__(self, load, primary_key, field_names, refresh_interval=300):
+        """
+        Args:
+            load (callable): Called without argument, returns all the documents of the table.
+            primary_key (unicode): The primary key column of the table.
+            field_names (list of unicode): The columns of the table.
+            refresh_interval (float): Seconds after which the copy is loaded again,
+                None to only load it again after a local write.
+        """
+        self._load = load
+        self.primary_key = primary_key
+        self.field_names = field_names
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._documents = {}
+        # Time of the last load, None when the copy must be loaded.
+        self._loaded_at = None
+
+    def invalidate(self):
+        """
+        Load the copy again when it is next used, after a local write.
+        """
+        self._loaded_at = None
+
+    def refresh(self):
+        """
+        Load the copy now.
+        """
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        documents = {}
+        for document in self._load():
+            documents[document.get(self.primary_key)] = document
+        self._documents = documents
+        self._loaded_at = time.time()
+
+    def _is_stale(self):
+        return self._loaded_at is None or (
+            self.refresh_interval is not None and time.time() - self._loaded_at >= self.refresh_interval
+        )
+
+    def get(self, key):
+        """
+        Get the document of a key, as a LEFT JOIN would give it.
+        Args:
+            key: The primary key value.
+        Returns:
+            (dict): A copy of the document. When the key is unknown, only the primary key is set.
+        """
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self._refresh()
+
+        document = self._documents.get(key)
+        if document is None:
+            document = dict((name, None) for name in self.field_names)
+            document[self.primary_key] = key
+            return document
+        return dict(document)
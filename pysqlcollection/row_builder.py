@@ -0,0 +1,105 @@
+# coding: utf-8
+"""
+This file contains RowBuilder class.
+"""
+
+import calendar
+from datetime import datetime
+
+try:
+    long
+except NameError:
+    # Python 3 has a single integer type.
+    long = int
+
+
+def convert_number(value):
+    """
+    Convert a number coming from Database.
+    """
+    if isinstance(value, long):
+        return float(value)
+    return value
+
+
+def convert_timestamp(value):
+    """
+    Convert a datetime coming from Database into a UTC timestamp.
+    """
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return value
+
+
+def convert_any(value):
+    """
+    Convert a value coming from Database whose column type is unknown.
+    """
+    return convert_timestamp(convert_number(value))
+
+
+CONVERTERS = {
+    u"number": convert_number,
+    u"timestamp": convert_timestamp
+}
+
+
+class RowBuilder(object):
+    """
+    Turns the rows of a result set into nested documents. Everything depending
+    only on the result set description is computed once, in the constructor.
+    """
+
+    def __init__(self, description, fields=None):
+        """
+        Args:
+            description (list of tuple): The result set description, first item of each
+                column being its dotted alias.
+            fields (list of Field): The selected fields, used to know the type of each column.
+        """
+        column_types = dict((field.alias, field.column.type) for field in fields or [])
+
+        self.description = description
+        self.paths = []
+        # (parent container index, key) of each nested dict, parents first.
+        self._containers = []
+        # (row index, container index, key, converter) of each cell.
+        self._cells = []
+
+        container_indexes = {(): 0}
+        for index, column in enumerate(description):
+            path = tuple(column[0].split(u"."))
+            parent = ()
+            for key in path[:-1]:
+                child = parent + (key,)
+                if child not in container_indexes:
+                    container_indexes[child] = len(container_indexes)
+                    self._containers.append((container_indexes[parent], key))
+                parent = child
+
+            self.paths.append(path)
+            self._cells.append((
+                index,
+                container_indexes[parent],
+                path[-1],
+                CONVERTERS.get(column_types.get(column[0]), convert_any)
+            ))
+
+    def build(self, row):
+        """
+        Build the document of a row.
+        Args:
+            row (tuple): The row, matching the description.
+        Returns:
+            (dict): The nested document.
+        """
+        containers = [{}]
+        for parent, key in self._containers:
+            container = {}
+            containers[parent][key] = container
+            containers.append(container)
+
+        for index, parent, key, convert in self._cells:
+            containers[parent][key] = convert(row[index])
+
+        return containers[0]
@@ -38,6 +38,28 @@ class AbstractSQLSerializer(object):
         """
         pass
 
+    @abstractmethod
+    def get_schema_columns(self, database_name):
+        """
+        Query to get the columns of all the tables of a database.
+        Args:
+            database_name (unicode): The name of the database.
+        Returns:
+            (unicode, list): A query and values to inject in it.
+        """
+        pass
+
+    @abstractmethod
+    def get_schema_relations(self, database_name):
+        """
+        Query to get the foreign keys of all the tables of a database.
+        Args:
+            database_name (unicode): The name of the database.
+        Returns:
+            (unicode, list): A query and values to inject in it.
+        """
+        pass
+
     @abstractmethod
     def interpret_db_column(self, row):
         """
@@ -17,21 +17,62 @@ from pysqlcollection.serializer.api_type import (
     Set,
     Or,
     And,
-    Sort
+    Sort,
+    Plan,
+    InsertMany,
+    DEFAULT
 )
 from datetime import datetime
+from collections import OrderedDict
+from pysqlcollection.cache import LRUCache
 from .api_exception import (
     WrongParameter,
     MissingField,
     BadRequest
 )
 
+try:
+    unicode
+except NameError:
+    # Python 3 strings are unicode.
+    unicode = str
+
+class TableColumns(dict):
+    """
+    Columns by table name, calling back on every change.
+    """
+
+    def __init__(self, on_change, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self._on_change = on_change
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._on_change()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._on_change()
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self._on_change()
+
+    def clear(self):
+        dict.clear(self)
+        self._on_change()
+
+
 class ApiSerializer(object):
     """
     Defines the MongoDB Api serializer.
     """
 
-    def __init__(self):
+    def __init__(self, plan_cache_size=256):
+        """
+        Args:
+            plan_cache_size (int): How many find query shapes are kept decoded and encoded.
+        """
         self._OPERATORS = {
             u"$eq": u"=",
             u"$ne": u"!=",
@@ -39,13 +80,52 @@ class ApiSerializer(object):
             u"$gte": u">=",
             u"$lt": u"<",
             u"$lte": u"<=",
-            u"$regex": u"regex"
+            u"$regex": u"regex",
+            u"$in": u"IN",
+            u"$nin": u"NOT IN"
         }
         self._RECURSIVE_OPERATORS = {
             u"$and": And,
             u"$or": Or
         }
+        self.plan_cache = LRUCache(plan_cache_size)
         self.table_columns = {}
+        # Foreign keys of each table, rows as (table, column, referenced table, referenced column).
+        self.table_relations = {}
+        self.relations_loaded = False
+        # Auto lookups already computed, by (table, max_deep).
+        self.lookup_cache = {}
+
+    @property
+    def table_columns(self):
+        """
+        Returns:
+            (dict): The list of Column of each known table, by table name.
+        """
+        return self._table_columns
+
+    @table_columns.setter
+    def table_columns(self, table_columns):
+        self._table_columns = TableColumns(self.plan_cache.clear, table_columns)
+        self.plan_cache.clear()
+
+    def set_relations(self, table_relations):
+        """
+        Replace the relation graph by the one of the whole database.
+        Args:
+            table_relations (dict): The foreign keys of each table which has some.
+        """
+        self.table_relations = table_relations
+        self.relations_loaded = True
+        self.lookup_cache = {}
+
+    def clear_relations(self):
+        """
+        Forget the relation graph and the lookups computed from it.
+        """
+        self.table_relations = {}
+        self.relations_loaded = False
+        self.lookup_cache = {}
 
     def decode_limit(self, statement, limit):
         """
@@ -95,6 +175,51 @@ class ApiSerializer(object):
         statement.sorts = sorts
         return statement
 
+    def keyset_sorts(self, statement):
+        """
+        Get the sorts of a Select completed with the primary key, so that the order is total.
+        Args:
+            statement (Select): The statement.
+        Returns:
+            (list of Sort): The sorts.
+        """
+        sorts = list(statement.sorts)
+        sorted_aliases = [sort.field.alias for sort in sorts]
+        direction = sorts[-1].direction if sorts else 1
+        for field in statement.fields:
+            if field.table is statement.table and field.column.key == u"pri" and field.alias not in sorted_aliases:
+                sorts.append(Sort(field=field, direction=direction))
+        return sorts
+
+    def decode_after(self, statement, values):
+        """
+        Make the Select start after a row, in the sort order (keyset pagination).
+        The primary key is added to the sorts.
+        Args:
+            statement (Select): The statement to update.
+            values (list): The values of the sorted fields, primary key included, of
+                the row to start after. None for the first page.
+        Returns:
+            (Select): The updated statement.
+        """
+        statement.sorts = self.keyset_sorts(statement)
+        if values is None:
+            statement.after = None
+            return statement
+
+        if not isinstance(values, (list, tuple)) or len(values) != len(statement.sorts):
+            raise WrongParameter(
+                u"After needs one value for each sorted field : {}.".format(
+                    u", ".join([sort.field.alias for sort in statement.sorts])
+                )
+            )
+
+        statement.after = [
+            self.cast_value(sort.field.column.type, value)
+            for sort, value in zip(statement.sorts, values)
+        ]
+        return statement
+
     def decode_skip(self, statement, skip):
         """
         Add a skip to a Select statement.
@@ -212,9 +337,62 @@ class ApiSerializer(object):
 
 
 
+    def freeze(self, obj):
+        """
+        Turn a JSON like structure into something hashable.
+        Args:
+            obj: The structure to freeze.
+        Returns:
+            The hashable equivalent.
+        """
+        if isinstance(obj, dict):
+            return tuple(sorted((key, self.freeze(value)) for key, value in obj.items()))
+        if isinstance(obj, (list, tuple)):
+            return tuple(self.freeze(item) for item in obj)
+        return obj
+
+    def query_shape(self, query):
+        """
+        Describe a query without its values : two queries with the same shape
+        give the same SQL text.
+        Args:
+            query (dict): The query to describe.
+        Returns:
+            (tuple): The hashable shape.
+        """
+        shape = []
+        for key, value in sorted(query.items()):
+            if isinstance(value, dict):
+                shape.append((key, self.query_shape(value)))
+            elif key in self._RECURSIVE_OPERATORS and isinstance(value, list):
+                shape.append((key, tuple(self.query_shape(item) for item in value)))
+            elif isinstance(value, (list, tuple)):
+                shape.append((key, len(value)))
+            else:
+                shape.append((key, None))
+        return tuple(shape)
+
+    def sort_query(self, query):
+        """
+        Order the keys of a query so it is always decoded the same way.
+        Args:
+            query (dict): The query to order.
+        Returns:
+            (OrderedDict): The ordered query.
+        """
+        ordered = OrderedDict()
+        for key, value in sorted(query.items()):
+            if isinstance(value, dict):
+                value = self.sort_query(value)
+            elif key in self._RECURSIVE_OPERATORS and isinstance(value, list):
+                value = [self.sort_query(item) for item in value]
+            ordered[key] = value
+        return ordered
+
     def decode_find(self, table, query=None, projection=None, lookup=None):
         """
         Decode a find query to make it understandable by SQL serializer.
+        The parts depending only on the query shape are taken from the plan cache.
         Args:
             query (dict): The query to filter.
             projection (dict): The projection specifies the fields to keep or not.
@@ -223,20 +401,34 @@ class ApiSerializer(object):
         Returns:
             (Select): A select object ready to be parsed by SQL serializer.
         """
+        key = (
+            table,
+            self.freeze(lookup),
+            self.freeze(projection),
+            self.query_shape(query) if query else None
+        )
+        plan = self.plan_cache.get(key)
 
-        select = Select()
+        if plan is None:
+            select = Select()
 
-        select.table = self.generate_table(table_name=table, is_root_table=True)
+            select.table = self.generate_table(table_name=table, is_root_table=True)
 
-        select.fields = self.get_available_fields(select.table)
+            select.fields = self.get_available_fields(select.table)
 
-        select = self._decode_joins(select, lookup)
+            select = self._decode_joins(select, lookup)
 
-        if projection:
-            select.fields = self.decode_projection(select.fields, projection)
+            if projection:
+                select.fields = self.decode_projection(select.fields, projection)
+
+            plan = Plan(select.table, select.fields, select.joins)
+            self.plan_cache.put(key, plan)
+
+        select = Select(table=plan.table, fields=list(plan.fields), joins=list(plan.joins))
+        select.plan = plan
 
         if query:
-            select.filters = self.decode_query(query, fields=select.fields)
+            select.filters = self.decode_query(self.sort_query(query), fields=select.fields)
 
         return select
 
@@ -248,7 +440,8 @@ class ApiSerializer(object):
         )
         # Replace lookups
         if len(lookup) > 0:
-            for index, (key, value) in enumerate(document.items()):
+            # Listed first, the document being changed on the way.
+            for index, (key, value) in enumerate(list(document.items())):
                 splitted = key.split(u".")
                 if len(splitted) > 1:
                     for look in lookup:
@@ -275,7 +468,60 @@ class ApiSerializer(object):
 
         return insert
 
+    def decode_insert_many(self, table_name, documents, lookup=None):
+        """
+        Decode documents to insert with the rules of decode_insert_one. Lookup
+        replacements and columns are resolved once for all the documents.
+        Args:
+            table_name (unicode): The table where to insert.
+            documents (iterable of dict): The documents to insert.
+            lookup (list of dict): The lookup to apply during this query.
+        Returns:
+            (InsertMany): The representation of the insertion.
+        """
+        table = self.generate_table(table_name=table_name, is_root_table=True)
+        replacements = dict(
+            (u"{}.{}".format(look.get(u"as"), look.get(u"foreignField")), look.get(u"localField"))
+            for look in lookup or []
+        )
+        required = [
+            column.name for column in table.columns
+            if column.required and column.extra != u"auto_increment"
+        ]
+
+        flat_documents = []
+        used_keys = set()
+        for document in documents:
+            flat_document = {}
+            for key, value in self.json_to_one_level(document).items():
+                if u"." in key:
+                    key = replacements.get(u".".join(key.split(u".")[:2]), key)
+                flat_document[key] = value
+
+            for column_name in required:
+                if column_name not in flat_document:
+                    raise MissingField(u"You must supply a value for field '{}'.".format(column_name))
+
+            used_keys.update(flat_document)
+            flat_documents.append(flat_document)
+
+        if len(flat_documents) == 0:
+            raise BadRequest(u"You need to supply at least one document.")
+
+        columns = [column for column in table.columns if column.name in used_keys]
+        insert = InsertMany(table=table, fields=[Field(table, column) for column in columns])
+        for flat_document in flat_documents:
+            insert.rows.append([
+                self.cast_value(column.type, flat_document[column.name])
+                if column.name in flat_document else DEFAULT
+                for column in columns
+            ])
+
+        return insert
+
     def cast_value(self, column_type, value):
+        if isinstance(value, (list, tuple)):
+            return [self.cast_value(column_type, item) for item in value]
         if column_type in [u"timestamp"] and (isinstance(value, int) or isinstance(value, float)):
             value = datetime.utcfromtimestamp(value)
 
@@ -409,6 +655,42 @@ class ApiSerializer(object):
 
         return joins
 
+    def split_batch_lookup(self, table_name, lookup):
+        """
+        Separate the multiple lookups to fetch with their own queries from the lookups
+        to join. The lookups nested in a multiple lookup go with it, rewritten to
+        start from its table.
+        Args:
+            table_name (unicode): The root table.
+            lookup (list of dict): The lookups.
+        Returns:
+            (list of dict, list of tuple): The lookups to join, and the (multiple lookup,
+                nested lookups) pairs to fetch apart.
+        """
+        joined = []
+        batched = []
+        for look in lookup or []:
+            parent = None
+            for multiple, nested in batched:
+                alias = multiple[u"as"]
+                if look[u"to"] == alias or look[u"to"].startswith(u"{}.".format(alias)):
+                    parent = (multiple, nested)
+                    break
+
+            if parent is not None:
+                alias = parent[0][u"as"]
+                look = dict(look)
+                look[u"to"] = parent[0][u"from"] if look[u"to"] == alias else look[u"to"][len(alias) + 1:]
+                if look.get(u"as", u"").startswith(u"{}.".format(alias)):
+                    look[u"as"] = look[u"as"][len(alias) + 1:]
+                parent[1].append(look)
+            elif look.get(u"type") == u"multiple":
+                batched.append((look, []))
+            else:
+                joined.append(look)
+
+        return joined, batched
+
     def _decode_joins(self, statement, lookup):
         join_tables = []
         if lookup:
@@ -87,6 +87,32 @@ class Insert(object):
         self.values = values or []
 
 
+class Default(object):
+    """
+    Marks a value left to the column default.
+    """
+    def __repr__(self):
+        return u"DEFAULT"
+
+
+DEFAULT = Default()
+
+
+class InsertMany(object):
+
+    def __init__(self, fields=None, table=None, rows=None):
+        """
+        The representation of a multi-rows insert.
+        Args:
+            fields (list of Field): The inserted fields, the same for every row.
+            table (Table): The table where rows are inserted.
+            rows (list of list): The values of each row, DEFAULT where a document has no value.
+        """
+        self.table = table
+        self.fields = fields or []
+        self.rows = rows or []
+
+
 class Set(object):
 
     def __init__(self, field, value):
@@ -150,6 +176,22 @@ class InsertResultOne(object):
     def __init__(self, inserted_id):
         self.inserted_id = inserted_id
 
+class InsertManyResult(object):
+
+    def __init__(self, inserted_ids):
+        self.inserted_ids = inserted_ids
+
+class LoadResult(object):
+
+    def __init__(self, loaded_count, chunks):
+        """
+        Args:
+            loaded_count (int): Number of rows loaded.
+            chunks (list of dict): The rows and the warnings of each LOAD DATA query.
+        """
+        self.loaded_count = loaded_count
+        self.chunks = chunks
+
 class UpdateResult(object):
 
     def __init__(self, matched_count, modified_count):
@@ -197,3 +239,25 @@ class Select(object):
         self.offset = offset or 0
         self.sorts = sorts or []
         self.aggregation = None
+        self.plan = None
+        # Values of the sorted fields the page starts after (keyset pagination).
+        self.after = None
+
+
+class Plan(object):
+    """
+    Parts of a Select which only depend on the shape of a find query. They are
+    shared by all the Selects of that shape.
+    """
+    def __init__(self, table, fields, joins):
+        """
+        Args:
+            table (Table): The root table.
+            fields (list of Field): The available fields, projection applied.
+            joins (list of Join): The joins coming from the lookup.
+        """
+        self.table = table
+        self.fields = fields
+        self.joins = joins
+        # Encoded SQL text by variant (sorts, with limit or not).
+        self.encoded = {}
@@ -3,14 +3,30 @@
 This file contains MySQLSerializer class.
 """
 
+import re
+import copy
+from collections import OrderedDict
 from .abstract_sql_serializer import AbstractSQLSerializer
 from .api_type import (
     Column,
     Field,
     And,
     Or,
-    Filter
+    Filter,
+    DEFAULT
 )
+from .api_exception import WrongParameter
+
+
+TOTAL_ALIAS = u"__total"
+# Characters escaped in the files read by LOAD DATA, the escape character first.
+LOAD_ESCAPES = [
+    (b"\\", b"\\\\"),
+    (b"\t", b"\\t"),
+    (b"\n", b"\\n"),
+    (b"\r", b"\\r"),
+    (b"\0", b"\\0")
+]
 
 
 class MySQLSerializer(AbstractSQLSerializer):
@@ -18,6 +34,28 @@ class MySQLSerializer(AbstractSQLSerializer):
     Serialize MySQL requests.
     """
 
+    def __init__(self, flatten_select=False):
+        """
+        Args:
+            flatten_select (bool): Encode selects as one flat query filtering and sorting
+                on table columns, instead of wrapping the joined tables in derived tables.
+                MySQL can then use the indexes of the tables.
+        """
+        self.flatten_select = flatten_select
+
+    def encode_field(self, field, is_select=False):
+        """
+        Encode a reference to a field.
+        Args:
+            field (Field): The field.
+            is_select (bool): Refer to the field by alias instead of table column.
+        Returns:
+            (unicode): The reference.
+        """
+        if is_select:
+            return u"`{}`".format(field.alias)
+        return u"`{}`.{}".format(field.table.alias, field.column.name)
+
     def encode_insert(self, insert):
 
         query = u"INSERT INTO {}({}) VALUES ({})".format(
@@ -28,6 +66,116 @@ class MySQLSerializer(AbstractSQLSerializer):
 
         return query, insert.values
 
+    def _estimate_size(self, value):
+        """
+        Estimate how many bytes a value takes once injected in a query.
+        """
+        if value is None:
+            return 4
+        if isinstance(value, bytes):
+            data = value
+        elif hasattr(value, u"encode"):
+            data = value.encode(u"utf-8")
+        else:
+            return len(str(value)) + 2
+
+        # Quotes, plus the escaping of special characters.
+        return len(data) + 2 + sum(
+            data.count(char) for char in (b"\\", b"'", b'"', b"\n", b"\r", b"\0")
+        )
+
+    def encode_insert_many(self, insert, max_packet_size, batch_size=None):
+        """
+        Encode an InsertMany into multi-rows INSERT queries, each one holding at most
+        batch_size rows and fitting in max_packet_size bytes.
+        Args:
+            insert (InsertMany): The insertion to encode.
+            max_packet_size (int): The maximum size of a query, in bytes.
+            batch_size (int): The maximum number of rows of a query.
+        Yields:
+            (unicode, list, int, int): A query, the values to inject in it and
+                the range of rows it inserts.
+        """
+        prefix = u"INSERT INTO {}({}) VALUES ".format(
+            insert.table.name,
+            u", ".join([field.column.name for field in insert.fields])
+        )
+        budget = max_packet_size - len(prefix)
+
+        start = 0
+        placeholders = []
+        values = []
+        size = 0
+        for index, row in enumerate(insert.rows):
+            row_placeholders = u"({})".format(
+                u", ".join([u"DEFAULT" if value is DEFAULT else u"%s" for value in row])
+            )
+            row_values = [value for value in row if value is not DEFAULT]
+            row_size = len(row_placeholders) + 2 + sum(self._estimate_size(value) for value in row_values)
+
+            if placeholders and (size + row_size > budget or len(placeholders) == batch_size):
+                yield prefix + u", ".join(placeholders), values, start, index
+                start = index
+                placeholders = []
+                values = []
+                size = 0
+
+            placeholders.append(row_placeholders)
+            values += row_values
+            size += row_size
+
+        if placeholders:
+            yield prefix + u", ".join(placeholders), values, start, len(insert.rows)
+
+    def encode_load_data(self, table_name, column_names, file_name, on_duplicate=u"error"):
+        """
+        Encode a LOAD DATA LOCAL INFILE query reading a file of tab separated rows.
+        Args:
+            table_name (unicode): The table where rows are loaded.
+            column_names (list of unicode): The columns of the file, in order.
+            file_name (unicode): The path of the file, on the client.
+            on_duplicate (unicode): "replace" or "ignore" the rows whose key exists,
+                "error" keeps the behaviour of LOCAL, which is to skip them with a warning.
+        Returns:
+            (unicode, list): A query and values to inject in it.
+        """
+        if on_duplicate not in [u"error", u"ignore", u"replace"]:
+            raise WrongParameter(u"On duplicate must be error, ignore or replace.")
+
+        query = (
+            u"LOAD DATA LOCAL INFILE %s {}INTO TABLE `{}` CHARACTER SET utf8 "
+            u"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({})"
+        ).format(
+            u"" if on_duplicate == u"error" else u"{} ".format(on_duplicate.upper()),
+            table_name,
+            u", ".join([u"`{}`".format(name) for name in column_names])
+        )
+        return query, [file_name]
+
+    def encode_load_row(self, row):
+        """
+        Encode a row for LOAD DATA, with its default escaping.
+        Args:
+            row (list): The values of the row.
+        Returns:
+            (bytes): The line, UTF-8 encoded.
+        """
+        cells = []
+        for value in row:
+            if value is None:
+                cells.append(b"\\N")
+                continue
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, float):
+                value = repr(value)
+            if not isinstance(value, bytes):
+                value = u"{}".format(value).encode(u"utf-8")
+            for char, escaped in LOAD_ESCAPES:
+                value = value.replace(char, escaped)
+            cells.append(value)
+        return b"\t".join(cells) + b"\n"
+
     def encode_joins(self, joins):
         output = [
             u"{} `{}` ON `{}`.{} = `{}`.{}".format(
@@ -43,6 +191,113 @@ class MySQLSerializer(AbstractSQLSerializer):
         output = u"LEFT JOIN " + u" LEFT JOIN ".join(output) if len(output) > 0 else u""
         return output
 
+    def filter_fields(self, filters):
+        """
+        Get the fields filters refer to.
+        Args:
+            filters (And or Or or Filter): The filters.
+        Returns:
+            (list of Field): The fields.
+        """
+        if isinstance(filters, Filter):
+            return [filters.field]
+        fields = []
+        if isinstance(filters, (And, Or)):
+            for filt in filters.filters:
+                fields += self.filter_fields(filt)
+        return fields
+
+    def _is_unique_key(self, table, column):
+        """
+        Tell if a column alone identifies a row. Every column of a composite primary key
+        is described as PRI, so a PRI column is only unique when it is the only one.
+        Args:
+            table (Table): The table of the column.
+            column (Column): The column.
+        Returns:
+            (bool): True for a one column primary key or a unique column.
+        """
+        if column.key == u"uni":
+            return True
+        primary_keys = [table_column for table_column in table.columns if table_column.key == u"pri"]
+        return column.key == u"pri" and len(primary_keys) == 1
+
+    def root_key(self, table):
+        """
+        Get the column identifying the rows of a table alone.
+        Args:
+            table (Table): The table.
+        Returns:
+            (Column): Its one column primary key, None if it has none or a composite one.
+        """
+        primary_keys = [column for column in table.columns if column.key == u"pri"]
+        return primary_keys[0] if len(primary_keys) == 1 else None
+
+    def without_multiple_joins(self, joins, used_aliases=()):
+        """
+        Drop the multiple joins none of whose fields are used, with the joins made from
+        their tables. They only repeat the root rows, which documents fold back.
+        Args:
+            joins (list of Join): The joins.
+            used_aliases (iterable of unicode): The aliases of the tables used.
+        Returns:
+            (list of Join): The joins to keep, in their order.
+        """
+        used_aliases = set(used_aliases)
+        # Joins come after the ones they are made from : the tables leading to a used one are used too.
+        for join in reversed(joins):
+            if join.to_table.alias in used_aliases:
+                used_aliases.add(join.from_table.alias)
+
+        dropped = set()
+        kept = []
+        for join in joins:
+            if join.from_table.alias in dropped or (
+                    join.type == u"multiple" and join.to_table.alias not in used_aliases
+            ):
+                dropped.add(join.to_table.alias)
+            else:
+                kept.append(join)
+        return kept
+
+    def prune_joins(self, select, used_fields=None):
+        """
+        Get the joins a select needs. A simple join on a one column primary key or a unique
+        key matches at most one row : when none of its fields are used, dropping it changes nothing.
+        Args:
+            select (Select): The select.
+            used_fields (list of Field): The fields used, by default the displayed,
+                filtered and sorted ones.
+        Returns:
+            (list of Join): The joins to keep, in their order.
+        """
+        if used_fields is None:
+            used_fields = (
+                [field for field in select.fields if field.display] +
+                self.filter_fields(select.filters) +
+                [sort.field for sort in select.sorts]
+            )
+        used_aliases = set(field.table.alias for field in used_fields)
+
+        needed = set()
+        changed = True
+        while changed:
+            changed = False
+            for index, join in enumerate(select.joins):
+                if index in needed:
+                    continue
+                if (
+                        join.type != u"simple" or
+                        not self._is_unique_key(join.to_table, join.to_field.column) or
+                        join.to_table.alias in used_aliases
+                ):
+                    needed.add(index)
+                    # The table it comes from is needed as well.
+                    used_aliases.add(join.from_table.alias)
+                    changed = True
+
+        return [join for index, join in enumerate(select.joins) if index in needed]
+
     def encode_filters(self, filters, join_operator=None, is_root=True, is_select=False):
         join_operator = join_operator or u"AND"
         if not isinstance(filters, list):
@@ -52,7 +307,18 @@ class MySQLSerializer(AbstractSQLSerializer):
         for filt in filters:
             result = None
 
-            if isinstance(filt, Filter):
+            if isinstance(filt, Filter) and filt.operator.value in [u"IN", u"NOT IN"]:
+                if len(filt.value) == 0:
+                    # Nothing is in an empty list.
+                    where.append(u"1 = 0" if filt.operator.value == u"IN" else u"1 = 1")
+                else:
+                    where.append(u"{} {} ({})".format(
+                        self.encode_field(filt.field, is_select),
+                        filt.operator.value,
+                        u", ".join([u"%s"] * len(filt.value))
+                    ))
+                    values += list(filt.value)
+            elif isinstance(filt, Filter):
                 operator_value = u"REGEXP" if filt.operator.value == u"regex" else filt.operator.value
 
                 if is_select:
@@ -86,23 +352,230 @@ class MySQLSerializer(AbstractSQLSerializer):
 
         return where, values
 
+    def encode_after(self, select, is_select=False):
+        """
+        Encode the keyset pagination condition of a Select. Fields sorted in the same
+        direction are compared as a row, so that MySQL can seek in an index.
+        Args:
+            select (Select): The select with its after values.
+            is_select (bool): Refer to fields by alias instead of table column.
+        Returns:
+            (unicode, list): The condition and the values to inject in it.
+        """
+        if select.after is None:
+            return u"", []
+
+        names = [self.encode_field(sort.field, is_select) for sort in select.sorts]
+        operators = [u">" if sort.direction == 1 else u"<" for sort in select.sorts]
+
+        if len(set(operators)) == 1:
+            condition = u"({}) {} ({})".format(
+                u", ".join(names),
+                operators[0],
+                u", ".join([u"%s"] * len(names))
+            )
+            return condition, list(select.after)
+
+        conditions = []
+        values = []
+        for index, name in enumerate(names):
+            equalities = [u"{} = %s".format(previous) for previous in names[:index]]
+            conditions.append(u"({})".format(
+                u" AND ".join(equalities + [u"{} {} %s".format(name, operators[index])])
+            ))
+            values += list(select.after[:index + 1])
+        return u"({})".format(u" OR ".join(conditions)), values
+
+    def _encode_count_from(self, select, with_limit_and_skip=False):
+        """
+        Encode the FROM and WHERE clauses of a count : the table, the joins the
+        filters need and the filters, without any projection.
+        Args:
+            select (Select): The select to count.
+            with_limit_and_skip (bool): The count is paged, so the multiple joins are kept :
+                the page is made of joined rows.
+        Returns:
+            (unicode, list, unicode): The clauses, the values to inject in them and the
+                column counted distinctly, None to count rows.
+        """
+        used_fields = self.filter_fields(select.filters)
+        if select.after is not None:
+            used_fields += [sort.field for sort in select.sorts]
+        if not with_limit_and_skip:
+            select = copy.copy(select)
+            select.joins = self.without_multiple_joins(
+                select.joins, [field.table.alias for field in used_fields]
+            )
+        needed_joins = self.prune_joins(select, used_fields)
+        joins = self.encode_joins(needed_joins)
+
+        where, values = self.encode_filters(select.filters)
+        after, after_values = self.encode_after(select)
+        if after:
+            where = u"{} AND {}".format(where, after) if where else u" WHERE {}".format(after)
+            values += after_values
+
+        # Rows repeated by multiple joins are folded in one document per root key.
+        key = self.root_key(select.table)
+        distinct = None
+        if key is not None and any(join.type == u"multiple" for join in needed_joins):
+            distinct = u"`{}`.{}".format(select.table.alias, key.name)
+
+        clauses = u"FROM {} `{}` {} {}".format(select.table.name, select.table.alias, joins, where)
+        return clauses, values, distinct
+
     def encode_select_count(self, select, with_limit_and_skip=False):
-        query, values = self.encode_select(select, with_limit_and_skip=with_limit_and_skip)
-        return u"SELECT COUNT(*) FROM ({}) AS A1".format(query), values
+        """
+        Encode a query counting the documents of a select. Only the joins needed by the
+        filters are kept and no column is projected.
+        Args:
+            select (Select): The select to count.
+            with_limit_and_skip (bool): Count only the documents of the current page.
+        Returns:
+            (unicode, list): Query parameters.
+        """
+        clauses, values, distinct = self._encode_count_from(select, with_limit_and_skip)
+        if with_limit_and_skip:
+            query = u"SELECT {} FROM (SELECT {} AS 'key' {} LIMIT %s OFFSET %s) AS A1".format(
+                u"COUNT(DISTINCT A1.`key`)" if distinct else u"COUNT(*)", distinct or u"1", clauses
+            )
+            return query, values + [select.limit, select.offset]
+        count = u"COUNT(DISTINCT {})".format(distinct) if distinct else u"COUNT(*)"
+        return u"SELECT {} {}".format(count, clauses), values
 
-    def encode_select(self, select, with_limit_and_skip=True):
+    def encode_explain_count(self, select):
+        """
+        Encode a query asking MySQL its estimate of the rows a select reads.
+        Args:
+            select (Select): The select to estimate.
+        Returns:
+            (unicode, list): Query parameters.
+        """
+        clauses, values, _ = self._encode_count_from(select)
+        return u"EXPLAIN SELECT COUNT(*) {}".format(clauses), values
+
+    def get_table_rows(self, table_name):
+        """
+        Query to get the estimated number of rows of a table of the current database.
+        Args:
+            table_name (unicode): The name of the table.
+        Returns:
+            (unicode, list): A query and values to inject in it.
+        """
+        query = u"""
+                SELECT TABLE_ROWS
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+                """
+        return query, [table_name]
+
+    def get_key_range(self, table_name, key):
+        """
+        Query to get the lowest and the highest values of a column.
+        Args:
+            table_name (unicode): The name of the table.
+            key (unicode): The column, usually the primary key.
+        Returns:
+            (unicode, list): A query and values to inject in it.
+        """
+        return u"SELECT MIN(`{key}`), MAX(`{key}`) FROM `{table}`".format(key=key, table=table_name), []
+
+    def interpret_explain(self, rows, description):
+        """
+        Estimate the number of rows of a query from its EXPLAIN result.
+        Args:
+            rows (list of tuple): The EXPLAIN rows.
+            description (list of tuple): The result set description.
+        Returns:
+            (int): The estimate.
+        """
+        names = [column[0] for column in description]
+        estimate = 1.0
+        for row in rows:
+            explained = dict(zip(names, row))
+            estimate *= float(explained.get(u"rows") or 0)
+            if explained.get(u"filtered") is not None:
+                estimate *= float(explained[u"filtered"]) / 100
+        return int(round(estimate)) if rows else 0
+
+    def encode_filter_values(self, filters):
+        """
+        Get the values of filters, in the order encode_filters injects them.
+        Args:
+            filters (And or Or or Filter): The filters.
+        Returns:
+            (list): The values.
+        """
+        if isinstance(filters, Filter):
+            if filters.operator.value in [u"IN", u"NOT IN"]:
+                return list(filters.value)
+            return [filters.value]
         values = []
-        fields = [
-            u"`{}`.{} AS '{}'".format(
-                field.table.alias, field.column.name, field.alias
-            ) for field in select.fields]
+        if isinstance(filters, (And, Or)):
+            for filt in filters.filters:
+                values += self.encode_filter_values(filt)
+        return values
+
+    def total_strategy(self, version):
+        """
+        Get how a server counts the unpaged rows of a select in the same statement.
+        Args:
+            version (unicode): The version of the server, as given by @@version.
+        Returns:
+            (unicode): u"window" when the server has window functions, u"found_rows" otherwise.
+        """
+        numbers = [int(number) for number in re.findall(r"\d+", version or u"")[:2]]
+        numbers += [0] * (2 - len(numbers))
+        if u"mariadb" in (version or u"").lower():
+            return u"window" if numbers >= [10, 2] else u"found_rows"
+        return u"window" if numbers >= [8, 0] else u"found_rows"
+
+    def encode_select(self, select, with_limit_and_skip=True, total=None):
+        """
+        Encode Select API object into an SQL query. When the select comes from a
+        cached plan, the SQL text is encoded once per plan and variant.
+        Args:
+            select (Select): The Select API object to convert.
+            with_limit_and_skip (bool): Paginate or not.
+            total (unicode): Also count the unpaged rows, u"window" to add the count as a
+                last column, u"found_rows" to let FOUND_ROWS() return it.
+        Returns:
+            (unicode, list): Query parameters.
+        """
+        variant = (
+            tuple((sort.field.alias, sort.direction) for sort in select.sorts),
+            with_limit_and_skip,
+            select.after is not None,
+            total
+        )
+        query = select.plan.encoded.get(variant) if select.plan is not None else None
+
+        if query is None:
+            query, values = self._encode_select(select, with_limit_and_skip, total)
+            if select.plan is not None:
+                select.plan.encoded[variant] = query
+        else:
+            values = self.encode_filter_values(select.filters) + self.encode_after(select)[1]
 
-        joins = self.encode_joins(select.joins)
+        if with_limit_and_skip:
+            values += [select.limit, select.offset]
+
+        return query, values
+
+    def _encode_select(self, select, with_limit_and_skip=True, total=None):
+        # Nested selects filter and sort the derived table, by field alias.
+        is_select = not self.flatten_select
+        values = []
 
         # Construct filters
-        where, where_values = self.encode_filters(select.filters, is_select=True)
+        where, where_values = self.encode_filters(select.filters, is_select=is_select)
         values += where_values
 
+        after, after_values = self.encode_after(select, is_select=is_select)
+        if after:
+            where = u"{} AND {}".format(where, after) if where else u" WHERE {}".format(after)
+            values += after_values
+
         # Construct sort
         sort_bindings = {
             1: u"ASC",
@@ -112,14 +585,194 @@ class MySQLSerializer(AbstractSQLSerializer):
         limit_offset = u""
         if with_limit_and_skip:
             limit_offset = u"LIMIT %s OFFSET %s"
-            values += [select.limit, select.offset]
 
-        sorts = u", ".join([u"`{}` {}".format(sort.field.alias, sort_bindings[sort.direction]) for sort in select.sorts])
+        sorts = u", ".join([
+            u"{} {}".format(self.encode_field(sort.field, is_select), sort_bindings[sort.direction])
+            for sort in select.sorts
+        ])
         sorts = u"ORDER BY {}".format(sorts) if len(sorts) > 0 else sorts
+
+        joins = self.prune_joins(select)
+        pruned_aliases = set(join.to_table.alias for join in select.joins if join not in joins)
+        joins = self.encode_joins(joins)
+
+        modifier = u"SQL_CALC_FOUND_ROWS " if total == u"found_rows" else u""
+        total_column = u", COUNT(*) OVER () AS '{}'".format(TOTAL_ALIAS) if total == u"window" else u""
+
+        if self.flatten_select:
+            displayed = u", ".join([
+                u"{} AS '{}'".format(self.encode_field(field), field.alias)
+                for field in select.fields if field.display
+            ])
+            query = u"SELECT {}{}{} FROM {} `{}` {} {} {} {}".format(
+                modifier, displayed, total_column, select.table.name, select.table.alias,
+                joins, where, sorts, limit_offset
+            )
+            return query, values
+
+        fields = [
+            u"`{}`.{} AS '{}'".format(
+                field.table.alias, field.column.name, field.alias
+            ) for field in select.fields if field.table.alias not in pruned_aliases]
         query = u"SELECT {} FROM (SELECT * FROM {}) {} {} ".format(u", ".join(fields), select.table.name, select.table.alias, joins)
 
         displayed = u", ".join([u"`{}`".format(field.alias) for field in select.fields if field.display])
-        query = u"SELECT {} FROM ({}) AS A0 {} {} {}".format(displayed, query, where, sorts, limit_offset)
+        query = u"SELECT {}{}{} FROM ({}) AS A0 {} {} {}".format(
+            modifier, displayed, total_column, query, where, sorts, limit_offset
+        )
+        return query, values
+
+    def supports_json_documents(self, version):
+        """
+        Know if a server can assemble documents with JSON_OBJECT and JSON_ARRAYAGG.
+        Args:
+            version (unicode): The version of the server, as given by @@version.
+        Returns:
+            (bool): True from MySQL 5.7.22 and MariaDB 10.5.
+        """
+        numbers = [int(number) for number in re.findall(r"\d+", version or u"")[:3]]
+        numbers += [0] * (3 - len(numbers))
+        if u"mariadb" in (version or u"").lower():
+            return numbers >= [10, 5, 0]
+        return numbers >= [5, 7, 22]
+
+    def _json_value(self, field):
+        """
+        Encode a field as a JSON value, dates being converted to UTC timestamps.
+        """
+        if field.column.type == u"timestamp":
+            return u"TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', {})".format(self.encode_field(field))
+        return self.encode_field(field)
+
+    def _json_object(self, select, contexts, context):
+        """
+        Encode the JSON_OBJECT of the documents of a context : the root table or a multiple
+        join, with the simple joins reached from it.
+        Args:
+            select (Select): The select.
+            contexts (dict): The multiple join each table alias belongs to, None for the root.
+            context (Join): The multiple join, None for the root.
+        Returns:
+            (unicode): The expression.
+        """
+        prefix = u"{}.".format(context.as_alias) if context is not None else u""
+        tree = OrderedDict()
+
+        def insert(path, value):
+            node = tree
+            keys = path.split(u".")
+            for key in keys[:-1]:
+                if not isinstance(node.get(key), OrderedDict):
+                    node[key] = OrderedDict()
+                node = node[key]
+            node[keys[-1]] = value
+
+        for field in select.fields:
+            if field.display and contexts.get(field.table.alias) is context:
+                insert(field.alias[len(prefix):], self._json_value(field))
+
+        for join in select.joins:
+            if join.type == u"multiple" and contexts.get(join.from_table.alias) is context:
+                insert(join.as_alias[len(prefix):], self._json_array(select, contexts, join))
+
+        def encode(node):
+            return u"JSON_OBJECT({})".format(u", ".join([
+                u"'{}', {}".format(key, encode(value) if isinstance(value, OrderedDict) else value)
+                for key, value in node.items()
+            ]))
+
+        return encode(tree)
+
+    def _json_array(self, select, contexts, join):
+        """
+        Encode the correlated subquery aggregating the documents of a multiple join.
+        """
+        simple_joins = [
+            simple_join for simple_join in self.prune_joins(select)
+            if simple_join.type != u"multiple" and contexts.get(simple_join.from_table.alias) is join
+        ]
+        return (
+            u"(SELECT IFNULL(JSON_ARRAYAGG({}), JSON_ARRAY()) FROM {} `{}` {} "
+            u"WHERE `{}`.{} = `{}`.{})"
+        ).format(
+            self._json_object(select, contexts, join),
+            join.to_table.name,
+            join.to_table.alias,
+            self.encode_joins(simple_joins),
+            join.to_table.alias,
+            join.to_field.column.name,
+            join.from_table.alias,
+            join.from_field.column.name
+        )
+
+    def encode_json_select(self, select, with_limit_and_skip=True, total=None):
+        """
+        Encode a select returning each document as one JSON value, the simple joins
+        being nested objects and the multiple joins arrays aggregated by subqueries.
+        Filters and sorts can't use the fields of multiple joins.
+        Args:
+            select (Select): The Select API object to convert.
+            with_limit_and_skip (bool): Paginate or not.
+            total (unicode): Also count the unpaged rows, see encode_select.
+        Returns:
+            (unicode, list): Query parameters.
+        """
+        contexts = {}
+        for join in select.joins:
+            parent = contexts.get(join.from_table.alias)
+            contexts[join.to_table.alias] = join if join.type == u"multiple" else parent
+
+        used_fields = self.filter_fields(select.filters) + [sort.field for sort in select.sorts]
+        if any(contexts.get(field.table.alias) is not None for field in used_fields):
+            raise WrongParameter(u"Documents built by the server can't be filtered or sorted on multiple lookups.")
+
+        variant = (
+            u"json",
+            tuple((sort.field.alias, sort.direction) for sort in select.sorts),
+            with_limit_and_skip,
+            select.after is not None,
+            total
+        )
+        query = select.plan.encoded.get(variant) if select.plan is not None else None
+        values = self.encode_filter_values(select.filters) + self.encode_after(select)[1]
+
+        if query is None:
+            where, _ = self.encode_filters(select.filters)
+            after, _ = self.encode_after(select)
+            if after:
+                where = u"{} AND {}".format(where, after) if where else u" WHERE {}".format(after)
+
+            sort_bindings = {
+                1: u"ASC",
+                -1: u"DESC"
+            }
+            sorts = u", ".join([
+                u"{} {}".format(self.encode_field(sort.field), sort_bindings[sort.direction])
+                for sort in select.sorts
+            ])
+            sorts = u"ORDER BY {}".format(sorts) if len(sorts) > 0 else sorts
+
+            root_joins = [
+                join for join in self.prune_joins(select)
+                if join.type != u"multiple" and contexts[join.to_table.alias] is None
+            ]
+            query = u"SELECT {}{} AS 'document'{} FROM {} `{}` {} {} {} {}".format(
+                u"SQL_CALC_FOUND_ROWS " if total == u"found_rows" else u"",
+                self._json_object(select, contexts, None),
+                u", COUNT(*) OVER () AS '{}'".format(TOTAL_ALIAS) if total == u"window" else u"",
+                select.table.name,
+                select.table.alias,
+                self.encode_joins(root_joins),
+                where,
+                sorts,
+                u"LIMIT %s OFFSET %s" if with_limit_and_skip else u""
+            )
+            if select.plan is not None:
+                select.plan.encoded[variant] = query
+
+        if with_limit_and_skip:
+            values += [select.limit, select.offset]
+
         return query, values
 
     def get_relations(self, database_name, table_name):
@@ -138,6 +791,87 @@ class MySQLSerializer(AbstractSQLSerializer):
 
         return query, [database_name, table_name]
 
+    def get_schema_relations(self, database_name):
+        """
+        Query to get the foreign keys of all the tables of a database.
+        Args:
+            database_name (unicode): The name of the database.
+        Returns:
+            (unicode, list): A query and values to inject in it.
+        """
+        query = u"""
+                SELECT
+                TABLE_NAME AS 'table_name',
+                COLUMN_NAME AS 'column_name',
+                REFERENCED_TABLE_NAME AS 'referenced_table_name',
+                REFERENCED_COLUMN_NAME AS 'referenced_column_name'
+                FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+                WHERE TABLE_SCHEMA = %s
+                AND REFERENCED_TABLE_NAME IS NOT NULL
+                ORDER BY TABLE_NAME, ORDINAL_POSITION
+                """
+
+        return query, [database_name]
+
+    def get_schema_columns(self, database_name):
+        """
+        Query to get the columns of all the tables of a database. Each row is the table
+        name followed by what DESCRIBE returns for the column.
+        Args:
+            database_name (unicode): The name of the database.
+        Returns:
+            (unicode, list): A query and values to inject in it.
+        """
+        query = u"""
+                SELECT
+                TABLE_NAME,
+                COLUMN_NAME,
+                COLUMN_TYPE,
+                IS_NULLABLE,
+                COLUMN_KEY,
+                COLUMN_DEFAULT,
+                EXTRA
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = %s
+                ORDER BY TABLE_NAME, ORDINAL_POSITION
+                """
+
+        return query, [database_name]
+
+    def get_schema_checksum(self, database_name):
+        """
+        Query to get a checksum of the columns and foreign keys of a database, which
+        changes whenever one of them changes. It scans INFORMATION_SCHEMA, so it costs
+        about as much as discovering the schema.
+        Args:
+            database_name (unicode): The name of the database.
+        Returns:
+            (unicode, list): A query and values to inject in it.
+        """
+        query = u"""
+                SELECT CONCAT_WS(
+                    ':',
+                    (
+                        SELECT CONCAT(COUNT(*), '-', IFNULL(SUM(CRC32(CONCAT_WS(
+                            '|', TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE,
+                            COLUMN_KEY, IFNULL(COLUMN_DEFAULT, ''), EXTRA
+                        ))), 0))
+                        FROM INFORMATION_SCHEMA.COLUMNS
+                        WHERE TABLE_SCHEMA = %s
+                    ),
+                    (
+                        SELECT CONCAT(COUNT(*), '-', IFNULL(SUM(CRC32(CONCAT_WS(
+                            '|', TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+                        ))), 0))
+                        FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+                        WHERE TABLE_SCHEMA = %s
+                        AND REFERENCED_TABLE_NAME IS NOT NULL
+                    )
+                )
+                """
+
+        return query, [database_name, database_name]
+
     def get_tables(self):
         """
         Query to get all tables from the database.
@@ -0,0 +1,62 @@
+# coding: utf-8
+"""
+This file contains SingleFlight class.
+"""
+
+import threading
+
+
+class _Call(object):
+    """
+    A call in flight, waited by the threads asking for the same key.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Runs one call at a time per key : threads asking for a key already in flight wait
+    for the running call and share its result instead of running it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def run(self, key, function):
+        """
+        Run a function, unless it is already running for the key.
+        Args:
+            key: Identifies the call.
+            function (callable): Called without argument.
+        Returns:
+            The result of the function, maybe computed by another thread.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
@@ -0,0 +1,84 @@
+# coding: utf-8
+"""
+This module contains functions to save and load discovered schemas.
+"""
+
+import io
+import os
+import json
+from .serializer.api_type import Column
+
+SNAPSHOT_VERSION = 1
+
+
+def column_to_dict(column):
+    """
+    Get a JSON serializable representation of a column.
+    Args:
+        column (Column): The column.
+    Returns:
+        (dict): The representation.
+    """
+    return {
+        u"name": column.name,
+        u"type": column.type,
+        u"required": column.required,
+        u"key": column.key,
+        u"default": column.default,
+        u"extra": column.extra
+    }
+
+
+def column_from_dict(data):
+    """
+    Build back a column from its representation.
+    Args:
+        data (dict): The representation given by column_to_dict.
+    Returns:
+        (Column): The column.
+    """
+    return Column(
+        name=data[u"name"],
+        typ=data[u"type"],
+        required=data[u"required"],
+        key=data[u"key"],
+        default=data[u"default"],
+        extra=data[u"extra"]
+    )
+
+
+def write_snapshot(path, schemas):
+    """
+    Write schemas to a file. The file is replaced atomically so that a reader
+    never sees a partial snapshot.
+    Args:
+        path (unicode): The snapshot file.
+        schemas (dict): The schema of each database, by database name.
+    """
+    temporary_path = u"{}.{}.tmp".format(path, os.getpid())
+    with io.open(temporary_path, u"wb") as snapshot_file:
+        snapshot_file.write(json.dumps({
+            u"version": SNAPSHOT_VERSION,
+            u"databases": schemas
+        }).encode(u"utf-8"))
+    os.rename(temporary_path, path)
+
+
+def read_snapshot(path):
+    """
+    Read schemas written by write_snapshot.
+    Args:
+        path (unicode): The snapshot file.
+    Returns:
+        (dict): The schema of each database, by database name. Empty if the file
+            is missing or comes from another version.
+    """
+    try:
+        with io.open(path, u"rb") as snapshot_file:
+            snapshot = json.loads(snapshot_file.read().decode(u"utf-8"))
+    except (IOError, OSError, ValueError):
+        return {}
+
+    if snapshot.get(u"version") != SNAPSHOT_VERSION:
+        return {}
+    return snapshot.get(u"databases", {})
@@ -18,12 +18,14 @@ class Transaction(object):
         self.connection = connection
         self.sql_cursor = None
         self.sql_connection = None
+        # Called once the transaction is committed.
+        self._on_commit = []
 
     def begin(self):
         """
-        Begin the transaction by opening connection & cursor.
+        Begin the transaction by checking out a connection & opening a cursor.
         """
-        self.sql_connection = self.connection.connect()
+        self.sql_connection = self.connection.acquire()
         self.sql_cursor = self.sql_connection.cursor()
 
     def __enter__(self):
@@ -43,28 +45,54 @@ class Transaction(object):
             value: Value returned.
             traceback (traceback): The potential exception.
         """
-        if not traceback:
-            self.commit()
-        else:
-            self.rollback()
+        ended = False
+        try:
+            if not traceback:
+                self.commit()
+            else:
+                self.rollback()
+            ended = True
+        finally:
+            try:
+                self.sql_cursor.close()
+            finally:
+                if ended:
+                    # Nothing is pending after the commit or the rollback.
+                    self.connection.release(self.sql_connection, rollback=False)
+                else:
+                    # The transaction state is unknown, the connection can't be reused.
+                    self.connection.discard(self.sql_connection)
 
-        self.close()
+    def on_commit(self, callback):
+        """
+        Register a function to call once the transaction is committed, such as the
+        invalidation of what was cached from the tables it writes. It is called once,
+        however many times it is registered, and never if the transaction is rolled back.
+        Args:
+            callback (callable): The function, called without arguments.
+        """
+        if callback not in self._on_commit:
+            self._on_commit.append(callback)
 
     def commit(self):
         """
         To commit requests.
         """
         self.sql_connection.commit()
+        callbacks, self._on_commit = self._on_commit, []
+        for callback in callbacks:
+            callback()
 
     def rollback(self):
         """
         To cancel all operations done since the begin call.
         """
+        self._on_commit = []
         self.sql_connection.rollback()
 
     def close(self):
         """
-        To close the connection at the end of the transaction, after the commit.
+        To give back the connection at the end of the transaction, after the commit.
         """
-        self.sql_connection.close()
-        self.sql_cursor.close()
\ No newline at end of file
+        self.sql_cursor.close()
+        self.connection.release(self.sql_connection)
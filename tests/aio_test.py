@@ -0,0 +1,105 @@
+# coding: utf-8
+"""
+This file contains tests for the asyncio API.
+"""
+
+import pytest
+from mock import Mock, MagicMock
+
+asyncio = pytest.importorskip(u"asyncio")
+pytest.importorskip(u"concurrent.futures")
+
+from concurrent.futures import ThreadPoolExecutor
+from pysqlcollection.aio import AsyncDB
+from pysqlcollection.collection import Collection
+from pysqlcollection.connection.sql_exception import IntegrityException
+from pysqlcollection.serializer.api_serializer import ApiSerializer
+from pysqlcollection.serializer.mysql_serializer import MySQLSerializer
+from pysqlcollection.serializer.api_type import Column
+
+
+@pytest.fixture(scope=u"function")
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+def test_cursor_batches(loop):
+    """
+    Documents are fetched by batches in the thread pool and chained calls applied first.
+    """
+    cursor = Mock()
+    cursor.__iter__ = Mock(return_value=iter([{u"id": 1}, {u"id": 2}, {u"id": 3}]))
+    collection = Mock()
+    collection.find.return_value = cursor
+    db = Mock()
+    db.get_collection.return_value = collection
+    async_cursor = AsyncDB(ThreadPoolExecutor(2), lambda: db).client.find({u"id": 1}).sort(u"id", 1).batch_size(2)
+
+    assert loop.run_until_complete(async_cursor.__anext__()) == {u"id": 1}
+    assert loop.run_until_complete(async_cursor.__anext__()) == {u"id": 2}
+    assert loop.run_until_complete(async_cursor.__anext__()) == {u"id": 3}
+    with pytest.raises(StopAsyncIteration):
+        loop.run_until_complete(async_cursor.__anext__())
+
+    db.get_collection.assert_called_once_with(u"client")
+    collection.find.assert_called_once_with({u"id": 1})
+    cursor.sort.assert_called_once_with(u"id", 1)
+
+
+def test_transaction(loop):
+    """
+    The transaction is begun on enter, given to the writes and closed on exit.
+    """
+    transaction = MagicMock()
+    collection = Mock()
+    db = Mock()
+    db.transaction.return_value = transaction
+    db.get_collection.return_value = collection
+    async_db = AsyncDB(ThreadPoolExecutor(2), lambda: db)
+
+    async_transaction = async_db.transaction()
+    assert loop.run_until_complete(async_transaction.__aenter__()) is async_transaction
+    loop.run_until_complete(async_db.client.insert_one({u"name": u"a"}, in_transaction=async_transaction))
+    loop.run_until_complete(async_transaction.__aexit__(None, None, None))
+
+    transaction.begin.assert_called_once_with()
+    collection.insert_one.assert_called_once_with({u"name": u"a"}, in_transaction=transaction)
+    transaction.__exit__.assert_called_once_with(None, None, None)
+
+
+def test_collection_writes(loop):
+    """
+    Writes run through the synchronous collection, integrity errors reaching the caller.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+            Column(name=u"country_id", typ=u"number", required=False, key=u"mul", extra=u"", default=None)
+        ],
+        u"country": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None)
+        ]
+    }
+    connection = Mock()
+    connection.execute.return_value = 3
+    collection = Collection(api_serializer, MySQLSerializer(), connection, u"sql_collection_test", u"client")
+    db = Mock()
+    db.get_collection.return_value = collection
+    async_db = AsyncDB(ThreadPoolExecutor(2), lambda: db)
+    lookup = [{u"to": u"client", u"localField": u"country_id", u"from": u"country",
+               u"foreignField": u"id", u"as": u"country"}]
+
+    result = loop.run_until_complete(
+        async_db.client.insert_one({u"country": {u"id": 2}, u"tags": [u"a", u"b"]}, lookup=lookup)
+    )
+    assert result.inserted_id == 3
+    assert connection.execute.call_args[0][1] == [2]
+
+    connection.execute.side_effect = IntegrityException(message=u"Duplicate entry '3' for key 'PRIMARY'")
+    with pytest.raises(IntegrityException) as exec_info:
+        loop.run_until_complete(async_db.client.insert_one({u"id": 3}, lookup=[]))
+    assert exec_info.value.message == u"Duplicate entry '3' for key 'PRIMARY'"
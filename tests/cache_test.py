@@ -0,0 +1,52 @@
+# coding: utf-8
+"""
+This file contains tests for LRUCache and ResultCache classes.
+"""
+
+from mock import patch
+from pysqlcollection.cache import LRUCache, ResultCache
+
+
+def test_lru_eviction_and_stats():
+    """
+    The least recently used entry is evicted first and usage is counted.
+    """
+    cache = LRUCache(max_size=2)
+    cache.put(u"a", 1)
+    cache.put(u"b", 2)
+    assert cache.get(u"a") == 1
+    cache.put(u"c", 3)
+
+    assert u"b" not in cache
+    assert cache.get(u"b") is None
+    assert cache.stats() == {
+        u"hits": 1,
+        u"misses": 1,
+        u"evictions": 1,
+        u"size": 2,
+        u"max_size": 2
+    }
+
+
+def test_result_cache_invalidation_and_ttl():
+    """
+    Results are dropped when a table they were read from is written, or when they expire.
+    """
+    cache = ResultCache(max_size=10, ttl=60)
+    cache.put(u"db", (u"SELECT 1", ()), [1], [u"project", u"client"])
+    cache.put(u"db", (u"SELECT 2", ()), [2], [u"client"])
+    cache.put(u"other", (u"SELECT 2", ()), [3], [u"client"])
+
+    cache.invalidate(u"db", u"project")
+    assert cache.get(u"db", (u"SELECT 1", ())) is None
+    assert cache.get(u"db", (u"SELECT 2", ())) == [2]
+
+    with patch(u"pysqlcollection.cache.time.time", return_value=10 ** 12):
+        assert cache.get(u"other", (u"SELECT 2", ())) is None
+
+    stats = cache.stats()
+    assert stats[u"hits"] == 1
+    assert stats[u"misses"] == 2
+    assert stats[u"invalidations"] == 1
+    assert stats[u"expirations"] == 1
+    assert stats[u"size"] == 1
@@ -0,0 +1,322 @@
+# coding: utf-8
+"""
+This file contains tests for Collection class.
+"""
+
+import io
+import os
+import pytest
+from pytest import fixture
+from mock import Mock
+from pysqlcollection.collection import Collection, split_key_range
+from pysqlcollection.serializer.api_serializer import ApiSerializer
+from pysqlcollection.serializer.mysql_serializer import MySQLSerializer
+from pysqlcollection.serializer.api_type import Column
+from pysqlcollection.cache import ResultCache
+from pysqlcollection.transaction import Transaction
+
+try:
+    long
+except NameError:
+    # Python 3 has a single integer type.
+    long = int
+from pysqlcollection.connection.sql_exception import IntegrityException
+from pysqlcollection.serializer.api_exception import WrongParameter
+
+
+@fixture(scope=u"function")
+def relations():
+    return [
+        (u"task", u"project_id", u"project", u"id"),
+        (u"project", u"client_id", u"client", u"id"),
+        (u"client", u"country_id", u"country", u"id")
+    ]
+
+
+@fixture(scope=u"function")
+def connection(relations):
+    connection = Mock()
+    connection.execute.return_value = (relations, None)
+    return connection
+
+
+@fixture(scope=u"function")
+def task(connection):
+    return Collection(ApiSerializer(), MySQLSerializer(), connection, u"sql_collection_test", u"task")
+
+
+def test_auto_lookup_uses_cached_graph(task, connection):
+    """
+    The relation graph is loaded in one query and lookups are memoized.
+    """
+    lookup = task._auto_lookup(max_deep=2)
+
+    assert connection.execute.call_count == 1
+    assert lookup == [
+        {
+            u"to": u"task",
+            u"localField": u"project_id",
+            u"from": u"project",
+            u"foreignField": u"id",
+            u"as": u"project_id"
+        }, {
+            u"to": u"project_id",
+            u"localField": u"client_id",
+            u"from": u"client",
+            u"foreignField": u"id",
+            u"as": u"project_id.client_id"
+        }
+    ]
+
+    lookup[0][u"as"] = u"changed"
+    assert task._auto_lookup(max_deep=2)[0][u"as"] == u"project_id"
+    assert len(task._auto_lookup(max_deep=3)) == 3
+    assert connection.execute.call_count == 1
+
+
+def test_auto_lookup_invalidation(task, connection):
+    """
+    Once relations are cleared, the graph is loaded again.
+    """
+    task._auto_lookup(max_deep=1)
+    task._api_serializer.clear_relations()
+    task._auto_lookup(max_deep=1)
+
+    assert connection.execute.call_count == 2
+
+
+def test_insert_many_ids(connection):
+    """
+    Generated ids follow the last insert id of each query, given ids are kept. The generated
+    ids of a query also giving ids are unknown.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+            Column(name=u"name", typ=u"text", required=True, key=u"", extra=u"", default=None)
+        ]
+    }
+    connection.get_server_variables.return_value = {
+        u"max_allowed_packet": 4194304,
+        u"auto_increment_increment": 2
+    }
+    connection.execute.side_effect = [11, 21]
+    client = Collection(api_serializer, MySQLSerializer(), connection, u"sql_collection_test", u"client")
+
+    result = client.insert_many(
+        [{u"name": u"a"}, {u"id": 4, u"name": u"b"}, {u"name": u"c"}, {u"name": u"d"}],
+        batch_size=3
+    )
+
+    assert result.inserted_ids == [None, 4, None, 21]
+    assert connection.execute.call_count == 2
+
+    connection.execute.side_effect = [31]
+    result = client.insert_many([{u"name": u"a"}, {u"name": u"b"}, {u"name": u"c"}])
+    assert result.inserted_ids == [31, 33, 35]
+
+
+def test_find_result_cache(connection):
+    """
+    Finds and counts are served from the result cache until the table is written.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None)
+        ]
+    }
+    connection.execute_stream.side_effect = lambda query, values, batch_size: iter([([(1,)], ((u"id",),))])
+    connection.execute.side_effect = [([(1,)], None), 2, ([(2,)], None)]
+    client = Collection(api_serializer, MySQLSerializer(), connection, u"sql_collection_test", u"client",
+                        result_cache=ResultCache())
+
+    documents = list(client.find({u"id": 1}))
+    documents[0][u"id"] = 3
+    assert list(client.find({u"id": 1})) == [{u"id": 1}]
+    assert client.find().count() == 1
+    assert client.find().count() == 1
+    assert connection.execute_stream.call_count == 1
+
+    client.insert_one({u"id": 2})
+    assert list(client.find({u"id": 1})) == [{u"id": 1}]
+    assert client.find().count() == 2
+    assert connection.execute_stream.call_count == 2
+
+
+def test_invalidate_results_on_commit(connection):
+    """
+    Writes made in a transaction drop the cached results once it is committed, not before.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None)
+        ]
+    }
+    connection.execute.return_value = 2
+    result_cache = ResultCache()
+    result_cache.invalidate = Mock()
+    client = Collection(api_serializer, MySQLSerializer(), connection, u"sql_collection_test", u"client",
+                        result_cache=result_cache)
+
+    with Transaction(connection) as transaction:
+        client.insert_one({u"id": 2}, in_transaction=transaction)
+        client.delete_many({u"id": 2}, in_transaction=transaction)
+        assert not result_cache.invalidate.called
+    result_cache.invalidate.assert_called_once_with(u"sql_collection_test", u"client")
+
+    result_cache.invalidate.reset_mock()
+    with pytest.raises(ValueError):
+        with Transaction(connection) as transaction:
+            client.insert_one({u"id": 2}, in_transaction=transaction)
+            raise ValueError(u"cancelled")
+    assert not result_cache.invalidate.called
+
+
+def test_replicated_lookup(connection):
+    """
+    Lookups to a replicated table are filled from its copy instead of being joined.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+            Column(name=u"country_id", typ=u"number", required=True, key=u"mul", extra=u"", default=None)
+        ],
+        u"country": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+            Column(name=u"name", typ=u"text", required=True, key=u"", extra=u"", default=None)
+        ]
+    }
+    results = {
+        u"country": ([(1, u"France"), (2, u"Spain")], ((u"id",), (u"name",))),
+        u"client": ([(1, 2), (2, 3)], ((u"id",), (u"country_id",)))
+    }
+    queries = []
+
+    def execute_stream(query, values, batch_size):
+        queries.append(query)
+        yield results[u"country" if u"FROM country" in query else u"client"]
+
+    connection.execute_stream.side_effect = execute_stream
+    replicas = {}
+    country = Collection(api_serializer, MySQLSerializer(), connection, u"sql_collection_test", u"country",
+                         replicas=replicas)
+    client = Collection(api_serializer, MySQLSerializer(), connection, u"sql_collection_test", u"client",
+                        replicas=replicas)
+    country.replicate()
+    lookup = [{u"to": u"client", u"localField": u"country_id", u"from": u"country",
+               u"foreignField": u"id", u"as": u"country"}]
+
+    assert list(client.find(lookup=lookup)) == [
+        {u"id": 1, u"country": {u"id": 2, u"name": u"Spain"}},
+        {u"id": 2, u"country": {u"id": 3, u"name": None}}
+    ]
+    assert u"JOIN" not in queries[-1]
+    assert len(queries) == 2
+
+    list(client.find({u"country.name": u"Spain"}, lookup=lookup))
+    assert u"LEFT JOIN country" in queries[-1]
+
+    connection.execute.side_effect = None
+    connection.execute.return_value = 1
+    country.insert_one({u"name": u"Italy"})
+    list(client.find(lookup=lookup))
+    assert len([query for query in queries if u"FROM country" in query]) == 2
+
+
+def test_split_key_range():
+    """
+    Key ranges are disjoint, cover the whole range and are never empty.
+    """
+    assert split_key_range(1, 10, 3) == [(1, 4), (4, 7), (7, 11)]
+    assert split_key_range(5, 6, 4) == [(5, 6), (6, 7)]
+    assert split_key_range(3, 3, 2) == [(3, 4)]
+
+
+def test_parallel_scan(connection):
+    """
+    Each key range is read as its own query in a worker process.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None)
+        ]
+    }
+
+    def execute_stream(query, values, batch_size):
+        start, stop = values[-2:]
+        keys = [key for key in range(start, stop) if key != 5]
+        yield [(key,) for key in (keys if u"ORDER BY" in query else reversed(keys))], ((u"id",),)
+
+    connection.execute.return_value = ([(1, 10)], None)
+    connection.execute_stream.side_effect = execute_stream
+    client = Collection(api_serializer, MySQLSerializer(), connection, u"sql_collection_test", u"client")
+
+    documents = list(client.parallel_scan(lookup=[], partitions=3, workers=2, ordered=True))
+    assert [document[u"id"] for document in documents] == [1, 2, 3, 4, 6, 7, 8, 9, 10]
+    assert connection.execute.call_args[0][0] == u"SELECT MIN(`id`), MAX(`id`) FROM `client`"
+
+    documents = list(client.parallel_scan({u"id": {u"$ne": 5}}, lookup=[], workers=2, batch_size=2))
+    assert sorted(document[u"id"] for document in documents) == [1, 2, 3, 4, 6, 7, 8, 9, 10]
+
+    # The parameters are checked when called, before iterating.
+    with pytest.raises(WrongParameter):
+        client.parallel_scan(lookup=[], batch_size=0)
+    with pytest.raises(WrongParameter):
+        client.parallel_scan(lookup=[], lookup_strategy=u"unknown")
+
+
+def test_load(connection):
+    """
+    Documents are loaded by chunks, a chunk with duplicates stopping the load in error mode.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+            Column(name=u"name", typ=u"text", required=True, key=u"", extra=u"", default=None)
+        ]
+    }
+    loads = []
+    file_names = []
+
+    def execute_load(queries, abort_codes=()):
+        for query, values in queries:
+            file_names.append(values[0])
+            with open(values[0], u"rb") as data_file:
+                loads.append((query, data_file.read()))
+            if b"b" in loads[-1][1] and abort_codes:
+                yield 0, [(u"Warning", 1062, u"Duplicate entry '2' for key 'PRIMARY'")]
+                return
+            yield loads[-1][1].count(b"\n"), []
+
+    connection.execute_load.side_effect = execute_load
+    client = Collection(api_serializer, MySQLSerializer(), connection, u"sql_collection_test", u"client")
+    documents = [{u"name": u"a"}, {u"id": 2, u"name": u"b"}, {u"id": 3, u"name": u"c"}]
+
+    result = client.load(documents, lookup=[], on_duplicate=u"replace", chunk_size=2)
+    assert result.loaded_count == 3
+    assert [chunk[u"rows"] for chunk in result.chunks] == [1, 1, 1]
+    assert [data for _, data in loads] == [b"a\n", b"2\tb\n", b"3\tc\n"]
+    assert loads[0][0].endswith(u"REPLACE INTO TABLE `client` CHARACTER SET utf8 "
+                                u"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' (`name`)")
+    assert loads[1][0].endswith(u"(`id`, `name`)")
+
+    with pytest.raises(IntegrityException) as exec_info:
+        client.load(documents, lookup=[])
+    assert exec_info.value.payload[u"loaded_count"] == 1
+    assert exec_info.value.payload[u"chunks"][1][u"warnings"][0][u"code"] == 1062
+    assert exec_info.value.message == u"Duplicate entry '2' for key 'PRIMARY'"
+    assert not os.path.exists(file_names[-1])
+
+    loads[:] = []
+    rows = io.BytesIO(b"4\td\n5\te")
+    assert client.load(rows, columns=[u"id", u"name"], chunk_size=long(10)).loaded_count == 2
+    assert loads[0][1] == b"4\td\n5\te\n"
+
+    with pytest.raises(WrongParameter):
+        client.load(documents, lookup=[], chunk_size=True)
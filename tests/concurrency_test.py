@@ -0,0 +1,133 @@
+# coding: utf-8
+"""
+This file contains concurrency tests, run against a fake connection.
+"""
+
+import time
+import threading
+import pytest
+from pysqlcollection.db import DB
+from pysqlcollection.single_flight import SingleFlight
+from pysqlcollection.connection.abstract_connection import AbstractConnection
+from pysqlcollection.serializer.api_serializer import ApiSerializer
+from pysqlcollection.serializer.mysql_serializer import MySQLSerializer
+
+
+class FakeConnection(AbstractConnection):
+    """
+    Answers the discovery queries slowly and counts them.
+    """
+
+    def __init__(self):
+        AbstractConnection.__init__(self, u"user", u"password", database=u"sql_collection_test")
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def connect(self):
+        pass
+
+    def acquire(self):
+        pass
+
+    def release(self, sql_connection, rollback=True):
+        pass
+
+    def discard(self, sql_connection):
+        pass
+
+    def close(self):
+        pass
+
+    def get_server_variables(self, names):
+        return {}
+
+    def execute(self, query, values, return_lastrowid=False, return_rowcount=False, sql_cursor=None):
+        with self._lock:
+            self.queries.append(query)
+        # Leave time for the other threads to ask for the same thing.
+        time.sleep(0.05)
+        if u"DESCRIBE" in query:
+            return [(u"id", u"int(11)", u"NO", u"PRI", None, u"auto_increment")], None
+        if u"SHOW TABLES" in query:
+            return [(u"client",)], None
+        return [(u"client", u"country_id", u"country", u"id")], None
+
+    def execute_stream(self, query, values, batch_size=1000, meta=None):
+        return iter([])
+
+    def execute_load(self, queries, abort_codes=()):
+        return iter([])
+
+
+def run_threads(function, count=16):
+    errors = []
+
+    def target():
+        try:
+            function()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_concurrent_discovery_runs_once():
+    """
+    Threads using a new collection at the same time discover it once.
+    """
+    connection = FakeConnection()
+    db = DB(ApiSerializer(), MySQLSerializer(), connection)
+    collections = []
+
+    def use_collection():
+        collection = db.get_collection(u"client")
+        collections.append(collection)
+        collection.discover_columns()
+        collection.get_relations()
+        db.list_collection_names()
+
+    run_threads(use_collection)
+
+    assert len(set(id(collection) for collection in collections)) == 1
+    assert len([query for query in connection.queries if u"DESCRIBE" in query]) == 1
+    assert len([query for query in connection.queries if u"SHOW TABLES" in query]) == 1
+    assert len([query for query in connection.queries if u"KEY_COLUMN_USAGE" in query]) == 1
+
+
+def test_single_flight_shares_errors():
+    """
+    The threads waiting for a failing call get its error, the next call runs again.
+    """
+    single_flight = SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.05)
+        raise ValueError(u"failed")
+
+    errors = []
+
+    def target():
+        try:
+            single_flight.run(u"key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=target) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(errors) == 8
+    with pytest.raises(ValueError):
+        single_flight.run(u"key", fail)
+    assert len(calls) == 2
+    assert single_flight.run(u"other", lambda: 3) == 3
@@ -0,0 +1,98 @@
+# coding: utf-8
+"""
+This file contains tests for ConnectionPool class.
+"""
+
+import pytest
+from mock import Mock
+from pysqlcollection.connection.pool import ConnectionPool
+from pysqlcollection.connection.sql_exception import PoolTimeoutException
+
+
+def test_acquire_reuses_released_connection():
+    """
+    A released connection is given back on next checkout.
+    """
+    factory = Mock(side_effect=lambda: Mock())
+    pool = ConnectionPool(factory, max_size=2)
+
+    connection = pool.acquire()
+    pool.release(connection)
+
+    assert pool.acquire() is connection
+    assert factory.call_count == 1
+    assert pool.size == 1
+
+
+def test_acquire_timeout_when_pool_is_full():
+    """
+    Checkout fails once max_size connections are checked out.
+    """
+    pool = ConnectionPool(Mock, max_size=1, checkout_timeout=0.01)
+    pool.acquire()
+
+    with pytest.raises(PoolTimeoutException) as exec_info:
+        pool.acquire()
+
+    assert exec_info.value.api_error_code == u"POOL_TIMEOUT"
+
+
+def test_dead_connection_is_replaced():
+    """
+    A connection failing the liveness check is closed and replaced.
+    """
+    dead = Mock()
+    dead.ping.side_effect = Exception(u"gone away")
+    alive = Mock()
+    pool = ConnectionPool(Mock(side_effect=[dead, alive]), ping=lambda connection: connection.ping())
+
+    pool.release(pool.acquire())
+
+    assert pool.acquire() is alive
+    assert dead.close.called
+    assert pool.size == 1
+
+
+def test_expired_connections_are_closed():
+    """
+    Connections over max_lifetime or idle_timeout leave the pool, min_size excepted.
+    """
+    pool = ConnectionPool(Mock, max_lifetime=0)
+    connection = pool.acquire()
+    pool.release(connection)
+    assert connection.close.called
+    assert pool.size == 0
+
+    pool = ConnectionPool(Mock, min_size=1, idle_timeout=0)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    pool.acquire()
+    assert first.close.called
+    assert not second.close.called
+    assert pool.size == 1
+
+
+def test_fork_drops_inherited_connections(monkeypatch):
+    """
+    After a fork, the connections of the parent are neither reused nor closed.
+    """
+    pool = ConnectionPool(Mock(side_effect=lambda: Mock()), max_size=2)
+    idle = pool.acquire()
+    checked_out = pool.acquire()
+    pool.release(idle)
+
+    monkeypatch.setattr(u"pysqlcollection.connection.pool.os.getpid", lambda: -1)
+
+    assert pool.size == 0
+    assert not pool.owns(checked_out)
+    pool.release(checked_out)
+    pool.close()
+    assert not idle.close.called
+    assert not checked_out.close.called
+    assert pool._inherited == [idle, checked_out]
+
+    connection = pool.acquire()
+    assert connection is not idle and connection is not checked_out
+    assert pool.owns(connection)
+    assert pool.size == 1
@@ -3,10 +3,22 @@
 This file contains tests for Cursor class.
 """
 
+import io
 import json
+import pytest
 from pytest import fixture
 from mock import Mock
 from pysqlcollection.cursor import Cursor
+from pysqlcollection.serializer.api_type import Select, Column
+from pysqlcollection.serializer.api_serializer import ApiSerializer
+from pysqlcollection.serializer.api_exception import WrongParameter
+from pysqlcollection.serializer.mysql_serializer import MySQLSerializer
+
+try:
+    long
+except NameError:
+    # Python 3 has a single integer type.
+    long = int
 
 
 @fixture(scope=u"function")
@@ -77,4 +89,318 @@ def test_deduplicate_lookup(cursor):
                 u"id": 2.0
             }
         ]
-    ]
\ No newline at end of file
+    ]
+
+
+def test_iter_streams_by_batch():
+    """
+    Documents are yielded while batches are fetched, with the cursor batch size.
+    """
+    description = ((u"id",), (u"client.name",))
+    fetched = []
+
+    def execute_stream(query, values, batch_size):
+        for batch in [[(1, u"a"), (2, u"b")], [(3, u"c")]]:
+            fetched.append(batch)
+            yield batch, description
+
+    sql_serializer = Mock()
+    sql_serializer.encode_select.return_value = (u"SELECT", [])
+    connection = Mock()
+    connection.execute_stream.side_effect = execute_stream
+    cursor = Cursor(sql_serializer, ApiSerializer(), connection, Select()).batch_size(2)
+
+    iterator = iter(cursor)
+    assert next(iterator) == {u"id": 1, u"client": {u"name": u"a"}}
+    assert len(fetched) == 1
+    assert [item[u"id"] for item in iterator] == [2, 3]
+    connection.execute_stream.assert_called_once_with(u"SELECT", [], 2)
+
+
+def test_batch_size_validation(cursor):
+    """
+    Any integer type is a valid batch size, such as the longs read from MySQL.
+    """
+    assert cursor.batch_size(long(500)) is cursor
+    with pytest.raises(WrongParameter):
+        cursor.batch_size(0)
+    with pytest.raises(WrongParameter):
+        cursor.batch_size(1.5)
+
+
+def test_after_next_token():
+    """
+    The token of the last iterated document gives the next page.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+            Column(name=u"name", typ=u"text", required=True, key=u"", extra=u"", default=None)
+        ]
+    }
+    connection = Mock()
+    connection.execute_stream.return_value = iter([([(3, u"b"), (4, u"b")], ((u"id",), (u"name",)))])
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"))
+    cursor.sort(u"name", 1).after(None).limit(2)
+
+    assert len(list(cursor)) == 2
+    next_page = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"))
+    next_page.sort(u"name", 1).after(cursor.next_token)
+    assert next_page.statement.after == [u"b", 4]
+
+    with pytest.raises(WrongParameter):
+        next_page.after(u"not a token")
+
+
+def test_with_total():
+    """
+    The unpaged total comes from the window column or from FOUND_ROWS(), else from a count.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None)
+        ]
+    }
+    connection = Mock()
+    connection.get_server_variables.return_value = {u"version": u"8.0.32"}
+    connection.execute_stream.return_value = iter([([(1, 7), (2, 7)], ((u"id",), (u"__total",)))])
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"))
+
+    assert list(cursor.with_total().limit(2)) == [{u"id": 1}, {u"id": 2}]
+    assert cursor.total == 7
+
+    def execute_stream(query, values, batch_size, meta):
+        yield [(1,)], ((u"id",),)
+        meta[u"found_rows"] = 5
+
+    connection.get_server_variables.return_value = {u"version": u"5.7.41"}
+    connection.execute_stream.side_effect = execute_stream
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"))
+
+    assert list(cursor.with_total().limit(1)) == [{u"id": 1}]
+    assert cursor.total == 5
+
+    # An empty skipped page is counted with a second query.
+    connection.get_server_variables.return_value = {u"version": u"8.0.32"}
+    connection.execute_stream.side_effect = None
+    connection.execute_stream.return_value = iter([])
+    connection.execute.return_value = ([(3,)], None)
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"))
+
+    assert list(cursor.with_total().skip(10).limit(1)) == []
+    assert cursor.total == 3
+    assert connection.execute.call_args[0][0].startswith(u"SELECT COUNT(*)")
+
+
+def test_multiple_lookup_grouped():
+    """
+    Rows of a multiple lookup are folded in the root documents while streaming.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None)
+        ],
+        u"tag": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+            Column(name=u"client_id", typ=u"number", required=True, key=u"mul", extra=u"", default=None)
+        ]
+    }
+    lookup = [{u"to": u"client", u"localField": u"id", u"from": u"tag",
+               u"foreignField": u"client_id", u"as": u"tags", u"type": u"multiple"}]
+    description = ((u"id",), (u"tags.id",), (u"tags.client_id",))
+    connection = Mock()
+    connection.execute_stream.return_value = iter([
+        ([(1, 10, 1), (1, 11, 1), (2, None, None)], description)
+    ])
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection,
+                    api_serializer.decode_find(u"client", None, None, lookup), lookup)
+    cursor.sort(u"id", 1)
+
+    assert list(cursor) == [
+        {u"id": 1, u"tags": [{u"id": 10, u"client_id": 1}, {u"id": 11, u"client_id": 1}]},
+        {u"id": 2, u"tags": []}
+    ]
+    assert cursor._grouper().contiguous
+
+    # Totals count the folded documents, not the joined rows.
+    connection.execute_stream.return_value = iter([([(1, 10, 1), (1, 11, 1)], description)])
+    connection.execute.return_value = ([(1,)], None)
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection,
+                    api_serializer.decode_find(u"client", None, None, lookup), lookup).with_total()
+    assert len(list(cursor)) == 1
+    assert cursor.total == 1
+    assert connection.execute.call_args[0][0].startswith(u"SELECT COUNT(*) FROM client")
+
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection,
+                    api_serializer.decode_find(u"client", None, {u"id": -1}, lookup), lookup)
+    with pytest.raises(WrongParameter):
+        list(cursor)
+
+    # A multiple lookup nested in another one is folded in each of its documents.
+    api_serializer.table_columns[u"task"] = [
+        Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+        Column(name=u"tag_id", typ=u"number", required=True, key=u"mul", extra=u"", default=None)
+    ]
+    nested_lookup = lookup + [{u"to": u"tags", u"localField": u"id", u"from": u"task",
+                               u"foreignField": u"tag_id", u"as": u"tags.tasks", u"type": u"multiple"}]
+    connection.execute_stream.return_value = iter([
+        ([(1, 10, 1, 100, 10), (1, 10, 1, 101, 10)],
+         ((u"id",), (u"tags.id",), (u"tags.client_id",), (u"tags.tasks.id",), (u"tags.tasks.tag_id",)))
+    ])
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection,
+                    api_serializer.decode_find(u"client", None, None, nested_lookup), nested_lookup)
+    assert list(cursor) == [{
+        u"id": 1,
+        u"tags": [{u"id": 10, u"client_id": 1, u"tasks": [{u"id": 100, u"tag_id": 10}, {u"id": 101, u"tag_id": 10}]}]
+    }]
+
+
+def test_batched_lookup():
+    """
+    Documents of a batched lookup are fetched with an IN query and set in their parents.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None)
+        ],
+        u"tag": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+            Column(name=u"client_id", typ=u"number", required=True, key=u"mul", extra=u"", default=None)
+        ]
+    }
+    look = {u"to": u"client", u"localField": u"id", u"from": u"tag",
+            u"foreignField": u"client_id", u"as": u"tags", u"type": u"multiple"}
+    results = [
+        ([(1,), (2,), (3,)], ((u"id",),)),
+        ([(10, 1), (11, 1), (12, 3)], ((u"id",), (u"client_id",)))
+    ]
+    queries = []
+
+    def execute_stream(query, values, batch_size):
+        queries.append((query, values))
+        yield results[len(queries) - 1]
+
+    connection = Mock()
+    connection.execute_stream.side_effect = execute_stream
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection,
+                    api_serializer.decode_find(u"client"), [], [(look, [])])
+
+    assert list(cursor.limit(3)) == [
+        {u"id": 1, u"tags": [{u"id": 10, u"client_id": 1}, {u"id": 11, u"client_id": 1}]},
+        {u"id": 2, u"tags": []},
+        {u"id": 3, u"tags": [{u"id": 12, u"client_id": 3}]}
+    ]
+    assert u"IN (%s, %s, %s)" in queries[1][0]
+    assert queries[1][1] == [1, 2, 3]
+
+
+def test_json_documents():
+    """
+    Documents built by the server are decoded from one JSON column, old servers
+    falling back to the rows.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None)
+        ]
+    }
+    connection = Mock()
+    connection.get_server_variables.return_value = {u"version": u"8.0.32"}
+    connection.execute_stream.return_value = iter([
+        ([(u'{"id": 1, "tags": [{"id": 10}]}',)], ((u"document",),))
+    ])
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"),
+                    json_documents=True)
+    assert list(cursor) == [{u"id": 1.0, u"tags": [{u"id": 10.0}]}]
+    assert u"JSON_OBJECT" in connection.execute_stream.call_args[0][0]
+
+    # Counted without the multiple lookups, nor the lookups made from them.
+    api_serializer.table_columns[u"tag"] = [
+        Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+        Column(name=u"client_id", typ=u"number", required=True, key=u"mul", extra=u"", default=None),
+        Column(name=u"user_id", typ=u"number", required=True, key=u"mul", extra=u"", default=None)
+    ]
+    api_serializer.table_columns[u"user"] = [
+        Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+        Column(name=u"name", typ=u"text", required=True, key=u"", extra=u"", default=None)
+    ]
+    lookup = [
+        {u"to": u"client", u"localField": u"id", u"from": u"tag",
+         u"foreignField": u"client_id", u"as": u"tags", u"type": u"multiple"},
+        {u"to": u"tags", u"localField": u"user_id", u"from": u"user",
+         u"foreignField": u"id", u"as": u"tags.user_id"}
+    ]
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection,
+                    api_serializer.decode_find(u"client", None, None, lookup), lookup, json_documents=True)
+    cursor._use_json_documents()
+    assert [join.as_alias for join in cursor._count_statement().joins] == []
+
+    connection.get_server_variables.return_value = {u"version": u"5.6.51"}
+    connection.execute_stream.return_value = iter([([(1,)], ((u"id",),))])
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"),
+                    json_documents=True)
+    assert list(cursor) == [{u"id": 1}]
+    assert u"JSON_OBJECT" not in connection.execute_stream.call_args[0][0]
+
+
+def test_export():
+    """
+    Export streams every document, unless asked for the current page only.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None)
+        ]
+    }
+    connection = Mock()
+    connection.execute_stream.side_effect = lambda query, values, batch_size: iter([
+        ([(1,), (2,)], ((u"id",),)),
+        ([(3,)], ((u"id",),))
+    ])
+    fileobj = io.BytesIO()
+
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"))
+    assert cursor.export(fileobj, batch_size=2) == {u"rows": 3, u"bytes": len(fileobj.getvalue())}
+    assert [json.loads(line) for line in fileobj.getvalue().decode(u"utf-8").splitlines()] == [
+        {u"id": 1}, {u"id": 2}, {u"id": 3}
+    ]
+    assert u"LIMIT" not in connection.execute_stream.call_args[0][0]
+    assert connection.execute_stream.call_args[0][2] == 2
+
+    # Exporting everything doesn't change how the cursor paginates afterwards.
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"))
+    cursor.export(io.BytesIO())
+    list(cursor)
+    assert u"LIMIT" in connection.execute_stream.call_args[0][0]
+
+    fileobj = io.BytesIO()
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection, api_serializer.decode_find(u"client"))
+    cursor.export(fileobj, format=u"csv", with_limit_and_skip=True)
+    assert u"LIMIT" in connection.execute_stream.call_args[0][0]
+    assert fileobj.getvalue() == b"id\r\n1\r\n2\r\n3\r\n"
+
+    # The columns come from the statement, the lists of multiple lookups being written as JSON.
+    api_serializer.table_columns[u"tag"] = [
+        Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+        Column(name=u"client_id", typ=u"number", required=True, key=u"mul", extra=u"", default=None)
+    ]
+    lookup = [{u"to": u"client", u"localField": u"id", u"from": u"tag",
+               u"foreignField": u"client_id", u"as": u"tags", u"type": u"multiple"}]
+    connection.execute_stream.side_effect = lambda query, values, batch_size: iter([
+        ([(1, 1, 1), (1, 2, 1)], ((u"id",), (u"tags.id",), (u"tags.client_id",)))
+    ])
+    fileobj = io.BytesIO()
+    cursor = Cursor(MySQLSerializer(), api_serializer, connection,
+                    api_serializer.decode_find(u"client", None, None, lookup), lookup)
+    cursor.export(fileobj, format=u"csv")
+    header, line, _ = fileobj.getvalue().decode(u"utf-8").split(u"\r\n")
+    assert header == u"id,tags"
+    key, tags = line.split(u",", 1)
+    assert key == u"1"
+    assert json.loads(tags[1:-1].replace(u"\"\"", u"\"")) == [{u"id": 1, u"client_id": 1}, {u"id": 2, u"client_id": 1}]
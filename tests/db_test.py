@@ -0,0 +1,97 @@
+# coding: utf-8
+"""
+This file contains tests for DB class.
+"""
+
+from mock import Mock
+from pysqlcollection.db import DB
+from pysqlcollection.collection import Collection
+from pysqlcollection.serializer.api_serializer import ApiSerializer
+from pysqlcollection.serializer.mysql_serializer import MySQLSerializer
+from pysqlcollection.snapshot import read_snapshot, write_snapshot
+
+
+def test_discover_schema():
+    """
+    Bulk introspection fills columns and relations of every table in two queries.
+    """
+    connection = Mock(_database=u"sql_collection_test")
+    connection.execute.side_effect = [
+        ([
+            (u"client", u"id", u"int(11)", u"NO", u"PRI", None, u"auto_increment"),
+            (u"client", u"country_id", u"int(11)", u"NO", u"MUL", None, u""),
+            (u"country", u"id", u"int(11)", u"NO", u"PRI", None, u"auto_increment")
+        ], None),
+        ([
+            (u"client", u"country_id", u"country", u"id")
+        ], None)
+    ]
+    api_serializer = ApiSerializer()
+
+    db = DB(api_serializer, MySQLSerializer(), connection, bulk_introspection=True)
+
+    assert connection.execute.call_count == 2
+    assert [column.name for column in api_serializer.table_columns[u"client"]] == [u"id", u"country_id"]
+    assert api_serializer.table_columns[u"client"][1].key == u"mul"
+    assert api_serializer.table_relations == {
+        u"client": [(u"client", u"country_id", u"country", u"id")],
+        u"country": []
+    }
+    assert isinstance(db.country, Collection)
+    assert db.client._auto_lookup(max_deep=1) == [{
+        u"to": u"client",
+        u"localField": u"country_id",
+        u"from": u"country",
+        u"foreignField": u"id",
+        u"as": u"country_id"
+    }]
+    assert connection.execute.call_count == 2
+
+
+def test_schema_snapshot_round_trip(tmpdir):
+    """
+    A dumped schema written to a snapshot loads back without any query.
+    """
+    connection = Mock(_database=u"sql_collection_test")
+    connection.execute.side_effect = [
+        ([(u"1-2:0-0",)], None),
+        ([(u"country", u"id", u"int(11)", u"NO", u"PRI", None, u"auto_increment")], None),
+        ([], None)
+    ]
+    db = DB(ApiSerializer(), MySQLSerializer(), Mock(), schema={u"tables": {}, u"relations": {}})
+    db._connection = connection
+    path = str(tmpdir.join(u"schema.json"))
+    write_snapshot(path, {u"sql_collection_test": db.dump_schema()})
+
+    api_serializer = ApiSerializer()
+    loading_connection = Mock(_database=u"sql_collection_test")
+    schema = read_snapshot(path)[u"sql_collection_test"]
+    loaded = DB(api_serializer, MySQLSerializer(), loading_connection, schema=schema)
+
+    assert schema[u"checksum"] == u"1-2:0-0"
+    assert not loading_connection.execute.called
+    assert isinstance(loaded.country, Collection)
+    column = api_serializer.table_columns[u"country"][0]
+    assert (column.name, column.type, column.key, column.extra) == (
+        u"id", u"number", u"pri", u"auto_increment"
+    )
+    assert api_serializer.table_relations == {u"country": []}
+    assert read_snapshot(str(tmpdir.join(u"missing.json"))) == {}
+
+
+def test_collections_are_lazy():
+    """
+    No query is run to create a DB and collections are created on access, in a bounded cache.
+    """
+    connection = Mock(_database=u"sql_collection_test")
+    db = DB(ApiSerializer(), MySQLSerializer(), connection, collection_cache_size=2)
+
+    country = db.country
+    assert not connection.execute.called
+    assert country.table_name == u"country"
+    assert db.country is country
+
+    db.client
+    db.project
+    assert db.get_collection(u"country") is not country
+    assert len(db._collections) == 2
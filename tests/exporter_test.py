@@ -0,0 +1,84 @@
+# coding: utf-8
+"""
+This file contains tests for DocumentWriter class.
+"""
+
+import io
+import json
+import pytest
+from pysqlcollection.exporter import DocumentWriter
+from pysqlcollection.serializer.api_exception import WrongParameter
+
+
+@pytest.fixture(scope=u"function")
+def documents():
+    return [
+        {u"id": 1.0, u"name": u"Zoé, \"ZZ\"", u"country": {u"id": 2.0, u"name": u"France"}, u"tags": [u"a"]},
+        {u"id": 2.0, u"name": None, u"country": {u"id": None, u"name": None}, u"tags": []}
+    ]
+
+
+def test_write_ndjson(documents):
+    """
+    Each document is a JSON line, written as UTF-8 to binary files.
+    """
+    fileobj = io.BytesIO()
+    writer = DocumentWriter(fileobj, buffer_size=1)
+    for document in documents:
+        writer.write(document)
+    writer.flush()
+
+    lines = fileobj.getvalue().decode(u"utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == documents
+    assert writer.rows == 2
+    assert writer.bytes == len(fileobj.getvalue())
+
+
+def test_write_csv(documents):
+    """
+    Nested documents are flattened into dotted columns, text files are given unicode.
+    """
+    fileobj = io.StringIO()
+    writer = DocumentWriter(fileobj, format=u"csv")
+    for document in documents:
+        writer.write(document)
+    assert fileobj.getvalue() == u""
+    writer.flush()
+
+    lines = fileobj.getvalue().split(u"\r\n")
+    columns = lines[0].split(u",")
+    assert sorted(columns) == [u"country.id", u"country.name", u"id", u"name", u"tags"]
+    first = {
+        u"id": u"1",
+        u"name": u"\"Zoé, \"\"ZZ\"\"\"",
+        u"country.id": u"2",
+        u"country.name": u"France",
+        u"tags": u"\"[\"\"a\"\"]\""
+    }
+    assert lines[1] == u",".join(first[column] for column in columns)
+    second = {u"id": u"2", u"tags": u"[]"}
+    assert lines[2] == u",".join(second.get(column, u"") for column in columns)
+    assert writer.bytes == len(fileobj.getvalue().encode(u"utf-8"))
+
+
+def test_write_csv_columns(documents):
+    """
+    Given columns are written in their order, each one with the encoder of its type.
+    """
+    fileobj = io.StringIO()
+    columns = [(u"id", u"number"), (u"country.name", u"text"), (u"tags", u"json"), (u"missing", None)]
+    writer = DocumentWriter(fileobj, format=u"csv", columns=columns)
+    for document in documents:
+        writer.write(document)
+    writer.flush()
+    assert fileobj.getvalue().split(u"\r\n") == [
+        u"id,country.name,tags,missing",
+        u"1,France,\"[\"\"a\"\"]\",",
+        u"2,,[],",
+        u""
+    ]
+
+
+def test_write_wrong_format():
+    with pytest.raises(WrongParameter):
+        DocumentWriter(io.BytesIO(), format=u"xml")
@@ -0,0 +1,81 @@
+# coding: utf-8
+"""
+This file contains tests for DocumentGrouper class.
+"""
+
+from pysqlcollection.grouper import DocumentGrouper
+
+
+def rows():
+    return [
+        {u"id": 1, u"tags": {u"id": 10, u"name": u"a"}, u"users": {u"id": 5}},
+        {u"id": 1, u"tags": {u"id": 11, u"name": u"b"}, u"users": {u"id": 5}},
+        {u"id": 1, u"tags": {u"id": 10, u"name": u"a"}, u"users": {u"id": 6}},
+        {u"id": 2, u"tags": {u"id": None, u"name": None}, u"users": {u"id": 5}},
+        {u"id": 1, u"tags": {u"id": 12, u"name": u"c"}, u"users": {u"id": 5}}
+    ]
+
+
+def test_group():
+    """
+    Joined rows are folded by root key without duplicates, unmatched joins giving empty lists.
+    """
+    grouper = DocumentGrouper(u"id", [(u"tags", u"id"), (u"users", None)])
+    assert list(grouper.group(rows())) == [
+        {
+            u"id": 1,
+            u"tags": [{u"id": 10, u"name": u"a"}, {u"id": 11, u"name": u"b"}, {u"id": 12, u"name": u"c"}],
+            u"users": [{u"id": 5}, {u"id": 6}]
+        },
+        {u"id": 2, u"tags": [], u"users": [{u"id": 5}]}
+    ]
+
+
+def test_group_contiguous():
+    """
+    When the rows are ordered by root key, a document is given as soon as the key changes.
+    """
+    grouper = DocumentGrouper(u"id", [(u"tags", u"id")], contiguous=True)
+    items = rows()[:4]
+    assert grouper.feed(items[0]) == []
+    assert grouper.feed(items[1]) == []
+    assert grouper.feed(items[2]) == []
+    finished = grouper.feed(items[3])
+    assert [document[u"id"] for document in finished] == [1]
+    assert len(finished[0][u"tags"]) == 2
+    assert grouper.flush() == [{u"id": 2, u"tags": [], u"users": {u"id": 5}}]
+
+
+def test_group_nested():
+    """
+    A multiple lookup nested in another one is folded in each of its documents.
+    """
+    grouper = DocumentGrouper(u"id", [(u"projects", u"id", [(u"tasks", u"id")])])
+    items = [
+        {u"id": 1, u"projects": {u"id": 10, u"tasks": {u"id": 100}}},
+        {u"id": 1, u"projects": {u"id": 10, u"tasks": {u"id": 101}}},
+        {u"id": 1, u"projects": {u"id": 11, u"tasks": {u"id": 100}}},
+        {u"id": 1, u"projects": {u"id": 12, u"tasks": {u"id": None}}},
+        {u"id": 2, u"projects": {u"id": None, u"tasks": {u"id": None}}}
+    ]
+    assert list(grouper.group(items)) == [
+        {
+            u"id": 1,
+            u"projects": [
+                {u"id": 10, u"tasks": [{u"id": 100}, {u"id": 101}]},
+                {u"id": 11, u"tasks": [{u"id": 100}]},
+                {u"id": 12, u"tasks": []}
+            ]
+        },
+        {u"id": 2, u"projects": []}
+    ]
+
+    # Without key, the joined documents are compared without their nested lookups.
+    grouper = DocumentGrouper(u"id", [(u"projects", None, [(u"tasks", None)])])
+    items = [
+        {u"id": 1, u"projects": {u"name": u"a", u"tasks": {u"name": u"x"}}},
+        {u"id": 1, u"projects": {u"name": u"a", u"tasks": {u"name": u"y"}}}
+    ]
+    assert list(grouper.group(items)) == [
+        {u"id": 1, u"projects": [{u"name": u"a", u"tasks": [{u"name": u"x"}, {u"name": u"y"}]}]}
+    ]
@@ -0,0 +1,48 @@
+# coding: utf-8
+"""
+This file contains tests for RowBuilder class.
+"""
+
+from datetime import datetime
+from pysqlcollection.row_builder import RowBuilder
+from pysqlcollection.serializer.api_type import Column, Field, Table
+
+try:
+    long
+except NameError:
+    # Python 3 has a single integer type.
+    long = int
+
+
+def test_build_nested_document():
+    """
+    Dotted aliases become nested dicts and cells are converted regarding the column type.
+    """
+    table = Table(name=u"project")
+    fields = [
+        Field(table, Column(u"id", u"number", True, u"pri", None, u""), alias=u"id"),
+        Field(table, Column(u"created", u"timestamp", True, u"", None, u""), alias=u"created"),
+        Field(table, Column(u"name", u"text", True, u"", None, u""), alias=u"client_id.country_id.name")
+    ]
+    description = (
+        (u"id",), (u"created",), (u"client_id.id",), (u"client_id.country_id.name",)
+    )
+    builder = RowBuilder(description, fields)
+
+    assert builder.paths[3] == (u"client_id", u"country_id", u"name")
+
+    row = (long(1), datetime(1970, 1, 2), long(2), u"France")
+    document = builder.build(row)
+    assert document == {
+        u"id": 1.0,
+        u"created": 86400,
+        u"client_id": {
+            u"id": 2.0,
+            u"country_id": {u"name": u"France"}
+        }
+    }
+    assert isinstance(document[u"id"], float)
+
+    # Each row gets its own containers.
+    assert builder.build(row) is not document
+    assert builder.build(row)[u"client_id"] is not document[u"client_id"]
@@ -15,10 +15,12 @@ from pysqlcollection.serializer.api_type import (
     Field,
     And,
     Sort,
-    Or
+    Or,
+    DEFAULT
 )
 from pysqlcollection.serializer.api_exception import (
-    WrongParameter
+    WrongParameter,
+    MissingField
 )
 
 
@@ -273,3 +275,60 @@ def test_decode_query_and(api_serializer, project_fields):
     assert client_id_gte.operator.value == u">="
     assert client_id_gte.field.alias == u"client.id"
     assert client_id_gte.value == 12
+
+def test_decode_find_plan_cache(api_serializer):
+    """
+    A find with a known shape reuses the cached plan and only binds the new values.
+    """
+    first = api_serializer.decode_find(u"project", {u"name": u"a", u"client_id": {u"$gte": 1}})
+    second = api_serializer.decode_find(u"project", {u"client_id": {u"$gte": 7}, u"name": u"b"})
+
+    assert api_serializer.plan_cache.stats()[u"hits"] == 1
+    assert api_serializer.plan_cache.stats()[u"misses"] == 1
+    assert second.plan is first.plan
+    assert second.fields[0] is first.fields[0]
+    # Keys are decoded in sorted order whatever the order they came in.
+    assert [filt.value for filt in second.filters.filters[0].filters] == [7]
+    assert second.filters.filters[1].value == u"b"
+
+    api_serializer.decode_find(u"project", {u"name": u"a", u"id": 3})
+    assert api_serializer.plan_cache.stats()[u"misses"] == 2
+
+    api_serializer.table_columns[u"client"] = []
+    assert len(api_serializer.plan_cache) == 0
+
+def test_decode_insert_many(api_serializer):
+    """
+    Documents share the same fields, missing values are left to default.
+    """
+    lookup = [{u"to": u"project", u"localField": u"client_id", u"from": u"client",
+               u"foreignField": u"id", u"as": u"client_id"}]
+    insert = api_serializer.decode_insert_many(u"project", [
+        {u"name": u"a", u"client_id": {u"id": 1}},
+        {u"id": 8, u"name": u"b", u"client_id": {u"id": 2}}
+    ], lookup)
+
+    assert [field.column.name for field in insert.fields] == [u"id", u"name", u"client_id"]
+    assert insert.rows == [[DEFAULT, u"a", 1], [8, u"b", 2]]
+
+    with pytest.raises(MissingField):
+        api_serializer.decode_insert_many(u"project", [{u"name": u"a"}])
+
+
+def test_split_batch_lookup(api_serializer):
+    """
+    Multiple lookups are set apart with their nested lookups, rewritten from their table.
+    """
+    lookup = [
+        {u"to": u"project", u"localField": u"client_id", u"from": u"client", u"foreignField": u"id",
+         u"as": u"client_id"},
+        {u"to": u"project", u"localField": u"id", u"from": u"task", u"foreignField": u"project_id",
+         u"as": u"tasks", u"type": u"multiple"},
+        {u"to": u"tasks", u"localField": u"user_id", u"from": u"user", u"foreignField": u"id",
+         u"as": u"tasks.user_id"}
+    ]
+    joined, batched = api_serializer.split_batch_lookup(u"project", lookup)
+    assert joined == [lookup[0]]
+    assert batched == [(lookup[1], [
+        {u"to": u"task", u"localField": u"user_id", u"from": u"user", u"foreignField": u"id", u"as": u"user_id"}
+    ])]
@@ -3,9 +3,13 @@
 This file contains tests for MySQLSerializer class.
 """
 
+import pytest
 from pytest import fixture
 
+from pysqlcollection.serializer.api_serializer import ApiSerializer
+from pysqlcollection.serializer.api_type import Column, Table, Field, InsertMany, DEFAULT
 from pysqlcollection.serializer.mysql_serializer import MySQLSerializer
+from pysqlcollection.serializer.api_exception import WrongParameter
 
 
 @fixture(scope=u"function")
@@ -65,3 +69,254 @@ def test_interpret_db_column(mysql_serializer):
     assert column.default is None
     assert column.extra == u""
 
+
+@fixture(scope=u"function")
+def api_serializer():
+    """
+    Initiate an api serializer knowing a client table.
+    """
+    api_serializer = ApiSerializer()
+    api_serializer.table_columns = {
+        u"client": [
+            Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+            Column(name=u"name", typ=u"text", required=True, key=u"", extra=u"", default=None)
+        ]
+    }
+    return api_serializer
+
+def test_encode_select_from_plan(mysql_serializer, api_serializer):
+    """
+    Selects sharing a plan reuse its SQL text with their own values.
+    """
+    first = api_serializer.decode_find(u"client", {u"name": u"a"})
+    query, values = mysql_serializer.encode_select(first)
+    assert values == [u"a", 100, 0]
+
+    second = api_serializer.decode_find(u"client", {u"name": u"b"})
+    second.offset = 10
+    assert mysql_serializer.encode_select(second) == (query, [u"b", 100, 10])
+    assert len(first.plan.encoded) == 1
+
+    second = api_serializer.decode_sort(second, u"name", -1)
+    assert mysql_serializer.encode_select(second)[0] != query
+    assert len(first.plan.encoded) == 2
+
+def test_encode_insert_many_chunks(mysql_serializer):
+    """
+    Rows are split by batch size and by packet size.
+    """
+    table = Table(name=u"client")
+    insert = InsertMany(
+        table=table,
+        fields=[
+            Field(table, Column(u"id", u"number", True, u"pri", None, u"auto_increment")),
+            Field(table, Column(u"name", u"text", True, u"", None, u""))
+        ],
+        rows=[[DEFAULT, u"a"], [5, u"b"], [DEFAULT, u"c" * 50]]
+    )
+
+    chunks = list(mysql_serializer.encode_insert_many(insert, max_packet_size=1000, batch_size=2))
+    assert chunks == [
+        (u"INSERT INTO client(id, name) VALUES (DEFAULT, %s), (%s, %s)", [u"a", 5, u"b"], 0, 2),
+        (u"INSERT INTO client(id, name) VALUES (DEFAULT, %s)", [u"c" * 50], 2, 3)
+    ]
+
+    chunks = list(mysql_serializer.encode_insert_many(insert, max_packet_size=100))
+    assert [(start, end) for _, _, start, end in chunks] == [(0, 2), (2, 3)]
+
+def test_encode_after(mysql_serializer, api_serializer):
+    """
+    Keyset pagination compares a row when directions are the same, expands it otherwise.
+    """
+    select = api_serializer.decode_find(u"client", {u"name": {u"$ne": u"x"}})
+    select = api_serializer.decode_sort(select, u"name", 1)
+    select = api_serializer.decode_after(select, [u"b", 4])
+
+    query, values = mysql_serializer.encode_select(select)
+    assert u"WHERE ((`name` != %s)) AND (`name`, `id`) > (%s, %s) ORDER BY `name` ASC, `id` ASC" in query
+    assert values == [u"x", u"b", 4, 100, 0]
+
+    select = api_serializer.decode_sort(select, [(u"name", -1), (u"id", 1)])
+    assert mysql_serializer.encode_after(select) == (
+        u"((`client`.name < %s) OR (`client`.name = %s AND `client`.id > %s))",
+        [u"b", u"b", 4]
+    )
+
+@fixture(scope=u"function")
+def lookup(api_serializer):
+    """
+    Add a project table to the api serializer and return a lookup from project to client.
+    """
+    api_serializer.table_columns[u"project"] = [
+        Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+        Column(name=u"client_id", typ=u"number", required=True, key=u"mul", extra=u"", default=None)
+    ]
+    return [{u"to": u"project", u"localField": u"client_id", u"from": u"client",
+             u"foreignField": u"id", u"as": u"client_id"}]
+
+def test_encode_flat_select(api_serializer, lookup):
+    """
+    Flattened selects filter and sort on the table columns.
+    """
+    select = api_serializer.decode_find(u"project", {u"client_id.name": u"a"}, {u"id": -1}, lookup)
+    select = api_serializer.decode_sort(select, u"client_id.name", -1)
+
+    query, values = MySQLSerializer(flatten_select=True).encode_select(select)
+    assert u" ".join(query.split()) == (
+        u"SELECT `project`.client_id AS 'client_id.id', `client_id`.name AS 'client_id.name' "
+        u"FROM project `project` LEFT JOIN client `client_id` ON `project`.client_id = `client_id`.id "
+        u"WHERE (`client_id`.name = %s) ORDER BY `client_id`.name DESC LIMIT %s OFFSET %s"
+    )
+    assert values == [u"a", 100, 0]
+
+def test_prune_joins(mysql_serializer, api_serializer, lookup):
+    """
+    Unused simple joins on a primary key are dropped, the others are kept.
+    """
+    select = api_serializer.decode_find(u"project", {u"id": 1}, {u"client_id.name": -1}, lookup)
+    assert mysql_serializer.prune_joins(select) == []
+    query, _ = mysql_serializer.encode_select(select)
+    assert u"JOIN" not in query and u"`client_id`.name" not in query
+
+    select = api_serializer.decode_find(u"project", {u"client_id.name": u"a"}, {u"client_id.name": -1}, lookup)
+    assert len(mysql_serializer.prune_joins(select)) == 1
+
+    lookup[0][u"type"] = u"multiple"
+    select = api_serializer.decode_find(u"project", None, {u"client_id.name": -1}, lookup)
+    assert len(mysql_serializer.prune_joins(select)) == 1
+
+    # Each column of a composite primary key is described as PRI, none is unique alone.
+    api_serializer.table_columns[u"client_tag"] = [
+        Column(name=u"client_id", typ=u"number", required=True, key=u"pri", extra=u"", default=None),
+        Column(name=u"tag", typ=u"text", required=True, key=u"pri", extra=u"", default=None)
+    ]
+    tag_lookup = [{u"to": u"project", u"localField": u"client_id", u"from": u"client_tag",
+                   u"foreignField": u"client_id", u"as": u"tag"}]
+    select = api_serializer.decode_find(u"project", None, {u"tag.tag": -1}, tag_lookup)
+    assert len(mysql_serializer.prune_joins(select)) == 1
+
+def test_encode_select_count(mysql_serializer, api_serializer, lookup):
+    """
+    Counts project nothing and only join the tables the filters need.
+    """
+    select = api_serializer.decode_find(u"project", {u"id": 1}, None, lookup)
+    query, values = mysql_serializer.encode_select_count(select)
+    assert query.split() == u"SELECT COUNT(*) FROM project `project` WHERE (`project`.id = %s)".split()
+    assert values == [1]
+
+    select = api_serializer.decode_find(u"project", {u"client_id.name": u"a"}, None, lookup)
+    query, values = mysql_serializer.encode_select_count(select, with_limit_and_skip=True)
+    assert u"LEFT JOIN client `client_id`" in query
+    assert u"LIMIT %s OFFSET %s" in query
+    assert values == [u"a", select.limit, select.offset]
+
+def test_encode_select_count_multiple(mysql_serializer, api_serializer, lookup):
+    """
+    Rows repeated by a multiple join are counted once per root document.
+    """
+    api_serializer.table_columns[u"user"] = [
+        Column(name=u"id", typ=u"number", required=True, key=u"pri", extra=u"auto_increment", default=None),
+        Column(name=u"name", typ=u"text", required=True, key=u"", extra=u"", default=None)
+    ]
+    lookup = [
+        {u"to": u"client", u"localField": u"id", u"from": u"project",
+         u"foreignField": u"client_id", u"as": u"projects", u"type": u"multiple"},
+        {u"to": u"projects", u"localField": u"client_id", u"from": u"user",
+         u"foreignField": u"id", u"as": u"projects.user"}
+    ]
+    select = api_serializer.decode_find(u"client", {u"name": u"a"}, None, lookup)
+    query, _ = mysql_serializer.encode_select_count(select)
+    assert query.split() == u"SELECT COUNT(*) FROM client `client` WHERE (`client`.name = %s)".split()
+
+    select = api_serializer.decode_find(u"client", {u"projects.user.name": u"b"}, None, lookup)
+    query, _ = mysql_serializer.encode_select_count(select)
+    assert query.startswith(u"SELECT COUNT(DISTINCT `client`.id) FROM client `client` LEFT JOIN project `projects`")
+    assert u"LEFT JOIN user `projects.user`" in query
+
+    select = api_serializer.decode_find(u"client", None, None, lookup)
+    query, _ = mysql_serializer.encode_select_count(select, with_limit_and_skip=True)
+    assert query.startswith(u"SELECT COUNT(DISTINCT A1.`key`) FROM (SELECT `client`.id AS 'key' FROM client")
+    assert u"LEFT JOIN project `projects`" in query
+
+def test_interpret_explain(mysql_serializer):
+    """
+    The estimate multiplies the rows of each table by their filtered ratio.
+    """
+    description = [(u"id",), (u"table",), (u"rows",), (u"filtered",)]
+    rows = [(1, u"project", 200, 50.0), (1, u"client_id", 1, 100.0)]
+    assert mysql_serializer.interpret_explain(rows, description) == 100
+    assert mysql_serializer.interpret_explain([], description) == 0
+
+def test_encode_select_total(mysql_serializer, api_serializer):
+    """
+    The total is a window column on recent servers, FOUND_ROWS() on the others.
+    """
+    assert mysql_serializer.total_strategy(u"8.0.32") == u"window"
+    assert mysql_serializer.total_strategy(u"5.7.41-log") == u"found_rows"
+    assert mysql_serializer.total_strategy(u"10.1.48-MariaDB") == u"found_rows"
+    assert mysql_serializer.total_strategy(u"10.6.12-MariaDB") == u"window"
+
+    select = api_serializer.decode_find(u"client")
+    query, _ = mysql_serializer.encode_select(select, total=u"window")
+    assert u"COUNT(*) OVER () AS '__total' FROM" in query
+    query, _ = mysql_serializer.encode_select(select, total=u"found_rows")
+    assert query.startswith(u"SELECT SQL_CALC_FOUND_ROWS ")
+
+def test_encode_in(mysql_serializer, api_serializer):
+    """
+    In filters inject one placeholder per value, an empty list matching nothing.
+    """
+    select = api_serializer.decode_find(u"client", {u"id": {u"$in": [1, 2, 3]}})
+    query, values = mysql_serializer.encode_select(select, with_limit_and_skip=False)
+    assert u"`id` IN (%s, %s, %s)" in query
+    assert values == [1, 2, 3]
+
+    select = api_serializer.decode_find(u"client", {u"id": {u"$in": [4, 5, 6]}})
+    assert mysql_serializer.encode_select(select, with_limit_and_skip=False) == (query, [4, 5, 6])
+
+    select = api_serializer.decode_find(u"client", {u"id": {u"$in": []}})
+    query, values = mysql_serializer.encode_select(select, with_limit_and_skip=False)
+    assert u"1 = 0" in query and values == []
+
+def test_encode_json_select(mysql_serializer, api_serializer, lookup):
+    """
+    Simple lookups are nested objects, multiple lookups arrays aggregated by subqueries.
+    """
+    assert mysql_serializer.supports_json_documents(u"5.7.22-log")
+    assert not mysql_serializer.supports_json_documents(u"5.7.21")
+    assert not mysql_serializer.supports_json_documents(u"10.4.1-MariaDB")
+
+    lookup.append({u"to": u"client", u"localField": u"id", u"from": u"project",
+                   u"foreignField": u"client_id", u"as": u"projects", u"type": u"multiple"})
+    select = api_serializer.decode_find(u"client", {u"name": u"a"}, None, lookup[1:])
+    query, values = mysql_serializer.encode_json_select(select)
+    assert query.startswith(u"SELECT JSON_OBJECT('id', `client`.id, ")
+    assert (
+        u"'projects', (SELECT IFNULL(JSON_ARRAYAGG(JSON_OBJECT('id', `projects`.id, "
+        u"'client_id', `projects`.client_id)), JSON_ARRAY()) FROM project `projects`  "
+        u"WHERE `projects`.client_id = `client`.id)) AS 'document' FROM client `client`"
+    ) in query
+    assert values == [u"a", 100, 0]
+
+    select = api_serializer.decode_find(u"client", {u"projects.id": 1}, None, lookup[1:])
+    with pytest.raises(WrongParameter):
+        mysql_serializer.encode_json_select(select)
+
+
+def test_encode_load_data(mysql_serializer):
+    """
+    Rows are tab separated with the default escaping of LOAD DATA.
+    """
+    assert mysql_serializer.encode_load_row(
+        [1, None, u"a\tb\\c\nd", True, 1.5, u"é"]
+    ) == b"1\t\\N\ta\\tb\\\\c\\nd\t1\t1.5\t\xc3\xa9\n"
+
+    query, values = mysql_serializer.encode_load_data(u"client", [u"id", u"name"], u"/tmp/rows.tsv", u"ignore")
+    assert query == (
+        u"LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE `client` CHARACTER SET utf8 "
+        u"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' (`id`, `name`)"
+    )
+    assert values == [u"/tmp/rows.tsv"]
+
+    with pytest.raises(WrongParameter):
+        mysql_serializer.encode_load_data(u"client", [u"id"], u"/tmp/rows.tsv", u"update")
@@ -0,0 +1,38 @@
+# coding: utf-8
+"""
+This file contains tests for Transaction class.
+"""
+
+import pytest
+from mock import Mock
+from pysqlcollection.transaction import Transaction
+
+
+def test_exit_releases_without_rollback():
+    """
+    Once committed, the connection is given back without another rollback.
+    """
+    connection = Mock()
+    with Transaction(connection) as transaction:
+        pass
+
+    sql_connection = connection.acquire.return_value
+    assert sql_connection.commit.called
+    connection.release.assert_called_once_with(sql_connection, rollback=False)
+    assert transaction.sql_cursor.close.called
+
+
+def test_exit_discards_when_commit_fails():
+    """
+    A connection whose commit failed is discarded instead of being lost for the pool.
+    """
+    connection = Mock()
+    sql_connection = connection.acquire.return_value
+    sql_connection.commit.side_effect = Exception(u"gone away")
+
+    with pytest.raises(Exception):
+        with Transaction(connection):
+            pass
+
+    connection.discard.assert_called_once_with(sql_connection)
+    assert not connection.release.called